@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Exportador AMHP: parse dos PDFs do AMHPTISS, automação do portal e armazenamento (a interface fica no app.py)."""
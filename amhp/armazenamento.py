@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Gravação atômica e conexão SQLite compartilhadas pelos arquivos do app (várias sessões e processos)."""
+import os, uuid, contextlib
+from contextlib import contextmanager
+
+@contextmanager
+def gravar_atomico(destino: str):
+    """
+    Gera um temporário exclusivo ao lado de `destino` (oculto: leitores da pasta o ignoram);
+    sem erro, os.replace o publica inteiro, com erro ele é apagado.
+    """
+    pasta, nome = os.path.split(destino)
+    os.makedirs(pasta or ".", exist_ok=True)
+    tmp = os.path.join(pasta, f".{nome}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, destino)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+def conectar_sqlite(arquivo: str, esquema=(), linhas_nomeadas: bool = False):
+    """Conexão nova em WAL com as tabelas de `esquema` criadas; uma por operação (threads e processos do lote)."""
+    import sqlite3
+    os.makedirs(os.path.dirname(arquivo) or ".", exist_ok=True)
+    con = sqlite3.connect(arquivo, timeout=30)
+    if linhas_nomeadas:
+        con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    for sql in esquema:
+        con.execute(sql)
+    return con
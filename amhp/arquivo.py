@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Arquivo dos PDFs exportados, endereçado pelo conteúdo."""
+import os, time, hashlib, threading, contextlib
+from concurrent.futures import ThreadPoolExecutor, wait
+import pandas as pd
+
+from .caminhos import PASTA_FINAL
+from .armazenamento import gravar_atomico, conectar_sqlite
+from .fonte import abrir_fonte_pdf, contar_paginas, hash_pdf
+from .checkpoints import Checkpoints
+from .extracao import revisao_parse
+
+# ========= Arquivo de PDFs =========
+PASTA_ARQUIVO_PDF = os.path.join(PASTA_FINAL, "arquivo_pdf")
+
+class ArquivoPDF:
+    """
+    PDFs exportados guardados uma vez por conteúdo (objetos/<sha256[:2]>/<sha256>.pdf.z, zlib),
+    com um índice SQLite das exportações e do parse de cada uma. As linhas extraídas ficam em
+    linhas/<sha256>.<modo>.<revisão>.csv.gz (revisao_parse: código do parse e motores): o mesmo
+    PDF no mesmo modo e na mesma revisão não precisa de parse de novo.
+    A compressão do PDF roda numa thread própria, fora do caminho do parse (aguardar() a espera).
+    """
+    def __init__(self, pasta: str = PASTA_ARQUIVO_PDF):
+        self.pasta = pasta
+        self.arquivo_indice = os.path.join(pasta, "indice.sqlite")
+        self._trava = threading.Lock()
+        self._executor = None
+        self._pendentes = []
+
+    ESQUEMA = (
+        "CREATE TABLE IF NOT EXISTS objetos (sha256 TEXT PRIMARY KEY, bytes INTEGER, bytes_arquivo INTEGER, "
+        "paginas INTEGER, criado_em TEXT, revisao_linhas TEXT, linhas INTEGER)",
+        "CREATE TABLE IF NOT EXISTS exportacoes (id INTEGER PRIMARY KEY, chave TEXT, negociacao TEXT, status TEXT, "
+        "credenciado TEXT, ini TEXT, fim TEXT, sha256 TEXT, exportado_em TEXT, linhas INTEGER, estado_parse TEXT)",
+        "CREATE INDEX IF NOT EXISTS exportacoes_chave ON exportacoes (chave, id)",
+    )
+
+    def _conectar(self):
+        return conectar_sqlite(self.arquivo_indice, self.ESQUEMA, linhas_nomeadas=True)
+
+    def _caminho(self, sha: str, pasta: str = "objetos", ext: str = ".pdf.z") -> str:
+        return os.path.join(self.pasta, pasta, sha[:2], sha + ext)
+
+    def guardar(self, fonte, un: dict) -> dict:
+        """
+        Registra a exportação da unidade e, se o conteúdo for novo, agenda a gravação do PDF
+        (a fonte não pode mudar até aguardar()). Só o hash e o índice ficam no caminho do parse.
+        Devolve {id, sha256, novo (conteúdo nunca visto pelo índice), alterado (em relação à
+        exportação anterior da mesma unidade; None na primeira)}.
+        """
+        sha = hash_pdf(fonte)  # em blocos: caminho não é lido inteiro para a memória
+        chave = Checkpoints.chave(un)
+        anterior = self.ultima(un)
+        agora = time.strftime("%Y-%m-%d %H:%M:%S")
+        # o índice decide o que é novo; o INSERT OR IGNORE serializa duas exportações do mesmo conteúdo
+        with contextlib.closing(self._conectar()) as con, con:
+            novo = con.execute("INSERT OR IGNORE INTO objetos (sha256, criado_em) VALUES (?, ?)",
+                               (sha, agora)).rowcount == 1
+            cur = con.execute(
+                "INSERT INTO exportacoes (chave, negociacao, status, credenciado, ini, fim, sha256, exportado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, un.get("negociacao", ""), un.get("status", ""), un.get("credenciado", ""),
+                 un.get("ini", ""), un.get("fim", ""), sha, agora))
+        destino = self._caminho(sha)
+        if novo or not os.path.exists(destino):
+            with self._trava:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arquivo_pdf")
+                self._pendentes = [f for f in self._pendentes if not f.done()]
+                self._pendentes.append(self._executor.submit(self._arquivar, fonte, sha, destino))
+        return {"id": cur.lastrowid, "sha256": sha, "novo": novo,
+                "alterado": None if anterior is None else anterior["sha256"] != sha}
+
+    def _arquivar(self, fonte, sha: str, destino: str):
+        tamanhos = self._gravar_objeto(fonte, destino)
+        try:
+            paginas = contar_paginas(fonte)
+        except Exception:
+            paginas = None
+        with contextlib.closing(self._conectar()) as con, con:
+            con.execute("UPDATE objetos SET bytes = ?, bytes_arquivo = ?, paginas = COALESCE(?, paginas) "
+                        "WHERE sha256 = ?", (*tamanhos, paginas, sha))
+
+    def aguardar(self, timeout: float = None) -> list:
+        """Espera as gravações agendadas; devolve as exceções das que falharam."""
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, []
+        feitas, restantes = wait(pendentes, timeout=timeout)
+        with self._trava:
+            self._pendentes.extend(restantes)
+        return [f.exception() for f in feitas if f.exception() is not None]
+
+    @staticmethod
+    def _gravar_objeto(fonte, destino: str):
+        """Comprime a fonte em blocos para destino. Devolve (bytes, bytes_arquivo)."""
+        import zlib
+        comp = zlib.compressobj(6)
+        total = gravado = 0
+        with gravar_atomico(destino) as tmp, abrir_fonte_pdf(fonte) as f, open(tmp, "wb") as saida:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                total += len(bloco)
+                gravado += saida.write(comp.compress(bloco))
+            gravado += saida.write(comp.flush())
+        return total, gravado
+
+    def ultima(self, un: dict):
+        """Exportação mais recente da unidade (mesmos filtros e período) ou None."""
+        with contextlib.closing(self._conectar()) as con:
+            linha = con.execute("SELECT * FROM exportacoes WHERE chave = ? ORDER BY id DESC LIMIT 1",
+                                (Checkpoints.chave(un),)).fetchone()
+        return dict(linha) if linha else None
+
+    def abrir(self, sha: str) -> bytes:
+        import zlib
+        with open(self._caminho(sha), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def _caminho_linhas(self, sha: str, modo: str, revisao: str) -> str:
+        return self._caminho(sha, "linhas", f".{modo}.{hashlib.sha1(revisao.encode()).hexdigest()[:12]}.csv.gz")
+
+    def linhas(self, sha: str, modo: str = "text"):
+        """Linhas do parse já feito deste conteúdo no modo pedido (revisão atual do parse) ou None."""
+        arq = self._caminho_linhas(sha, modo, revisao_parse(modo))
+        if not os.path.exists(arq):
+            return None
+        return pd.read_csv(arq, sep=";", dtype=str, keep_default_na=False, compression="gzip")
+
+    def registrar_parse(self, registro: dict, df: pd.DataFrame, estado: str = "ok", reaproveitado: bool = False,
+                        modo: str = "text"):
+        sha = registro["sha256"]
+        linhas = 0 if df is None else len(df)
+        with contextlib.closing(self._conectar()) as con, con:
+            if not reaproveitado and estado == "ok" and df is not None:
+                revisao = revisao_parse(modo)
+                with gravar_atomico(self._caminho_linhas(sha, modo, revisao)) as tmp:
+                    df.to_csv(tmp, index=False, sep=";", compression="gzip")
+                con.execute("UPDATE objetos SET revisao_linhas = ?, linhas = ? WHERE sha256 = ?",
+                            (revisao, linhas, sha))
+            con.execute("UPDATE exportacoes SET linhas = ?, estado_parse = ? WHERE id = ?",
+                        (linhas, "reaproveitado" if reaproveitado else estado, registro["id"]))
+
+    def exportacoes(self, limite: int = 200) -> pd.DataFrame:
+        with contextlib.closing(self._conectar()) as con:
+            return pd.read_sql_query(
+                "SELECT e.exportado_em, e.status, e.ini, e.fim, e.negociacao, e.credenciado, e.linhas, "
+                "e.estado_parse, o.paginas, o.bytes, substr(e.sha256, 1, 12) AS sha256 "
+                "FROM exportacoes e LEFT JOIN objetos o USING (sha256) ORDER BY e.id DESC LIMIT ?",
+                con, params=(limite,))
+
+    def resumo(self) -> dict:
+        with contextlib.closing(self._conectar()) as con:
+            o = con.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(bytes_arquivo), 0) FROM objetos").fetchone()
+            e = con.execute("SELECT COUNT(*), COALESCE(SUM(o.bytes), 0) FROM exportacoes e "
+                            "JOIN objetos o USING (sha256)").fetchone()
+        return {"pdfs": o[0], "exportacoes": e[0], "mb_arquivo": o[2] / 2**20,
+                "mb_sem_dedup": e[1] / 2**20, "mb_pdfs": o[1] / 2**20}
+
+ARQUIVO_PDF = ArquivoPDF()
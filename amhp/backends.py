@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""Motores de extração de PDF (texto e caixas de palavras por página)."""
+import os, json, mmap, threading, contextlib
+
+from .caminhos import PASTA_FINAL
+from .fonte import _LeitorBuffer, abrir_fonte_pdf
+
+# ========= Backends de extração de PDF =========
+class BackendPDF:
+    """
+    Interface dos motores de extração, página a página:
+      textos(fonte, paginas)   -> (n_pagina, total, texto)
+      palavras(fonte, paginas) -> (n_pagina, total, [{"text", "x0", "x1", "top", "bottom"}], tabelas, (largura, altura))
+    `paginas`: números (1-based) a extrair, None = todas; as demais saem vazias.
+    """
+    nome = ""
+    modulo = ""        # import exigido
+    distribuicao = ""  # pacote pip cuja versão entra na chave do cache de extração (padrão: modulo)
+    revisao = 1        # incrementar quando o código de extração deste motor mudar
+
+    def versao(self) -> str:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            v = version(self.distribuicao or self.modulo)
+        except PackageNotFoundError:
+            v = "?"
+        return f"{v}/r{self.revisao}"
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        import importlib.util
+        try:
+            return importlib.util.find_spec(cls.modulo) is not None
+        except (ImportError, ValueError):
+            return False
+
+    @classmethod
+    def tem_palavras(cls) -> bool:
+        return cls.palavras is not BackendPDF.palavras
+
+    def textos(self, fonte, paginas=None):
+        raise NotImplementedError
+
+    def palavras(self, fonte, paginas=None):
+        raise NotImplementedError(f"{self.nome} não extrai caixas de palavras")
+
+class BackendPyPDF2(BackendPDF):
+    nome, modulo = "pypdf2", "PyPDF2"
+
+    def __init__(self, janela_cache: int = 8):
+        self.janela_cache = janela_cache
+
+    def textos(self, fonte, paginas=None):
+        # A cada `janela_cache` páginas o cache de objetos resolvidos (streams de conteúdo já
+        # descomprimidos) é descartado, limitando a memória a poucas páginas.
+        from PyPDF2 import PdfReader
+        with abrir_fonte_pdf(fonte) as f:
+            reader = PdfReader(f)
+            total = len(reader.pages)
+            for i in range(total):
+                if paginas is not None and i + 1 not in paginas:
+                    yield i + 1, total, ""
+                    continue
+                page = reader.pages[i]
+                txt = page.extract_text() or ""
+                del page
+                if (i + 1) % self.janela_cache == 0:
+                    reader.resolved_objects.clear()
+                yield i + 1, total, txt
+
+class BackendPdfplumber(BackendPDF):
+    nome, modulo = "pdfplumber", "pdfplumber"
+
+    def tabelas_pagina(self, fonte, n_pag: int):
+        """page.extract_tables() de uma página avulsa (palavras vindas do cache de extração)."""
+        import pdfplumber
+        with abrir_fonte_pdf(fonte) as f, pdfplumber.open(f) as pdf:
+            return pdf.pages[n_pag - 1].extract_tables()
+
+    def _paginas(self, fonte, paginas=None):
+        import pdfplumber
+        with abrir_fonte_pdf(fonte) as f, pdfplumber.open(f) as pdf:
+            total = len(pdf.pages)
+            for i in range(total):
+                if paginas is not None and i + 1 not in paginas:
+                    yield i + 1, total, None
+                    continue
+                page = pdf.pages[i]
+                try:
+                    yield i + 1, total, page
+                finally:
+                    page.close()  # descarta chars/objetos já extraídos desta página
+
+    def textos(self, fonte, paginas=None):
+        for n, total, page in self._paginas(fonte, paginas):
+            yield n, total, (page.extract_text() or "") if page else ""
+
+    def palavras(self, fonte, paginas=None):
+        for n, total, page in self._paginas(fonte, paginas):
+            if page is None:
+                yield n, total, [], None, None
+            else:
+                yield n, total, page.extract_words(use_text_flow=True), page.extract_tables, (page.width, page.height)
+
+class BackendPdfminer(BackendPDF):
+    """pdfminer.six direto, sem o pós-processamento do pdfplumber; LAParams ajustados para linhas de grade."""
+    nome, modulo, distribuicao = "pdfminer", "pdfminer", "pdfminer.six"
+    # char_margin alto junta as células de uma linha; boxes_flow=None dispensa a ordenação de blocos
+    LAPARAMS = {"char_margin": 50.0, "line_margin": 0.1, "word_margin": 0.1, "boxes_flow": None}
+
+    def versao(self) -> str:
+        return f"{super().versao()}/{json.dumps(self.LAPARAMS, sort_keys=True)}"
+
+    def _layouts(self, fonte, paginas=None):
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams
+        from pdfminer.pdftypes import resolve1
+        with abrir_fonte_pdf(fonte) as f:
+            doc = PDFDocument(PDFParser(f))
+            total = int(resolve1(resolve1(doc.catalog["Pages"])["Count"]))
+            recursos = PDFResourceManager(caching=True)
+            agregador = PDFPageAggregator(recursos, laparams=LAParams(**self.LAPARAMS))
+            interp = PDFPageInterpreter(recursos, agregador)
+            for i, pagina in enumerate(PDFPage.create_pages(doc), start=1):
+                if paginas is not None and i not in paginas:
+                    yield i, total, None
+                    continue
+                interp.process_page(pagina)
+                yield i, total, agregador.get_result()
+
+    @staticmethod
+    def _linhas(layout) -> list:
+        from pdfminer.layout import LTTextLine, LTTextBox
+        linhas = []
+        for obj in layout:
+            if isinstance(obj, LTTextBox):
+                linhas.extend(l for l in obj if isinstance(l, LTTextLine))
+            elif isinstance(obj, LTTextLine):
+                linhas.append(obj)
+        return sorted(linhas, key=lambda l: (-round(l.y1, 1), l.x0))
+
+    def textos(self, fonte, paginas=None):
+        for n, total, layout in self._layouts(fonte, paginas):
+            yield n, total, "\n".join(l.get_text().strip() for l in self._linhas(layout)) if layout else ""
+
+    def palavras(self, fonte, paginas=None):
+        from pdfminer.layout import LTChar
+        for n, total, layout in self._layouts(fonte, paginas):
+            if layout is None:
+                yield n, total, [], None, None
+                continue
+            altura = layout.height
+            palavras = []
+            for linha in self._linhas(layout):
+                atual = []
+                for ch in list(linha) + [None]:
+                    if isinstance(ch, LTChar) and ch.get_text().strip():
+                        atual.append(ch)
+                        continue
+                    if atual:  # espaço/LTAnno ou fim da linha fecha a palavra
+                        palavras.append({
+                            "text": "".join(c.get_text() for c in atual),
+                            "x0": atual[0].x0, "x1": atual[-1].x1,
+                            "top": altura - max(c.y1 for c in atual), "bottom": altura - min(c.y0 for c in atual),
+                        })
+                        atual = []
+            yield n, total, palavras, None, (layout.width, altura)
+
+class BackendPdfium(BackendPDF):
+    nome, modulo = "pdfium", "pypdfium2"
+    _trava = threading.Lock()  # o PDFium não é thread-safe: um documento por vez no processo
+
+    def textos(self, fonte, paginas=None):
+        import pypdfium2 as pdfium
+        with self._trava, abrir_fonte_pdf(fonte) as f, (_LeitorBuffer(f) if isinstance(f, mmap.mmap) else contextlib.nullcontext(f)) as f:
+            # o PDFium só lê streams io.IOBase: o mmap (fonte em caminho) entra como buffer
+            doc = pdfium.PdfDocument(f)
+            try:
+                total = len(doc)
+                for i in range(total):
+                    if paginas is not None and i + 1 not in paginas:
+                        yield i + 1, total, ""
+                        continue
+                    page = doc[i]
+                    tp = page.get_textpage()
+                    try:
+                        txt = tp.get_text_range()
+                    finally:
+                        tp.close()
+                        page.close()
+                    yield i + 1, total, txt
+            finally:
+                doc.close()
+
+class BackendPyMuPDF(BackendPDF):
+    nome, modulo, distribuicao = "pymupdf", "fitz", "PyMuPDF"
+
+    @staticmethod
+    def _abrir(f):
+        import fitz
+        return fitz.open(stream=f.read(), filetype="pdf")
+
+    def textos(self, fonte, paginas=None):
+        with abrir_fonte_pdf(fonte) as f, self._abrir(f) as doc:
+            for i, page in enumerate(doc, start=1):
+                yield i, doc.page_count, page.get_text() if paginas is None or i in paginas else ""
+
+    def palavras(self, fonte, paginas=None):
+        with abrir_fonte_pdf(fonte) as f, self._abrir(f) as doc:
+            for i, page in enumerate(doc, start=1):
+                if paginas is not None and i not in paginas:
+                    yield i, doc.page_count, [], None, None
+                    continue
+                palavras = [{"text": w[4], "x0": w[0], "x1": w[2], "top": w[1], "bottom": w[3]}
+                            for w in page.get_text("words")]
+                yield i, doc.page_count, palavras, None, (page.rect.width, page.rect.height)
+
+BACKENDS_PDF = {b.nome: b for b in (BackendPyPDF2, BackendPdfplumber, BackendPdfminer, BackendPdfium, BackendPyMuPDF)}
+# motores históricos de cada modo (referência de precisão no benchmark)
+BACKEND_PADRAO = {"text": "pypdf2", "coord": "pdfplumber"}
+ARQUIVO_BACKENDS = os.path.join(PASTA_FINAL, "backends_pdf.json")  # gravado por ferramentas/bench_extracao.py
+
+def backends_disponiveis(modo: str = "text") -> list:
+    return [n for n, b in BACKENDS_PDF.items() if b.disponivel() and (modo == "text" or b.tem_palavras())]
+
+def escolher_backend(modo: str = "text") -> str:
+    """AMHP_BACKEND_TEXT/AMHP_BACKEND_COORD, depois a escolha do benchmark, depois o padrão histórico."""
+    candidatos = [os.environ.get(f"AMHP_BACKEND_{modo.upper()}", "")]
+    try:
+        with open(ARQUIVO_BACKENDS, encoding="utf-8") as f:
+            candidatos.append(json.load(f).get(modo, {}).get("backend", ""))
+    except (OSError, ValueError, AttributeError):
+        pass
+    for nome in candidatos:
+        if nome in backends_disponiveis(modo):
+            return nome
+    return BACKEND_PADRAO[modo]
+
+def obter_backend(backend=None, modo: str = "text") -> BackendPDF:
+    if isinstance(backend, BackendPDF):
+        return backend
+    nome = backend or escolher_backend(modo)
+    if nome not in BACKENDS_PDF:
+        raise ValueError(f"Backend de PDF desconhecido: {nome} (opções: {', '.join(BACKENDS_PDF)})")
+    return BACKENDS_PDF[nome]()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Cache da extração bruta por página (SQLite)."""
+import os
+import numpy as np
+
+from .caminhos import PASTA_FINAL
+from .armazenamento import conectar_sqlite
+from .fonte import hash_pdf
+from .backends import BackendPDF
+
+# ========= Cache de extração =========
+ARQUIVO_CACHE_EXTRACAO = os.path.join(PASTA_FINAL, "cache_extracao.sqlite")
+# AMHP_CACHE_EXTRACAO=1 liga o cache em todo parse; o lote de PDFs (reprocessamento do arquivo) liga por padrão
+USAR_CACHE_EXTRACAO = os.environ.get("AMHP_CACHE_EXTRACAO", "") not in ("", "0")
+
+class CacheExtracao:
+    """
+    Extração bruta por página (texto e caixas de palavras) em SQLite, separada do parse:
+    mudar as heurísticas não obriga a reextrair o arquivo de PDFs.
+    Chave: (sha256 do PDF, motor, versão do motor, tipo, página); texto e caixas em zlib.
+    """
+    ESQUEMA = (
+        "CREATE TABLE IF NOT EXISTS paginas (pdf TEXT, motor TEXT, versao TEXT, tipo TEXT, pagina INTEGER, "
+        "total INTEGER, largura REAL, altura REAL, caixas BLOB, textos BLOB, "
+        "PRIMARY KEY (pdf, motor, versao, tipo, pagina)) WITHOUT ROWID",
+    )
+
+    def __init__(self, arquivo: str = ARQUIVO_CACHE_EXTRACAO):
+        self.arquivo = arquivo
+
+    def _conectar(self):
+        return conectar_sqlite(self.arquivo, self.ESQUEMA)
+
+    def ler(self, chave: tuple, tipo: str) -> dict:
+        """{pagina: (total, tamanho, caixas, textos)} ainda comprimidos."""
+        con = self._conectar()
+        try:
+            linhas = con.execute("SELECT pagina, total, largura, altura, caixas, textos FROM paginas "
+                                 "WHERE pdf=? AND motor=? AND versao=? AND tipo=?", (*chave, tipo)).fetchall()
+        finally:
+            con.close()
+        return {pg: (total, (larg, alt) if larg is not None else None, caixas, textos)
+                for pg, total, larg, alt, caixas, textos in linhas}
+
+    def gravar(self, chave: tuple, tipo: str, linhas: list):
+        """linhas: [(pagina, total, tamanho, caixas, textos)] já comprimidas."""
+        if not linhas:
+            return
+        con = self._conectar()
+        try:
+            with con:
+                con.executemany(
+                    "INSERT OR REPLACE INTO paginas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(*chave, tipo, pg, total, *(tam or (None, None)), caixas, textos)
+                     for pg, total, tam, caixas, textos in linhas],
+                )
+        finally:
+            con.close()
+
+    def resumo(self) -> dict:
+        if not os.path.exists(self.arquivo):
+            return {"pdfs": 0, "paginas": 0, "mb": 0.0}
+        con = self._conectar()
+        try:
+            pdfs, paginas = con.execute("SELECT COUNT(DISTINCT pdf), COUNT(*) FROM paginas").fetchone()
+        finally:
+            con.close()
+        mb = sum(os.path.getsize(a) for a in (self.arquivo, self.arquivo + "-wal") if os.path.exists(a)) / 2**20
+        return {"pdfs": pdfs, "paginas": paginas, "mb": mb}
+
+    def limpar(self):
+        con = self._conectar()
+        try:
+            with con:
+                con.execute("DELETE FROM paginas")
+            con.execute("VACUUM")
+        finally:
+            con.close()
+
+CACHE_EXTRACAO = CacheExtracao()
+
+def _codificar_palavras(words: list):
+    import zlib
+    caixas = np.array([(w["x0"], w["x1"], w["top"], w["bottom"]) for w in words], dtype="f8").reshape(-1, 4)
+    return (zlib.compress(np.ascontiguousarray(caixas.T).tobytes()),
+            zlib.compress("\x1f".join(w["text"] for w in words).encode("utf-8")))
+
+def _decodificar_palavras(caixas: bytes, textos: bytes) -> list:
+    import zlib
+    colunas = np.frombuffer(zlib.decompress(caixas), dtype="f8").reshape(4, -1)
+    if not colunas.shape[1]:
+        return []
+    x0, x1, top, bottom = (c.tolist() for c in colunas)
+    return [{"text": t, "x0": a, "x1": b, "top": c, "bottom": d}
+            for t, a, b, c, d in zip(zlib.decompress(textos).decode("utf-8").split("\x1f"), x0, x1, top, bottom)]
+
+class BackendComCache(BackendPDF):
+    """
+    Motor com CacheExtracao: só as páginas fora do cache passam pelo motor (gravadas a cada
+    `lote` páginas). `hashes` ({id da fonte: sha256}) compartilhado entre wrappers evita
+    refazer o hash do PDF no fallback textual.
+    """
+    def __init__(self, motor: BackendPDF, cache: CacheExtracao = None, lote: int = 32, hashes: dict = None):
+        self.motor, self.cache, self.lote = motor, cache or CACHE_EXTRACAO, lote
+        self.nome, self.modulo = motor.nome, motor.modulo
+        self._hashes = {} if hashes is None else hashes
+
+    def chave(self, fonte) -> tuple:
+        if id(fonte) not in self._hashes:
+            self._hashes[id(fonte)] = hash_pdf(fonte)
+        return self._hashes[id(fonte)], self.motor.nome, self.motor.versao()
+
+    def _paginas(self, fonte, paginas, tipo: str, extrair, codificar):
+        """Gera (n, total, guardada, item): linha do cache (comprimida) ou a saída do motor."""
+        chave = self.chave(fonte)
+        guardadas = self.cache.ler(chave, tipo)
+        quer = lambda n: paginas is None or n in paginas
+        if guardadas:
+            total = next(iter(guardadas.values()))[0]
+            faltando = {n for n in range(1, total + 1) if quer(n) and n not in guardadas}
+            if not faltando:
+                for n in range(1, total + 1):
+                    yield n, total, guardadas.get(n) if quer(n) else None, None
+                return
+        else:
+            faltando = paginas
+
+        novas = []
+        try:
+            for item in extrair(fonte, faltando):
+                n, total = item[0], item[1]
+                if quer(n) and n in guardadas:
+                    yield n, total, guardadas[n], None
+                    continue
+                if faltando is None or n in faltando:
+                    novas.append((n, total, *codificar(item)))
+                    if len(novas) >= self.lote:
+                        self.cache.gravar(chave, tipo, novas)
+                        novas = []
+                yield n, total, None, item
+        finally:
+            self.cache.gravar(chave, tipo, novas)  # inclusive se o consumidor parar antes do fim
+
+    def textos(self, fonte, paginas=None):
+        import zlib
+        codificar = lambda item: (None, None, zlib.compress(item[2].encode("utf-8")))
+        for n, total, guardada, item in self._paginas(fonte, paginas, "texto", self.motor.textos, codificar):
+            if guardada:
+                yield n, total, zlib.decompress(guardada[3]).decode("utf-8")
+            else:
+                yield item or (n, total, "")
+
+    def palavras(self, fonte, paginas=None):
+        tabelas_pagina = getattr(self.motor, "tabelas_pagina", None)
+        codificar = lambda item: (item[4], *_codificar_palavras(item[2]))
+        for n, total, guardada, item in self._paginas(fonte, paginas, "palavras", self.motor.palavras, codificar):
+            if guardada:
+                tabelas = (lambda n=n: tabelas_pagina(fonte, n)) if tabelas_pagina else None
+                yield n, total, _decodificar_palavras(guardada[2], guardada[3]), tabelas, guardada[1]
+            else:
+                yield item or (n, total, [], None, None)
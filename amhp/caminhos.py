@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""Pastas de trabalho da automação (saída final e downloads temporários)."""
+import os
+
+def obter_caminho_final():
+    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+    path = os.path.join(desktop if os.path.exists(desktop) else os.getcwd(), "automacao_pdf")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+PASTA_FINAL = obter_caminho_final()
+DOWNLOAD_TEMPORARIO = os.path.join(os.getcwd(), "temp_downloads")
+os.makedirs(DOWNLOAD_TEMPORARIO, exist_ok=True)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints por unidade para retomar execuções interrompidas."""
+import os, json, time
+import pandas as pd
+
+from .caminhos import PASTA_FINAL
+from .armazenamento import gravar_atomico
+
+# ========= Checkpoints =========
+PASTA_CHECKPOINTS = os.path.join(PASTA_FINAL, "checkpoints")
+# unidade concluída só é pulada dentro desta janela (AMHP_CHECKPOINT_TTL_H, em horas)
+VALIDADE_CHECKPOINT_S = float(os.environ.get("AMHP_CHECKPOINT_TTL_H", "6")) * 3600
+
+class Checkpoints:
+    """
+    Um checkpoint por unidade (status × bloco de período) para retomar uma execução
+    interrompida: unidades "ok"/"vazio" há menos de `validade_s` são puladas e as linhas
+    extraídas ficam em <chave>.csv.gz. A chave vem dos filtros da unidade, não da sessão:
+    recarregar a página ou reiniciar o servidor e repetir os filtros retoma a execução.
+    """
+    def __init__(self, pasta: str = PASTA_CHECKPOINTS, validade_s: float = VALIDADE_CHECKPOINT_S):
+        self.pasta = pasta
+        self.validade_s = validade_s
+        os.makedirs(pasta, exist_ok=True)
+
+    @staticmethod
+    def chave(un: dict) -> str:
+        import hashlib
+        ident = "|".join(str(un.get(k, "")).strip() for k in ("negociacao", "status", "credenciado", "ini", "fim"))
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16]
+
+    def _arq(self, un: dict, ext: str) -> str:
+        return os.path.join(self.pasta, f"{self.chave(un)}.{ext}")
+
+    def estado(self, un: dict) -> dict:
+        try:
+            with open(self._arq(un, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def concluida(self, un: dict) -> bool:
+        estado = self.estado(un)
+        return (estado.get("estado") in ("ok", "vazio")
+                and time.time() - estado.get("gravado_em", 0) < self.validade_s)
+
+    def _gravar(self, un: dict, dados: dict):
+        with gravar_atomico(self._arq(un, "json")) as tmp, open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"unidade": un, **dados, "atualizado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "gravado_em": time.time()}, f, ensure_ascii=False)
+
+    def marcar_ok(self, un: dict, df: pd.DataFrame):
+        if df is not None and not df.empty:
+            with gravar_atomico(self._arq(un, "csv.gz")) as tmp:
+                df.to_csv(tmp, index=False, sep=";", compression="gzip")
+        self._gravar(un, {"estado": "ok" if df is not None and not df.empty else "vazio",
+                          "linhas": 0 if df is None else len(df)})
+
+    def marcar_falha(self, un: dict, erro: str, tentativas: int):
+        self._gravar(un, {"estado": "falha", "erro": erro, "tentativas": tentativas})
+
+    def carregar_df(self, un: dict) -> pd.DataFrame:
+        arq = self._arq(un, "csv.gz")
+        if not os.path.exists(arq):
+            return pd.DataFrame()
+        return pd.read_csv(arq, sep=";", dtype=str, keep_default_na=False, compression="gzip")
+
+    def limpar(self, unidades: list):
+        """Apaga os checkpoints destas unidades (os de outros filtros ficam)."""
+        for un in unidades:
+            for ext in ("json", "csv.gz"):
+                try:
+                    os.remove(self._arq(un, ext))
+                except OSError:
+                    pass
+
+    def podar(self) -> int:
+        """Apaga arquivos com mais de `validade_s` (não contam mais como concluídos); devolve quantos."""
+        limite, removidos = time.time() - self.validade_s, 0
+        for e in os.scandir(self.pasta):
+            try:
+                if e.is_file() and e.stat().st_mtime < limite:
+                    os.remove(e.path)
+                    removidos += 1
+            except OSError:
+                pass
+        return removidos
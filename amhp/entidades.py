@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Dicionários de Operadora, Prestador e Credenciado da base consolidada."""
+import re
+import numpy as np
+import pandas as pd
+
+from .esquema import CODIGO_ENTIDADE, _normalize_ws
+
+# ========= Entidades (dicionários) =========
+# texto → (código, nome): "014406- CLINICA ..." e "BACEN(104)"
+ENTIDADES = {
+    "Operadora": re.compile(r"(?P<nome>.*?)\s*\((?P<codigo>\w+)\)\s*"),
+    "Prestador": re.compile(rf"(?P<codigo>{CODIGO_ENTIDADE})-\s*(?P<nome>.*)"),
+    "Credenciado": re.compile(rf"(?P<codigo>{CODIGO_ENTIDADE})-\s*(?P<nome>.*)"),
+}
+
+class RegistroEntidades:
+    """
+    Dicionário de Operadora, Prestador e Credenciado: cada texto distinto recebe um id
+    estável (0 = vazio) e é quebrado uma vez em código + nome. Na base as colunas viram
+    Categorical com códigos = ids.
+    """
+    def __init__(self):
+        self.textos = {tipo: [""] for tipo in ENTIDADES}
+        self.ids = {tipo: {"": 0} for tipo in ENTIDADES}
+        self.partes = {tipo: [("", "")] for tipo in ENTIDADES}
+
+    def internar(self, tipo: str, serie: pd.Series) -> np.ndarray:
+        """Ids (int32) dos valores da série, registrando os textos novos."""
+        codigos, unicos = pd.factorize(serie.astype(object).where(serie.notna(), ""), use_na_sentinel=False)
+        ids, textos, partes = self.ids[tipo], self.textos[tipo], self.partes[tipo]
+        padrao = ENTIDADES[tipo]
+        mapa = np.empty(len(unicos), dtype=np.int32)
+        for i, texto in enumerate(unicos):
+            texto = str(texto)
+            if texto not in ids:
+                ids[texto] = len(textos)
+                textos.append(texto)
+                m = padrao.fullmatch(texto.strip())
+                partes.append((m["codigo"], _normalize_ws(m["nome"]).upper()) if m else ("", _normalize_ws(texto).upper()))
+            mapa[i] = ids[texto]
+        return mapa[codigos]
+
+    def dtype(self, tipo: str) -> pd.CategoricalDtype:
+        return pd.CategoricalDtype(self.textos[tipo])
+
+    def categorizar(self, tipo: str, serie: pd.Series) -> pd.Series:
+        return pd.Series(pd.Categorical.from_codes(self.internar(tipo, serie), dtype=self.dtype(tipo)),
+                         index=serie.index, name=serie.name)
+
+    def tabela(self, tipo: str) -> pd.DataFrame:
+        codigos, nomes = zip(*self.partes[tipo])
+        return pd.DataFrame({"id": range(len(self.textos[tipo])), "texto": self.textos[tipo],
+                             "codigo": codigos, "nome": nomes})
+
+def compactar_entidades(df: pd.DataFrame, registro: RegistroEntidades) -> pd.DataFrame:
+    """Colunas de ENTIDADES como Categorical sobre as categorias atuais do registro."""
+    df = df.copy()
+    for tipo in ENTIDADES:
+        if tipo in df.columns:
+            df[tipo] = registro.categorizar(tipo, df[tipo])
+    return df
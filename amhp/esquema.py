@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Sanitização e esquema da tabela de atendimentos."""
+import re
+import pandas as pd
+
+from .perfil import etapa_perfil
+
+# ========= Sanitização =========
+_ILLEGAL_CTRL_RE = re.compile(r"[\x00-\x08\x0B-\x0C\x0E-\x1F]")
+
+def _sanitize_text(s: str) -> str:
+    if s is None:
+        return s
+    s = s.replace("\x00", "")
+    s = _ILLEGAL_CTRL_RE.sub("", s)
+    s = s.replace("\u00A0", " ").strip()
+    return s
+
+def _normalize_ws(s: str) -> str:
+    return re.sub(r"\s+", " ", s.replace("\u00A0", " ")).strip()
+
+def sanitize_value(v):
+    if pd.isna(v):
+        return v
+    if isinstance(v, (bytes, bytearray)):
+        try:
+            v = v.decode("utf-8", "ignore")
+        except Exception:
+            v = v.decode("latin-1", "ignore")
+    if isinstance(v, str):
+        return _sanitize_text(v)
+    return v
+
+@etapa_perfil("sanitize_df")
+def sanitize_df(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    new_cols, seen = [], {}
+    for c in df.columns:
+        c2 = sanitize_value(str(c))
+        n = seen.get(c2, 0) + 1
+        seen[c2] = n
+        new_cols.append(c2 if n == 1 else f"{c2}_{n}")
+    df.columns = new_cols
+    for col in df.select_dtypes(include=["object"]).columns:
+        df[col] = df[col].apply(sanitize_value)
+    return df
+
+# ========= Esquema =========
+TARGET_COLS = [
+    "Atendimento","NrGuia","Realizacao","Hora","TipoGuia",
+    "Operadora","Matricula","Beneficiario","Credenciado",
+    "Prestador","ValorTotal"
+]
+# código de Credenciado/Prestador ("014406- CLINICA ..."): dicionários e validação aceitam o que os dois
+# parsers emitem (texto: 5 a 7 dígitos, coordenadas: 3 a 6)
+CODIGO_ENTIDADE = r"\d{3,7}"
+
+def ensure_atendimentos_schema(df: pd.DataFrame) -> pd.DataFrame:
+    for c in TARGET_COLS:
+        if c not in df.columns:
+            df[c] = ""
+    return df[TARGET_COLS]
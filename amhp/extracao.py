@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Parse de um PDF do AMHPTISS em DataFrame de atendimentos."""
+import time, hashlib, functools
+import streamlit as st
+import pandas as pd
+
+from .perfil import etapa_perfil
+from .esquema import TARGET_COLS, ensure_atendimentos_schema, sanitize_df
+from .validacao import validar_atendimentos
+from .backends import BackendPDF, obter_backend
+from .cache import USAR_CACHE_EXTRACAO, BackendComCache
+from .parser import iter_registros_texto, iter_registros_coords
+from .varredura import classificar_paginas, paginas_a_extrair
+
+# ========= Revisão do parse =========
+@functools.lru_cache(maxsize=1)
+def _hash_codigo_parse() -> str:
+    """sha1 do código que decide as linhas (parsers, pré-varredura, esquema e esta seleção de modo)."""
+    from . import esquema, parser, varredura
+    h = hashlib.sha1()
+    for arq in (esquema.__file__, parser.__file__, varredura.__file__, __file__):
+        with open(arq, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+def revisao_parse(mode: str = "text", backend=None) -> str:
+    """
+    Identifica o resultado de parse_pdf_to_atendimentos_df(mode, backend): hash do código do parse
+    mais nome/versão dos motores usados (no coord, também o do fallback textual). Linhas guardadas
+    com outra revisão não valem mais.
+    """
+    modos = ["coord", "text"] if mode == "coord" else ["text"]
+    motores = [obter_backend(backend if m == mode else None, m) for m in modos]
+    return "/".join([_hash_codigo_parse()] + [f"{m.nome}@{m.versao()}" for m in motores])
+
+# ========= Parse (seleção de modo) =========
+def iter_lotes_registros(paginas, linhas_lote: int = 100):
+    """
+    Agrupa (n_pagina, total_paginas, registros) dos parsers em lotes: o primeiro sai assim
+    que houver linhas, os demais a cada `linhas_lote` (nas outras páginas, registros vazio).
+    """
+    buffer, emitiu = [], False
+    n_pag = total = 0
+    for n_pag, total, registros in paginas:
+        buffer.extend(registros)
+        if buffer and (not emitiu or len(buffer) >= linhas_lote):
+            yield n_pag, total, buffer
+            buffer, emitiu = [], True
+        else:
+            yield n_pag, total, []
+    if buffer:
+        yield n_pag, total, buffer
+
+def parse_pdf_to_atendimentos_df(pdf_path, mode: str = "text", debug: bool = False,
+                                 incluir_pagina: bool = False, ao_lote=None, linhas_lote: int = 100,
+                                 backend=None, pre_varredura: bool = True,
+                                 cache: bool = None, validar: bool = True) -> pd.DataFrame:
+    """
+    pdf_path: caminho, bytes, BytesIO/arquivo aberto ou mmap (ver abrir_fonte_pdf).
+    mode: "text" | "coord" (com fallback textual se não achar linhas).
+    backend: motor de extração (BACKENDS_PDF); padrão escolher_backend(mode).
+    incluir_pagina: acrescenta a coluna "Pagina".
+    ao_lote(n_pagina, total_paginas, df_lote_ou_None): chamado a cada página durante o parse.
+    cache: usa CACHE_EXTRACAO (padrão: USAR_CACHE_EXTRACAO).
+    pre_varredura: só extrai as páginas que podem ter registros (df.attrs["pre_varredura"]).
+    validar: validar_atendimentos, com as contagens em df.attrs["validacao"].
+    """
+    classes, varredura_s = None, 0.0
+    if pre_varredura:
+        t0 = time.perf_counter()
+        try:
+            classes = classificar_paginas(pdf_path, so_extremos=mode != "coord")
+        except Exception as e:
+            if debug: st.warning(f"[pré-varredura] Falha, extraindo todas as páginas: {e}")
+        varredura_s = time.perf_counter() - t0
+    extracao = {}  # modo efetivo: páginas extraídas e tempo do parse
+    if cache is None:
+        cache = USAR_CACHE_EXTRACAO
+
+    hashes = {}  # sha256 do PDF, compartilhado pelos wrappers do coord e do fallback textual
+
+    def motor(modo: str) -> BackendPDF:
+        m = obter_backend(backend, modo)
+        return BackendComCache(m, hashes=hashes) if cache and not isinstance(m, BackendComCache) else m
+
+    def coletar(paginas, modo: str, selecionadas) -> pd.DataFrame:
+        parsed, t0 = [], time.perf_counter()
+        for n_pag, total, registros in iter_lotes_registros(paginas, linhas_lote):
+            parsed.extend(registros)
+            if ao_lote:
+                ao_lote(n_pag, total, ensure_atendimentos_schema(pd.DataFrame(registros)) if registros else None)
+        extracao.update(modo=modo, paginas=selecionadas, parse_s=time.perf_counter() - t0)
+        return pd.DataFrame(parsed)
+
+    def montar(df: pd.DataFrame) -> pd.DataFrame:
+        out = ensure_atendimentos_schema(df)
+        if incluir_pagina:
+            out = out.assign(Pagina=df["Pagina"] if "Pagina" in df.columns else pd.Series(dtype="int64"))
+        return out
+
+    @etapa_perfil("parse_by_text")
+    def parse_by_text() -> pd.DataFrame:
+        selecionadas = paginas_a_extrair(classes, "text") if classes else None
+        paginas = iter_registros_texto(pdf_path, motor("text"), selecionadas)
+        return montar(coletar(paginas, "text", selecionadas))
+
+    @etapa_perfil("parse_by_coords")
+    def parse_by_coords() -> pd.DataFrame:
+        selecionadas = paginas_a_extrair(classes, "coord") if classes else None
+        try:
+            df = coletar(iter_registros_coords(pdf_path, motor("coord"), paginas=selecionadas), "coord", selecionadas)
+        except Exception as e:
+            if debug: st.error(f"[coord] Falha: {e}")
+            return pd.DataFrame(columns=TARGET_COLS)
+        if not df.empty:
+            try:
+                df["Realizacao_dt"] = pd.to_datetime(df["Realizacao"], format="%d/%m/%Y", errors="coerce")
+                df = df.sort_values(["Realizacao_dt","Hora"], kind="stable").drop(columns=["Realizacao_dt"]).reset_index(drop=True)
+            except Exception:
+                pass
+        return montar(df)
+
+    def relatorio_varredura() -> dict:
+        selecionadas = extracao.get("paginas")
+        decisoes = [{**p, "extraida": selecionadas is None or p["pagina"] in selecionadas} for p in classes]
+        extraidas = sum(d["extraida"] for d in decisoes)
+        por_pagina = extracao.get("parse_s", 0.0) / max(extraidas, 1)
+        return {
+            "modo": extracao.get("modo", mode), "paginas": decisoes, "puladas": len(decisoes) - extraidas,
+            "varredura_s": varredura_s, "economia_s": (len(decisoes) - extraidas) * por_pagina - varredura_s,
+        }
+
+    if mode != "coord":
+        out = sanitize_df(parse_by_text())
+    else:
+        out = parse_by_coords()
+        if out.empty:
+            if debug: st.warning("Nenhuma linha por coordenadas — aplicando fallback textual.")
+            backend = None  # o fallback usa o motor escolhido para o modo textual
+            out = parse_by_text()
+        out = sanitize_df(out)
+
+    out.attrs["modo"] = extracao.get("modo", mode)
+    if classes:
+        rel = relatorio_varredura()
+        out.attrs["pre_varredura"] = rel
+        if debug:
+            st.caption(f"Pré-varredura ({rel['modo']}): {rel['puladas']} de {len(rel['paginas'])} página(s) "
+                       f"sem extração; varredura {rel['varredura_s']:.2f}s, economia estimada {rel['economia_s']:.2f}s.")
+            st.dataframe(pd.DataFrame(rel["paginas"]), use_container_width=True)
+    if validar:
+        t0 = time.perf_counter()
+        problemas, resumo = validar_atendimentos(out, extracao.get("modo", mode))
+        out.attrs["validacao"] = {
+            "linhas": len(out), "com_problema": int(problemas.any(axis=1).sum()),
+            "por_regra": {r: int(n) for r, n in zip(resumo["regra"], resumo["linhas"]) if n},
+            "validacao_s": time.perf_counter() - t0,
+        }
+        if debug:
+            st.caption(f"Validação: {out.attrs['validacao']['com_problema']} de {len(out)} linha(s) com problema "
+                       f"({out.attrs['validacao']['validacao_s']:.3f}s).")
+            st.dataframe(resumo, use_container_width=True)
+    return out
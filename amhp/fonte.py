@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Fonte do PDF: caminho, bytes, arquivo aberto ou mmap."""
+import io, os, mmap
+from contextlib import contextmanager
+
+# ========= Fonte do PDF (caminho ou buffer) =========
+class _LeitorBuffer(io.RawIOBase):
+    """Stream somente-leitura sobre um buffer (bytes/bytearray/memoryview) sem copiar o documento."""
+    def __init__(self, buf):
+        self._mv = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._mv) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._mv[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mv)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._mv.release()  # libera o buffer de origem (um mmap não fecha com views exportadas)
+        super().close()
+
+@contextmanager
+def abrir_fonte_pdf(fonte):
+    """
+    Entrega um stream binário com seek para PyPDF2/pdfplumber.
+    Aceita caminho (aberto via mmap), bytes, bytearray, memoryview, BytesIO/arquivo aberto ou mmap.
+    Só fecha o que foi aberto aqui; streams do chamador voltam para o início.
+    """
+    if isinstance(fonte, (str, os.PathLike)):
+        with open(fonte, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                mm = None  # arquivo vazio ou sistema sem mmap: leitura bufferizada
+            if mm is None:
+                yield f
+            else:
+                # páginas do SO sob demanda: só o que o parser toca fica residente
+                with mm:
+                    yield mm
+    elif isinstance(fonte, bytes):
+        yield io.BytesIO(fonte)  # BytesIO compartilha o buffer de bytes imutáveis
+    elif isinstance(fonte, (bytearray, memoryview)):
+        with _LeitorBuffer(fonte) as f:
+            yield f
+    elif hasattr(fonte, "read") and hasattr(fonte, "seek"):
+        fonte.seek(0)
+        yield fonte
+    else:
+        raise TypeError(f"Fonte de PDF não suportada: {type(fonte).__name__}")
+
+def tamanho_fonte_pdf(fonte) -> int:
+    if isinstance(fonte, (str, os.PathLike)):
+        return os.path.getsize(fonte)
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return memoryview(fonte).nbytes
+    if hasattr(fonte, "getbuffer"):
+        return fonte.getbuffer().nbytes
+    if hasattr(fonte, "size") and callable(fonte.size):  # mmap
+        return fonte.size()
+    return 0
+
+def contar_paginas(fonte) -> int:
+    from PyPDF2 import PdfReader
+    with abrir_fonte_pdf(fonte) as f:
+        return len(PdfReader(f).pages)
+
+def hash_pdf(fonte) -> str:
+    import hashlib
+    h = hashlib.sha256()
+    with abrir_fonte_pdf(fonte) as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Histórico das extrações em Parquet particionado por status, ano e mês."""
+import os, re
+import pandas as pd
+
+from .caminhos import PASTA_FINAL
+from .armazenamento import gravar_atomico
+from .esquema import TARGET_COLS, sanitize_value
+
+# ========= Histórico (Parquet) =========
+PASTA_HISTORICO = os.path.join(PASTA_FINAL, "historico")
+COLUNAS_HISTORICO = TARGET_COLS + ["Filtro_Negociacao", "Filtro_Status", "Filtro_Credenciado",
+                                   "Periodo_Inicio", "Periodo_Fim", "Arquivo_Origem", "Origem"]
+
+class HistoricoParquet:
+    """
+    Histórico de tudo que já foi extraído em partições status=<código>/ano=<aaaa>/mes=<mm>,
+    um arquivo por origem (reexportar a mesma unidade troca os arquivos dela). Linhas
+    ordenadas por Data: ler() poda partições pelo caminho e row groups pelas estatísticas.
+    """
+    def __init__(self, pasta: str = PASTA_HISTORICO, linhas_row_group: int = 50_000):
+        self.pasta = pasta
+        self.linhas_row_group = linhas_row_group
+
+    @staticmethod
+    def _schema():
+        import pyarrow as pa
+        return pa.schema([(c, pa.string()) for c in COLUNAS_HISTORICO] + [("Data", pa.date32())])
+
+    @staticmethod
+    def codigo_status(status: str) -> str:
+        codigo = re.sub(r"[^0-9A-Za-z]+", "_", str(status or "").split(" - ")[0]).strip("_")
+        return codigo or "sem_status"
+
+    @staticmethod
+    def _arquivo_origem(origem: str) -> str:
+        import hashlib
+        return hashlib.sha1(origem.encode("utf-8")).hexdigest()[:16] + ".parquet"
+
+    def _particoes(self):
+        """(status, ano, mes, pasta) de cada partição existente."""
+        if not os.path.isdir(self.pasta):
+            return
+        for d_st in os.scandir(self.pasta):
+            if not (d_st.is_dir() and d_st.name.startswith("status=")):
+                continue
+            for d_ano in os.scandir(d_st.path):
+                if not (d_ano.is_dir() and d_ano.name.startswith("ano=")):
+                    continue
+                for d_mes in os.scandir(d_ano.path):
+                    if d_mes.is_dir() and d_mes.name.startswith("mes="):
+                        yield d_st.name[7:], int(d_ano.name[4:]), int(d_mes.name[4:]), d_mes.path
+
+    def remover_origem(self, origem: str) -> int:
+        nome, removidos = self._arquivo_origem(origem), 0
+        for *_, pasta in list(self._particoes()):
+            try:
+                os.remove(os.path.join(pasta, nome))
+                removidos += 1
+            except FileNotFoundError:
+                pass
+        return removidos
+
+    def anexar(self, df: pd.DataFrame, origem: str, status: str = None) -> int:
+        """Grava as linhas de uma origem (substituindo o que ela tinha gravado); devolve quantas."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.remover_origem(origem)
+        if df is None or df.empty:
+            return 0
+        base = pd.DataFrame({c: (df[c].astype(str) if c in df.columns else "") for c in COLUNAS_HISTORICO}, index=df.index)
+        base["Origem"] = origem
+        if status is not None or not base["Filtro_Status"].astype(bool).any():
+            base["Filtro_Status"] = sanitize_value(status or "")
+        data = pd.to_datetime(base["Realizacao"], format="%d/%m/%Y", errors="coerce")
+        base["Data"] = data.dt.date
+        chaves = pd.DataFrame({
+            "status": base["Filtro_Status"].map(self.codigo_status),
+            "ano": data.dt.year.fillna(0).astype(int), "mes": data.dt.month.fillna(0).astype(int),
+        }, index=base.index)
+        nome = self._arquivo_origem(origem)
+        for (codigo, ano, mes), idx in chaves.groupby(["status", "ano", "mes"], sort=False).groups.items():
+            parte = base.loc[idx].sort_values("Data", kind="stable")
+            pasta = os.path.join(self.pasta, f"status={codigo}", f"ano={ano:04d}", f"mes={mes:02d}")
+            tabela = pa.Table.from_pandas(parte, schema=self._schema(), preserve_index=False)
+            with gravar_atomico(os.path.join(pasta, nome)) as tmp:
+                pq.write_table(tabela, tmp, row_group_size=self.linhas_row_group, compression="zstd")
+        return len(base)
+
+    def ler(self, data_ini=None, data_fim=None, status: list = None, colunas: list = None) -> pd.DataFrame:
+        """
+        Linhas com Realizacao entre data_ini e data_fim (dd/mm/aaaa ou date; None = sem limite),
+        dos status pedidos (textos do filtro ou códigos; None = todos), só com as colunas pedidas
+        (padrão: as da base consolidada).
+        """
+        import pyarrow.dataset as ds
+        ini = pd.to_datetime(data_ini, dayfirst=True).date() if data_ini else None
+        fim = pd.to_datetime(data_fim, dayfirst=True).date() if data_fim else None
+        codigos = {self.codigo_status(s) for s in status} if status else None
+        colunas = list(colunas or [c for c in COLUNAS_HISTORICO if c != "Origem"])
+        arquivos = []
+        for codigo, ano, mes, pasta in self._particoes():
+            if codigos is not None and codigo not in codigos:
+                continue
+            if (ini or fim) and (ano == 0 or (ini and (ano, mes) < (ini.year, ini.month))
+                                 or (fim and (ano, mes) > (fim.year, fim.month))):
+                continue
+            arquivos.extend(e.path for e in os.scandir(pasta) if e.name.endswith(".parquet"))
+        if not arquivos:
+            return pd.DataFrame(columns=colunas)
+        filtro = None
+        if ini:
+            filtro = ds.field("Data") >= ini
+        if fim:
+            filtro = ds.field("Data") <= fim if filtro is None else filtro & (ds.field("Data") <= fim)
+        tabela = ds.dataset(arquivos, schema=self._schema(), format="parquet").to_table(columns=colunas, filter=filtro)
+        return tabela.to_pandas()
+
+    def resumo(self) -> pd.DataFrame:
+        linhas = []
+        for codigo, ano, mes, pasta in self._particoes():
+            arqs = [e for e in os.scandir(pasta) if e.name.endswith(".parquet")]
+            if arqs:
+                linhas.append({"status": codigo, "ano": ano, "mes": mes, "arquivos": len(arqs),
+                               "mb": round(sum(e.stat().st_size for e in arqs) / 2**20, 2)})
+        cols = ["status", "ano", "mes", "arquivos", "mb"]
+        return pd.DataFrame(linhas, columns=cols).sort_values(["ano", "mes", "status"]).reset_index(drop=True)
+
+HISTORICO = HistoricoParquet()
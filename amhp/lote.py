@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Parse de lotes de PDFs (uploads, ZIPs ou pasta do servidor)."""
+import os, zipfile, functools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+
+from .extracao import parse_pdf_to_atendimentos_df
+
+# ========= Processamento em lote =========
+# Threads por padrão: um fork do servidor Streamlit (multithread) pode herdar travas presas.
+# AMHP_PROCESSOS_LOTE=1 usa processos por forkserver (spawn onde não houver), que importam
+# este módulo do zero e recebem só (nome, bytes ou caminho).
+PROCESSOS_LOTE = os.environ.get("AMHP_PROCESSOS_LOTE", "") not in ("", "0")
+
+def _executor_processos(workers: int) -> ProcessPoolExecutor:
+    metodo = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(metodo))
+
+def mapear_em_paralelo(func, itens: list, workers: int = None, processos: bool = None):
+    """
+    Executa func(*item) em threads (ou processos, ver PROCESSOS_LOTE; func e itens precisam
+    ser serializáveis) e gera (item, resultado, erro) conforme concluem.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(itens) or 1))
+    pendentes = list(itens)
+    executor = None
+    if PROCESSOS_LOTE if processos is None else processos:
+        try:
+            executor = _executor_processos(workers)
+        except (ValueError, OSError):
+            pass
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with executor:
+            futuros = {executor.submit(func, *item): item for item in pendentes}
+            for fut in as_completed(futuros):
+                item = futuros[fut]
+                try:
+                    yield item, fut.result(), None
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    yield item, None, e
+                pendentes.remove(item)
+    except BrokenProcessPool:
+        # processo de trabalho morreu (memória): conclui o restante em threads
+        with ThreadPoolExecutor(max_workers=workers) as tpool:
+            futuros = {tpool.submit(func, *item): item for item in pendentes}
+            for fut in as_completed(futuros):
+                try:
+                    yield futuros[fut], fut.result(), None
+                except Exception as e:
+                    yield futuros[fut], None, e
+
+def coletar_pdfs_lote(uploads, pasta_servidor: str = "") -> list:
+    """Lista (nome, fonte) a partir de uploads (PDF ou ZIP) e/ou de uma pasta/ZIP do servidor."""
+    itens = []
+
+    def _do_zip(nome_zip, arq):
+        with zipfile.ZipFile(arq) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+                    itens.append((f"{nome_zip}/{info.filename}", zf.read(info)))
+
+    for up in uploads or []:
+        if up.name.lower().endswith(".zip"):
+            _do_zip(up.name, up)
+        else:
+            itens.append((up.name, up.getvalue()))
+
+    pasta_servidor = (pasta_servidor or "").strip()
+    if pasta_servidor:
+        if os.path.isfile(pasta_servidor) and pasta_servidor.lower().endswith(".zip"):
+            _do_zip(os.path.basename(pasta_servidor), pasta_servidor)
+        elif os.path.isdir(pasta_servidor):
+            for raiz, _, arquivos in os.walk(pasta_servidor):
+                for f in sorted(arquivos):
+                    caminho = os.path.join(raiz, f)
+                    if f.lower().endswith(".pdf"):
+                        itens.append((os.path.relpath(caminho, pasta_servidor), caminho))
+                    elif f.lower().endswith(".zip"):
+                        _do_zip(os.path.relpath(caminho, pasta_servidor), caminho)
+        else:
+            raise FileNotFoundError(f"Pasta/ZIP não encontrado no servidor: {pasta_servidor}")
+    return itens
+
+def _parse_item_lote(nome: str, fonte, cache: bool = True, modo: str = "text") -> pd.DataFrame:
+    df = parse_pdf_to_atendimentos_df(fonte, mode=modo, incluir_pagina=True, cache=cache)
+    df.insert(0, "Arquivo_Origem", nome)
+    return df
+
+def processar_lote(itens: list, workers: int = None, ao_concluir=None, cache: bool = True, modo: str = "text",
+                   processos: bool = None):
+    """
+    Parse dos PDFs em paralelo: (df_unificado, falhas[arquivo, erro]), com PDFs sem linhas
+    entre as falhas. ao_concluir(feitos, total, nome, linhas_ou_None) a cada arquivo.
+    """
+    dfs, falhas, feitos = [], [], 0
+    parse_item = functools.partial(_parse_item_lote, cache=cache, modo=modo)
+    for (nome, _), df, erro in mapear_em_paralelo(parse_item, itens, workers, processos):
+        feitos += 1
+        if erro is not None:
+            falhas.append({"arquivo": nome, "erro": f"{type(erro).__name__}: {erro}"})
+        elif df.empty:
+            falhas.append({"arquivo": nome, "erro": "nenhuma linha extraída"})
+        else:
+            dfs.append(df)
+        if ao_concluir:
+            ao_concluir(feitos, len(itens), nome, None if erro is not None else len(df))
+    ordem = {nome: i for i, (nome, _) in enumerate(itens)}
+    dfs.sort(key=lambda d: ordem.get(d["Arquivo_Origem"].iat[0], 0))
+    out = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    return out, pd.DataFrame(falhas, columns=["arquivo", "erro"])
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Spans de tempo por etapa da automação (JSON lines) e exportação para Prometheus."""
+import os, json, time, uuid, threading
+from contextlib import contextmanager
+import pandas as pd
+
+from .caminhos import PASTA_FINAL
+from .perfil import etapa_perfil
+
+# ========= Métricas de execução =========
+ARQUIVO_METRICAS = os.path.join(PASTA_FINAL, "metricas_etapas.jsonl")
+
+class MedidorEtapas:
+    """
+    Cronometra as etapas de uma execução (login, TISS, busca, exportação, parse...).
+    Cada etapa vira um span {run_id, etapa, inicio, duracao_s, ...atributos}
+    gravado em JSON lines para comparação entre execuções.
+    """
+    _trava = threading.Lock()  # várias sessões gravam no mesmo arquivo
+
+    def __init__(self, arquivo: str = ARQUIVO_METRICAS, run_id: str = None):
+        self.arquivo = arquivo
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.spans = []
+
+    @contextmanager
+    def etapa(self, nome: str, **attrs):
+        span = {"run_id": self.run_id, "etapa": nome, "inicio": round(time.time(), 3), **attrs}
+        t0 = time.perf_counter()
+        try:
+            with etapa_perfil(nome):
+                yield span  # o chamador pode anexar atributos (linhas, pdf_bytes...)
+        except Exception as e:
+            span["erro"] = type(e).__name__
+            raise
+        finally:
+            span["duracao_s"] = round(time.perf_counter() - t0, 4)
+            self.spans.append(span)
+            self._gravar(span)
+
+    def _gravar(self, span: dict):
+        try:
+            with self._trava, open(self.arquivo, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+def carregar_metricas(arquivo: str = ARQUIVO_METRICAS, ultimas_execucoes: int = 50) -> pd.DataFrame:
+    if not os.path.exists(arquivo):
+        return pd.DataFrame()
+    spans = []
+    with open(arquivo, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                spans.append(json.loads(linha))
+            except ValueError:
+                continue
+    df = pd.DataFrame(spans)
+    if df.empty:
+        return df
+    runs = df.drop_duplicates("run_id", keep="last")["run_id"].tail(ultimas_execucoes)
+    return df[df["run_id"].isin(runs)]
+
+def resumo_metricas(df: pd.DataFrame) -> pd.DataFrame:
+    """p50/p95 por etapa ao longo das execuções."""
+    if df.empty:
+        return pd.DataFrame(columns=["etapa","execucoes","p50_s","p95_s","total_s"])
+    g = df.groupby("etapa", sort=False)["duracao_s"]
+    out = pd.DataFrame({
+        "execucoes": df.groupby("etapa", sort=False)["run_id"].nunique(),
+        "p50_s": g.quantile(0.5),
+        "p95_s": g.quantile(0.95),
+        "total_s": g.sum(),
+    }).round(3)
+    return out.reset_index()
+
+def _rotulo_prometheus(valor) -> str:
+    """Valor de rótulo escapado como pede o formato texto do Prometheus (\\, \" e quebra de linha)."""
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metricas_prometheus(df: pd.DataFrame) -> str:
+    """Exporta os spans no formato texto do Prometheus (summary por etapa)."""
+    nome = "amhp_etapa_duracao_segundos"
+    linhas = [
+        f"# HELP {nome} Duracao das etapas da automacao AMHP",
+        f"# TYPE {nome} summary",
+    ]
+    if not df.empty:
+        for etapa, g in df.groupby("etapa", sort=False):
+            d, etapa = g["duracao_s"], _rotulo_prometheus(etapa)
+            for q in (0.5, 0.95):
+                linhas.append(f'{nome}{{etapa="{etapa}",quantile="{q}"}} {d.quantile(q):.4f}')
+            linhas.append(f'{nome}_sum{{etapa="{etapa}"}} {d.sum():.4f}')
+            linhas.append(f'{nome}_count{{etapa="{etapa}"}} {len(d)}')
+        parse = df[df["etapa"] == "parse"]
+        for col, met, ajuda in (("linhas", "amhp_linhas_extraidas_total", "Linhas extraidas dos PDFs"),
+                                ("pdf_bytes", "amhp_pdf_bytes_total", "Bytes de PDF processados")):
+            if col in parse.columns and not parse.empty:
+                linhas += [f"# HELP {met} {ajuda}", f"# TYPE {met} counter"]
+                tot = pd.to_numeric(parse[col], errors="coerce").fillna(0)
+                for status, v in tot.groupby(parse["status"].fillna("")).sum().items():
+                    linhas.append(f'{met}{{status="{_rotulo_prometheus(status)}"}} {int(v)}')
+    return "\n".join(linhas) + "\n"
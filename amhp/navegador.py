@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""Chrome headless: configuração, downloads, exportação em memória e vagas de navegador por servidor."""
+import os, json, time, shutil, threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+
+from .caminhos import PASTA_FINAL, DOWNLOAD_TEMPORARIO
+
+# ========= Selenium =========
+# Navegação enxuta: o portal e o AMHPTISS só precisam de HTML, JS e CSS (ASP.NET/Telerik).
+# Imagens, fontes e rastreadores são bloqueados via CDP.
+LEAN_BLOQUEAR = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*/analytics.js*", "*/gtag/js*",
+]
+# Recursos que as páginas ASP.NET/Telerik/ReportViewer precisam; nenhum padrão de bloqueio pode atingi-los.
+LEAN_PERMITIR = [
+    "WebResource.axd", "ScriptResource.axd", "Telerik.Web.UI.WebResource.axd",
+    "Reserved.ReportViewerWebControl.axd", ".aspx", ".js", ".css",
+]
+
+def _padroes_bloqueio() -> list:
+    extra = [p.strip() for p in os.environ.get("AMHP_LEAN_BLOQUEAR", "").split(",") if p.strip()]
+    padroes = []
+    for p in LEAN_BLOQUEAR + extra:
+        alvo = p.strip("*").lower()
+        # padrão genérico demais (ex.: "*.js", "*.axd") atingiria um recurso protegido
+        if not alvo or any(alvo in ok.lower() for ok in LEAN_PERMITIR):
+            continue
+        padroes.append(p)
+    return padroes
+
+def aplicar_navegacao_enxuta(driver):
+    """Aplica o bloqueio de recursos na aba atual (CDP vale por aba; reaplicar após trocar de janela)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _padroes_bloqueio()})
+    except Exception:
+        pass
+
+def configurar_driver(enxuto: bool = False, pasta_download: str = DOWNLOAD_TEMPORARIO, eventos_download: bool = False):
+    opts = Options()
+    chrome_binary = os.environ.get("CHROME_BINARY", "/usr/bin/chromium")
+    driver_binary = os.environ.get("CHROMEDRIVER_BINARY", "/usr/bin/chromedriver")
+
+    if os.path.exists(chrome_binary):
+        opts.binary_location = chrome_binary
+
+    opts.add_argument("--headless=new")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--window-size=1920,1080")
+
+    if enxuto:
+        # DOMContentLoaded basta: todas as etapas seguintes esperam elementos explicitamente
+        opts.page_load_strategy = "eager"
+        for arg in (
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--no-first-run",
+            "--metrics-recording-only",
+            "--disable-features=Translate,OptimizationHints,MediaRouter",
+            "--blink-settings=imagesEnabled=false",
+        ):
+            opts.add_argument(arg)
+
+    prefs = {
+        "download.default_directory": pasta_download,
+        "download.prompt_for_download": False,
+        "plugins.always_open_pdf_externally": True,
+    }
+    opts.add_experimental_option("prefs", prefs)
+    if eventos_download:
+        # Log de performance: é por ele que os eventos de download do DevTools chegam ao Python
+        # (RastreadorDownloads); sem ele o rastreador vigia a pasta
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        opts.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
+
+    if os.path.exists(driver_binary):
+        service = Service(executable_path=driver_binary)
+        driver = webdriver.Chrome(service=service, options=opts)
+    else:
+        driver = webdriver.Chrome(options=opts)
+
+    driver.set_page_load_timeout(180)
+    driver.set_script_timeout(180)
+    if enxuto:
+        aplicar_navegacao_enxuta(driver)
+    return driver
+
+# ========= Downloads via DevTools =========
+class RastreadorDownloads:
+    """
+    Acompanha os downloads pelos eventos do DevTools (log de performance): cada arquivo é
+    gravado como <pasta>/<guid> e o evento diz quando concluiu. Com eventos=False só a
+    pasta é vigiada.
+    """
+    EVENTOS_INICIO   = ("Browser.downloadWillBegin", "Page.downloadWillBegin")
+    EVENTOS_PROGRESSO = ("Browser.downloadProgress", "Page.downloadProgress")
+
+    def __init__(self, driver, pasta: str, eventos: bool = True):
+        self.driver = driver
+        self.pasta = pasta
+        self.downloads = {}  # guid -> {"nome", "estado", "inicio", "fim"}
+        os.makedirs(pasta, exist_ok=True)
+        self.com_eventos = self._configurar() and eventos
+
+    def _configurar(self) -> bool:
+        try:
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allowAndName", "downloadPath": self.pasta, "eventsEnabled": True,
+            })
+            return True
+        except Exception:
+            try:
+                self.driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": self.pasta})
+            except Exception:
+                pass
+            return False
+
+    def _consumir_eventos(self):
+        if not self.com_eventos:
+            return
+        try:
+            entradas = self.driver.get_log("performance")
+        except Exception:
+            return
+        for entrada in entradas:
+            try:
+                msg = json.loads(entrada["message"])["message"]
+            except (KeyError, ValueError, TypeError):
+                continue
+            metodo, params = msg.get("method"), msg.get("params", {})
+            if metodo in self.EVENTOS_INICIO:
+                self.downloads[params["guid"]] = {
+                    "nome": params.get("suggestedFilename", ""), "estado": "inProgress",
+                    "inicio": time.time(), "fim": None,
+                }
+            elif metodo in self.EVENTOS_PROGRESSO:
+                d = self.downloads.setdefault(params["guid"], {"nome": "", "inicio": time.time(), "fim": None})
+                d["estado"] = params.get("state", "inProgress")
+                if d["estado"] in ("completed", "canceled"):
+                    d["fim"] = d["fim"] or time.time()
+
+    def armar(self):
+        """Descarta eventos antigos; chamar logo antes do clique que dispara o download."""
+        self._consumir_eventos()
+        self._vistos = set(self.downloads) | set(os.listdir(self.pasta))
+
+    def aguardar(self, timeout: float = 60, intervalo: float = 0.25):
+        """
+        Espera o próximo download disparado após armar().
+        Retorna {"guid","nome","caminho"} ou None se nada concluir dentro do timeout.
+        """
+        vistos = getattr(self, "_vistos", set())
+        limite = time.time() + timeout
+        while time.time() < limite:
+            self._consumir_eventos()
+            for guid, d in self.downloads.items():
+                if guid in vistos:
+                    continue
+                if d.get("estado") == "canceled":
+                    vistos.add(guid)
+                    continue
+                caminho = os.path.join(self.pasta, guid)
+                if d.get("estado") == "completed" and os.path.exists(caminho):
+                    vistos.add(guid)
+                    return {"guid": guid, "nome": d["nome"], "caminho": caminho}
+            if not self.com_eventos or not self.downloads:
+                # Sem eventos do DevTools: a pasta é exclusiva do job, então basta um arquivo novo estável
+                novo = self._arquivo_novo_estavel(vistos)
+                if novo:
+                    vistos.add(os.path.basename(novo))
+                    return {"guid": None, "nome": os.path.basename(novo), "caminho": novo}
+            time.sleep(intervalo)
+        return None
+
+    def _arquivo_novo_estavel(self, vistos: set):
+        for f in os.listdir(self.pasta):
+            if f in vistos or f.endswith((".crdownload", ".tmp")):
+                continue
+            caminho = os.path.join(self.pasta, f)
+            try:
+                tam = os.path.getsize(caminho)
+                time.sleep(0.2)
+                if tam > 0 and tam == os.path.getsize(caminho):
+                    return caminho
+            except OSError:
+                continue
+        return None
+
+# ========= Exportação em memória =========
+# Descobre a URL de exportação do ReportViewer (SSRS) a partir da página do relatório
+JS_URL_EXPORTACAO = r"""
+const fmt = arguments[0];
+try {
+    const rv = (window.$find && $find('ReportView')) || null;
+    const iv = rv && rv._getInternalViewer ? rv._getInternalViewer() : null;
+    if (iv && iv.ExportUrlBase) return iv.ExportUrlBase + fmt;
+} catch (e) {}
+for (const k of Object.keys(window)) {
+    try {
+        const o = window[k];
+        if (o && typeof o === 'object' && typeof o.ExportUrlBase === 'string') return o.ExportUrlBase + fmt;
+    } catch (e) {}
+}
+const m = document.documentElement.innerHTML.match(/ExportUrlBase["']?\s*[:=]\s*["']([^"']+)["']/);
+if (m) {
+    const base = m[1].replace(/\\u0026/g, '&').replace(/\\\//g, '/').replace(/&amp;/g, '&');
+    return new URL(base + fmt, document.baseURI).href;
+}
+return null;
+"""
+
+# Baixa a URL com a sessão autenticada da própria página e guarda os bytes em window.__amhpPdf
+JS_FETCH_PDF = r"""
+const url = arguments[0], done = arguments[arguments.length - 1];
+fetch(url, {credentials: 'include'})
+    .then(r => { if (!r.ok) throw new Error('HTTP ' + r.status); return r.arrayBuffer(); })
+    .then(buf => { window.__amhpPdf = new Uint8Array(buf); done({ok: true, tamanho: buf.byteLength}); })
+    .catch(e => done({ok: false, erro: String(e)}));
+"""
+
+JS_LER_BLOCO = r"""
+const a = arguments[0], b = arguments[1], bytes = window.__amhpPdf.subarray(a, b);
+let bin = '';
+for (let i = 0; i < bytes.length; i += 0x8000) bin += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+return btoa(bin);
+"""
+
+def baixar_pdf_em_memoria(driver, formato: str = "PDF", bloco: int = 4 * 1024 * 1024) -> bytes:
+    """
+    Exporta o relatório buscando a URL de exportação de dentro da página autenticada
+    (fetch + base64 em blocos), sem passar pela pasta de downloads.
+    Deve ser chamada com o driver já no iframe do ReportViewer.
+    """
+    import base64
+    url = driver.execute_script(JS_URL_EXPORTACAO, formato)
+    if not url:
+        raise RuntimeError("URL de exportação do ReportViewer não encontrada")
+    res = driver.execute_async_script(JS_FETCH_PDF, url)
+    if not res or not res.get("ok"):
+        raise RuntimeError(f"Falha no fetch da exportação: {(res or {}).get('erro')}")
+    tamanho = int(res["tamanho"])
+    partes = []
+    try:
+        for ini in range(0, tamanho, bloco):
+            partes.append(base64.b64decode(driver.execute_script(JS_LER_BLOCO, ini, min(ini + bloco, tamanho))))
+    finally:
+        driver.execute_script("delete window.__amhpPdf;")
+    dados = b"".join(partes)
+    if not dados.startswith(b"%PDF"):
+        raise RuntimeError("Resposta da exportação não é um PDF")
+    return dados
+
+# ⚡ CORREÇÃO: clique seguro com retry + scroll
+def js_safe_click(driver, by, value, timeout=30, retries=3):
+    for attempt in range(retries):
+        try:
+            el = WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((by, value))
+            )
+            driver.execute_script("arguments[0].scrollIntoView(true);", el)
+            driver.execute_script("arguments[0].click();", el)
+            return
+        except (TimeoutException, ElementClickInterceptedException):
+            time.sleep(1)
+            if attempt == retries - 1:
+                raise
+
+# ========= Sessões e vagas de navegador =========
+# Cada sessão do Streamlit (aba de usuário) trabalha numa pasta própria por execução;
+# os navegadores são o recurso caro do servidor e ficam limitados por uma fila global.
+PASTA_SESSOES = os.path.join(PASTA_FINAL, "sessoes")
+MB_POR_NAVEGADOR = int(os.environ.get("AMHP_MB_POR_NAVEGADOR", "700"))  # Chrome headless + chromedriver
+RESERVA_MB = int(os.environ.get("AMHP_RESERVA_MB", "768"))              # Streamlit, parse e SO
+
+def pasta_trabalho(sessao_id: str, run_id: str) -> str:
+    """Pasta da execução: PDFs arquivados e screenshots de erro não colidem entre usuários."""
+    path = os.path.join(PASTA_SESSOES, sessao_id, run_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+VALIDADE_SESSOES_S = float(os.environ.get("AMHP_SESSOES_TTL_H", "24")) * 3600
+
+def podar_pastas_trabalho(validade_s: float = VALIDADE_SESSOES_S) -> int:
+    """Apaga as execuções sem escrita há mais de `validade_s` (e as sessões que ficarem vazias); devolve quantas."""
+    limite, removidas = time.time() - validade_s, 0
+    if not os.path.isdir(PASTA_SESSOES):
+        return 0
+    for sessao in os.scandir(PASTA_SESSOES):
+        if not sessao.is_dir():
+            continue
+        for run in os.scandir(sessao.path):
+            if not run.is_dir():
+                continue
+            try:
+                recente = max([run.stat().st_mtime] + [
+                    os.path.getmtime(os.path.join(raiz, n))
+                    for raiz, _, nomes in os.walk(run.path) for n in nomes
+                ])
+            except OSError:
+                continue
+            if recente < limite:
+                shutil.rmtree(run.path, ignore_errors=True)
+                removidas += 1
+        try:
+            os.rmdir(sessao.path)  # só se ficou vazia
+        except OSError:
+            pass
+    return removidas
+
+def memoria_disponivel_mb() -> float:
+    try:
+        with open("/proc/meminfo") as f:
+            for linha in f:
+                if linha.startswith("MemAvailable:"):
+                    return int(linha.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024.0 ** 2
+    except (ValueError, OSError, AttributeError):
+        return 0.0
+
+def vagas_navegador() -> int:
+    """Quantos navegadores cabem na RAM livre (AMHP_MAX_NAVEGADORES fixa o valor)."""
+    fixo = os.environ.get("AMHP_MAX_NAVEGADORES", "").strip()
+    if fixo.isdigit() and int(fixo) > 0:
+        return int(fixo)
+    return max(1, int((memoria_disponivel_mb() - RESERVA_MB) // MB_POR_NAVEGADOR))
+
+class FilaNavegadores:
+    """
+    Vagas de navegador compartilhadas pelas sessões do processo. Atende primeiro a sessão
+    com menos vagas em uso (no empate, quem chegou antes); execuções longas cedem a vaga
+    entre unidades quando outra sessão espera (deve_ceder).
+    """
+    def __init__(self, vagas: int):
+        self.vagas = max(1, int(vagas))
+        self._cond = threading.Condition()
+        self._em_uso = {}   # sessao -> vagas ocupadas
+        self._espera = []   # [(senha, sessao)]
+        self._senhas = 0
+
+    def _ordem(self) -> list:
+        return sorted(self._espera, key=lambda t: (self._em_uso.get(t[1], 0), t[0]))
+
+    def _livres(self) -> int:
+        return self.vagas - sum(self._em_uso.values())
+
+    def situacao(self) -> dict:
+        with self._cond:
+            return {"vagas": self.vagas, "em_uso": sum(self._em_uso.values()), "esperando": len(self._espera)}
+
+    def deve_ceder(self, sessao: str) -> bool:
+        """Há outra sessão esperando e nenhuma vaga livre para ela?"""
+        with self._cond:
+            return self._livres() <= 0 and any(s != sessao for _, s in self._espera)
+
+    def entrar(self, sessao: str, ao_esperar=None, timeout: float = None):
+        """Bloqueia até haver vaga para `sessao`; ao_esperar(posicao) é chamado quando a posição muda."""
+        with self._cond:
+            self._senhas += 1
+            senha = (self._senhas, sessao)
+            self._espera.append(senha)
+        limite = None if timeout is None else time.monotonic() + timeout
+        ultima = None
+        try:
+            while True:
+                with self._cond:
+                    ordem = self._ordem()
+                    if self._livres() > 0 and ordem[0] == senha:
+                        self._espera.remove(senha)
+                        self._em_uso[sessao] = self._em_uso.get(sessao, 0) + 1
+                        break
+                    posicao = ordem.index(senha) + 1
+                    if posicao == ultima:
+                        if limite is not None and time.monotonic() > limite:
+                            raise TimeoutError(f"sem vaga de navegador após {timeout:g}s (posição {posicao})")
+                        self._cond.wait(1.0)
+                        continue
+                ultima = posicao
+                if ao_esperar:
+                    ao_esperar(posicao)  # fora da trava: pode escrever na interface
+        except BaseException:
+            with self._cond:
+                if senha in self._espera:
+                    self._espera.remove(senha)
+                self._cond.notify_all()
+            raise
+
+    def sair(self, sessao: str):
+        with self._cond:
+            self._em_uso[sessao] -= 1
+            if not self._em_uso[sessao]:
+                del self._em_uso[sessao]
+            self._cond.notify_all()
+
+    @contextmanager
+    def vaga(self, sessao: str, ao_esperar=None, timeout: float = None):
+        self.entrar(sessao, ao_esperar, timeout)
+        try:
+            yield
+        finally:
+            self.sair(sessao)
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""Parsers do relatório de atendimentos: textual e por coordenadas."""
+import os, re, json, bisect, threading
+import numpy as np
+import pandas as pd
+
+from .caminhos import PASTA_FINAL
+from .armazenamento import gravar_atomico
+from .esquema import TARGET_COLS, ensure_atendimentos_schema, _normalize_ws
+from .backends import obter_backend
+
+# ========= Parser PDF (textual fallback) =========
+# Regex para capturar o início do registro (Atendimento e Guia são iguais e têm 8 dígitos)
+# Ex: 63974312 63974312 13/01/2026
+_RECORD_START_RE = re.compile(r"(\d{8})\s+(\d{8})\s+(\d{2}/\d{2}/\d{4})")
+_VAL_RE = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})")
+# Texto normalizado (espaços simples): um início de registro tem no máximo 28 caracteres
+_CAUDA_SEM_REGISTRO = 64
+
+def _registro_texto(chunk: str, atend: str, guia: str, data: str) -> dict:
+    # Tenta pegar a hora logo após a data
+    hora_match = re.search(r"(\d{2}:\d{2})", chunk)
+    hora = hora_match.group(1) if hora_match else ""
+
+    # Extração do Valor (último valor monetário do bloco)
+    valores = _VAL_RE.findall(chunk)
+    valor_total = valores[-1] if valores else "0,00"
+
+    # --- Lógica para o Miolo (Tipo Guia, Operadora, Beneficiário, Prestador, Credenciado) ---
+    # Removemos o que já pegamos para limpar a busca
+    miolo = chunk.replace(atend, "").replace(guia, "").replace(data, "").replace(valor_total, "").strip()
+    
+    # Identifica códigos de Prestador/Credenciado (padrão 000000-)
+    codes = list(re.finditer(r"(\d{5,7}-)", miolo))
+    
+    prestador = ""
+    credenciado = ""
+    
+    if len(codes) >= 2:
+        # O AMHP costuma colocar o Prestador antes do Credenciado ou vice-versa no texto extraído
+        # Mas quase sempre o penúltimo código é o Prestador e o último é o Credenciado (ou o contrário)
+        # Vamos capturar os blocos de texto que começam com esses códigos
+        p1_idx = codes[-2].start()
+        p2_idx = codes[-1].start()
+        
+        # Geralmente o Credenciado é a Clínica Diogenes Serquiz (014406)
+        # Vamos identificar pelo conteúdo
+        parte_a = miolo[p1_idx:p2_idx].strip()
+        parte_b = miolo[p2_idx:].strip()
+        
+        if "014406" in parte_a:
+            credenciado = parte_a
+            prestador = parte_b
+        else:
+            prestador = parte_a
+            credenciado = parte_b
+        
+        miolo_restante = miolo[:p1_idx].strip()
+    else:
+        miolo_restante = miolo
+
+    # Tipo de Guia e Operadora (Consulta, SP/SADT, etc)
+    tipos_conhecidos = ["Consulta", "SP/SADT", "Não TISS", "SADT"]
+    tipo_guia = ""
+    for t in tipos_conhecidos:
+        if t in miolo_restante:
+            tipo_guia = t
+            break
+    
+    # O que sobrar no miolo_restante costuma ser "Operadora + Matrícula + Beneficiário"
+    # Ex: "BACEN(104) 8787234X030501 Alynne Marques Silva"
+    info_ben = miolo_restante.replace(tipo_guia, "").replace(hora, "").strip()
+    
+    # Regex para pegar a Operadora com código: ex BACEN(104)
+    ope_match = re.search(r"([A-Z\s\-\.]+\(\w+\))", info_ben)
+    operadora = ope_match.group(1) if ope_match else ""
+    
+    # O restante após a operadora
+    pos_ope = info_ben.find(operadora) + len(operadora) if operadora else 0
+    sobra = info_ben[pos_ope:].strip()
+    
+    # Se houver um número longo, é a matrícula
+    mat_match = re.search(r"(\d{5,})", sobra)
+    matricula = mat_match.group(1) if mat_match else ""
+    beneficiario = sobra.replace(matricula, "").strip()
+
+    return {
+        "Atendimento": atend,
+        "NrGuia": guia,
+        "Realizacao": data,
+        "Hora": hora,
+        "TipoGuia": tipo_guia,
+        "Operadora": operadora,
+        "Matricula": matricula,
+        "Beneficiario": beneficiario,
+        "Credenciado": credenciado,
+        "Prestador": prestador,
+        "ValorTotal": valor_total,
+    }
+
+def _pagina_em(marcas: list, pos: int) -> int:
+    """Página do offset `pos`, dadas as marcas [(offset, n_pagina)] do texto."""
+    return marcas[bisect.bisect_right([o for o, _ in marcas], pos) - 1][1]
+
+def _cortar_marcas(marcas: list, corte: int) -> list:
+    i = bisect.bisect_right([o for o, _ in marcas], corte) - 1
+    return [(0, marcas[i][1])] + [(o - corte, pg) for o, pg in marcas[i + 1:]]
+
+def _juntar_texto(pendente: str, marcas: list, txt: str, marcas_txt: list):
+    """pendente + " " + txt (como no texto do documento inteiro), com as marcas de txt deslocadas."""
+    if not pendente:
+        return txt, list(marcas_txt)
+    desloc = len(pendente) + 1
+    return f"{pendente} {txt}", marcas + [(o + desloc, pg) for o, pg in marcas_txt]
+
+def _registros_entre(texto: str, marcas: list, matches: list) -> list:
+    """Registros entre inícios consecutivos (o último início fica de fora: ainda aberto)."""
+    return [{**_registro_texto(texto[m.start():prox.start()].strip(), *m.groups()), "Pagina": _pagina_em(marcas, m.start())}
+            for m, prox in zip(matches, matches[1:])]
+
+def _avancar_pendente(pendente: str, marcas: list):
+    """(registros fechados, pendente, marcas): mantém só o registro aberto ou a cauda onde um início pode estar cortado."""
+    matches = list(_RECORD_START_RE.finditer(pendente))
+    registros = _registros_entre(pendente, marcas, matches)
+    corte = matches[-1].start() if matches else max(0, len(pendente) - _CAUDA_SEM_REGISTRO)
+    if corte:
+        marcas, pendente = _cortar_marcas(marcas, corte), pendente[corte:]
+    return registros, pendente, marcas
+
+def _registro_final(pendente: str, marcas: list) -> list:
+    m = _RECORD_START_RE.match(pendente)
+    return [{**_registro_texto(pendente.strip(), *m.groups()), "Pagina": _pagina_em(marcas, 0)}] if m else []
+
+def iter_registros_texto(fonte, backend=None, paginas=None):
+    """
+    Parser textual em fluxo: gera (n_pagina, total_paginas, registros) a cada página.
+    Só o texto desde o último registro aberto fica em memória, completado pela página
+    seguinte; o resultado é o mesmo de segmentar o documento inteiro.
+    """
+    pendente = ""   # texto ainda sem registro fechado
+    marcas = []     # [(offset em `pendente`, n_pagina)] para atribuir a página de cada registro
+
+    for n_pag, total, txt in obter_backend(backend, "text").textos(fonte, paginas):
+        txt = _normalize_ws(txt)
+        if not txt:
+            yield n_pag, total, []
+            continue
+        pendente, marcas = _juntar_texto(pendente, marcas, txt, [(0, n_pag)])
+        registros, pendente, marcas = _avancar_pendente(pendente, marcas)
+        yield n_pag, total, registros
+
+    registros = _registro_final(pendente, marcas)
+    if registros:
+        yield n_pag, total, registros
+
+# ========= Parser PDF (coordenadas) =========
+# Tolerâncias (pontos PDF)
+TOP_TOL      = 4.5
+MERGE_GAP_X  = 10.0
+COL_MARGIN   = 4.0
+_VAL_LINE_RE   = re.compile(r"\d{1,3}(?:\.\d{3})*,\d{2}$")
+_CODE_START_RE = re.compile(r"\d{3,6}-")
+
+def _mapear_bloco_cabecalho(txt: str):
+    t = txt.lower()
+    if "atendimento" in t:                   return "Atendimento"
+    if "nr" in t and "guia" in t:            return "NrGuia"
+    if "realiza" in t:                       return "Realizacao"
+    if "hora" in t:                          return "Hora"
+    if "tipo" in t and "guia" in t:          return "TipoGuia"
+    if "operadora" in t:                     return "Operadora"
+    if "matr" in t:                          return "Matricula"
+    if "benef" in t:                         return "Beneficiario"
+    if "credenciado" in t:                   return "Credenciado"
+    if "prestador" in t:                     return "Prestador"
+    if "valor" in t and "total" in t:        return "ValorTotal"
+    return None
+
+class _IndiceVertical:
+    """
+    Palavras da página agrupadas em faixas de altura TOP_TOL: a banda de um `top` só consulta
+    3 faixas. A primeira consulta da página é uma varredura simples (o caso comum: uma única
+    palavra "Atendimento"); as faixas só são montadas a partir da segunda.
+    """
+    def __init__(self, words: list):
+        self.words = words
+        self.faixas = None
+        self.consultas = 0
+
+    def banda(self, y: float) -> list:
+        """Palavras com |top - y| < TOP_TOL, na ordem original da página."""
+        self.consultas += 1
+        if self.consultas == 1:
+            return [w for w in self.words if abs(w["top"] - y) < TOP_TOL]
+        if self.faixas is None:
+            self.faixas = {}
+            for i, w in enumerate(self.words):
+                self.faixas.setdefault(int(w["top"] // TOP_TOL), []).append(i)
+        k = int(y // TOP_TOL)
+        idx = sorted(i for f in (k - 1, k, k + 1) for i in self.faixas.get(f, ())
+                     if abs(self.words[i]["top"] - y) < TOP_TOL)
+        return [self.words[i] for i in idx]
+
+def _banda_cabecalho(indice: _IndiceVertical):
+    """(header_y, palavras do cabeçalho em ordem de x0) ou (None, [])."""
+    for w in indice.words:
+        if "Atendimento" in w["text"]:
+            band = indice.banda(w["top"])
+            band_text = " ".join([b["text"] for b in band])
+            if ("Valor" in band_text) and ("Total" in band_text):
+                return w["top"], sorted(band, key=lambda z: z["x0"])
+    return None, []
+
+def _colunas_cabecalho(header_words: list) -> list:
+    # Blocos do cabeçalho
+    blocks, cur = [], [header_words[0]]
+    for w in header_words[1:]:
+        if (w["x0"] - cur[-1]["x1"]) <= MERGE_GAP_X:
+            cur.append(w)
+        else:
+            blocks.append(cur); cur = [w]
+    blocks.append(cur)
+
+    columns = []
+    for bl in blocks:
+        name = _mapear_bloco_cabecalho(" ".join([b["text"] for b in bl]))
+        if name:
+            columns.append({"name": name, "x0": min([b["x0"] for b in bl]), "x1": max([b["x1"] for b in bl])})
+    return sorted(columns, key=lambda c: c["x0"])
+
+class ModelosLayout:
+    """
+    Layouts do relatório já vistos pelo parser por coordenadas (tamanho da página + texto do
+    cabeçalho → colunas), guardados em JSON. Um modelo só vale se as âncoras do cabeçalho
+    baterem com a página; senão a detecção completa roda e registra um novo.
+    """
+    TOL_X = 1.0  # pontos
+
+    def __init__(self, arquivo: str = "", limite: int = 32):
+        self.arquivo, self.limite = arquivo, limite
+        self._trava = threading.Lock()
+        self._modelos = None  # {chave: modelo}, do mais antigo ao mais recente; carregado sob demanda
+
+    @staticmethod
+    def _prefixo(tamanho) -> str:
+        return f"{round(tamanho[0])}x{round(tamanho[1])}|"
+
+    def _carregar(self) -> dict:
+        if self._modelos is None:
+            self._modelos = {}
+            if self.arquivo:
+                try:
+                    with open(self.arquivo, encoding="utf-8") as f:
+                        self._modelos = dict(json.load(f))
+                except (OSError, ValueError, TypeError):
+                    pass
+        return self._modelos
+
+    def do_tamanho(self, tamanho) -> list:
+        """Modelos para páginas deste tamanho, do usado mais recentemente ao mais antigo."""
+        prefixo = self._prefixo(tamanho)
+        with self._trava:
+            return [m for k, m in reversed(self._carregar().items()) if k.startswith(prefixo)]
+
+    def conferir(self, modelo: dict, indice: _IndiceVertical):
+        """header_y da página se a banda do cabeçalho bater com as âncoras do modelo; senão None."""
+        ancoras = modelo["ancoras"]
+        ref = ancoras[modelo["referencia"]]
+        for w in indice.words:
+            if w["text"] != ref["text"] or abs(w["x0"] - ref["x0"]) > self.TOL_X:
+                continue
+            band = sorted(indice.banda(w["top"]), key=lambda z: z["x0"])
+            if len(band) == len(ancoras) and all(
+                b["text"] == a["text"] and abs(b["x0"] - a["x0"]) <= self.TOL_X and abs(b["x1"] - a["x1"]) <= self.TOL_X
+                for b, a in zip(band, ancoras)
+            ):
+                return w["top"]
+        return None
+
+    def registrar(self, tamanho, header_words: list, columns: list) -> dict:
+        chave = self._prefixo(tamanho) + " ".join(w["text"] for w in header_words)
+        modelo = {
+            "ancoras": [{"text": w["text"], "x0": w["x0"], "x1": w["x1"]} for w in header_words],
+            "referencia": next(i for i, w in enumerate(header_words) if "Atendimento" in w["text"]),
+            "columns": columns,
+        }
+        with self._trava:
+            modelos = self._carregar()
+            modelos.pop(chave, None)
+            modelos[chave] = modelo
+            while len(modelos) > self.limite:
+                modelos.pop(next(iter(modelos)))
+            if self.arquivo:
+                try:
+                    with gravar_atomico(self.arquivo) as tmp, open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(modelos, f, ensure_ascii=False)
+                except OSError:
+                    pass
+        return modelo
+
+ARQUIVO_LAYOUTS = os.path.join(PASTA_FINAL, "layouts_pdf.json")
+MODELOS_LAYOUT = ModelosLayout(ARQUIVO_LAYOUTS)
+
+def _registros_tabela(tbls) -> list:
+    """Fallback para páginas sem cabeçalho reconhecível: primeira tabela do extract_tables."""
+    if not tbls:
+        return []
+    df = pd.DataFrame(tbls[0])
+    if df.empty:
+        return []
+    df.columns = df.iloc[0]
+    df = ensure_atendimentos_schema(df.iloc[1:].dropna(how="all", axis=1))
+    return [{k: str(r.get(k, "")).strip() for k in TARGET_COLS} for _, r in df.iterrows()]
+
+# Palavras da página em arranjo estruturado: coordenadas contíguas + índice do texto
+_DTYPE_PALAVRAS = np.dtype([("x0", "f8"), ("x1", "f8"), ("top", "f8"), ("bottom", "f8"), ("idx", "i4")])
+
+def _palavras_array(words: list):
+    """(arranjo _DTYPE_PALAVRAS, textos) a partir das palavras {"text","x0","x1","top","bottom"}."""
+    arr = np.fromiter(((w["x0"], w["x1"], w["top"], w["bottom"], i) for i, w in enumerate(words)),
+                      dtype=_DTYPE_PALAVRAS, count=len(words))
+    return arr, [w["text"] for w in words]
+
+def _registros_coords(words: list, header_y, columns: list) -> list:
+    """header_y None: página sem cabeçalho (colunas de um modelo), todas as palavras são dados."""
+    arr, textos = _palavras_array(words)
+
+    # Palavras de dados; corta no primeiro "Total"
+    dados = arr if header_y is None else arr[arr["top"] > header_y + TOP_TOL]
+    # o texto "Total" é raro: só as palavras de 5 letras passam pelo lower()
+    total_idx = next((i for i in dados["idx"].tolist() if len(textos[i]) == 5 and textos[i].lower() == "total"), None)
+    if total_idx is not None:
+        dados = dados[dados["top"] < arr["top"][total_idx] - TOP_TOL]
+    if not len(dados):
+        return []
+
+    # Bandas (linhas): ordena por (top arredondado, x0) e abre banda nova a cada salto > TOP_TOL
+    dados = dados[np.lexsort((dados["x0"], np.round(dados["top"], 1)))]
+    banda = np.concatenate(([0], np.cumsum(np.abs(np.diff(dados["top"])) > TOP_TOL)))
+
+    # Coluna de centro mais próximo: busca binária nos pontos médios entre centros vizinhos
+    centros = np.array([(c["x0"] + c["x1"]) / 2.0 for c in columns])
+    ordem_c = np.argsort(centros, kind="stable")
+    cs = centros[ordem_c]
+    coluna = ordem_c[np.searchsorted((cs[1:] + cs[:-1]) / 2.0, (dados["x0"] + dados["x1"]) / 2.0, side="left")]
+
+    # Células: agrupa (banda, coluna) com as palavras em ordem de x0
+    ordem = np.lexsort((dados["x0"], coluna, banda))
+    banda, coluna, idx = banda[ordem], coluna[ordem], dados["idx"][ordem]
+    corte = np.flatnonzero((np.diff(banda) != 0) | (np.diff(coluna) != 0)) + 1
+    inicios = np.concatenate(([0], corte))
+    fins = np.concatenate((corte, [len(idx)])).tolist()
+    banda_cel, coluna_cel = banda[inicios].tolist(), coluna[inicios].tolist()
+    nomes = [c["name"] for c in columns]
+    palavras_ord = [textos[i] for i in idx.tolist()]
+
+    # só a junção dos textos de cada célula fica em Python (uma vez por célula, não por palavra×coluna)
+    linhas = {}
+    for a, b, bd, cl in zip(inicios.tolist(), fins, banda_cel, coluna_cel):
+        linhas.setdefault(bd, {})[nomes[cl]] = " ".join(palavras_ord[a:b])
+
+    registros = []
+    for cols_text in linhas.values():
+        if not cols_text.get("ValorTotal") or not _VAL_LINE_RE.search(cols_text["ValorTotal"]):
+            continue
+
+        # Ajuste Credenciado/Prestador
+        tail = _normalize_ws(" ".join([cols_text.get("Beneficiario",""), cols_text.get("Credenciado",""), cols_text.get("Prestador","")]))
+        starts = [m.start() for m in _CODE_START_RE.finditer(tail)]
+        cred = cols_text.get("Credenciado","").strip()
+        prest = cols_text.get("Prestador","").strip()
+        if (not cred or not prest) and len(starts) >= 2:
+            i1, i2 = starts[-2], starts[-1]
+            prest = tail[i2:].strip()
+            cred  = tail[i1:i2].strip()
+
+        registros.append({
+            "Atendimento":   cols_text.get("Atendimento","").strip(),
+            "NrGuia":        cols_text.get("NrGuia","").strip(),
+            "Realizacao":    cols_text.get("Realizacao","").strip(),
+            "Hora":          cols_text.get("Hora","").strip(),
+            "TipoGuia":      cols_text.get("TipoGuia","").strip(),
+            "Operadora":     cols_text.get("Operadora","").strip(),
+            "Matricula":     cols_text.get("Matricula","").strip(),
+            "Beneficiario":  cols_text.get("Beneficiario","").strip(),
+            "Credenciado":   cred,
+            "Prestador":     prest,
+            "ValorTotal":    cols_text.get("ValorTotal","").strip(),
+        })
+    return registros
+
+def iter_registros_coords(fonte, backend=None, modelos=MODELOS_LAYOUT, paginas=None):
+    """
+    Parser por coordenadas (palavras sob as colunas do cabeçalho), página a página, com a
+    mesma saída de iter_registros_texto. modelos: ModelosLayout (None desliga); páginas de
+    layout conhecido pulam o page.extract_tables().
+    """
+    for n_pag, total, words, tabelas, tamanho in obter_backend(backend, "coord").palavras(fonte, paginas):
+        registros = []
+        if words:
+            indice = _IndiceVertical(words)
+            conhecidos = modelos.do_tamanho(tamanho) if modelos else []
+            header_y, columns = None, []
+            for modelo in conhecidos:
+                header_y = modelos.conferir(modelo, indice)
+                if header_y is not None:
+                    columns = modelo["columns"]
+                    break
+            else:
+                header_y, header_words = _banda_cabecalho(indice)
+                if header_y is not None:
+                    columns = _colunas_cabecalho(header_words)
+                    if modelos and columns:
+                        modelos.registrar(tamanho, header_words, columns)
+            if header_y is not None:
+                registros = _registros_coords(words, header_y, columns) if columns else []
+            elif conhecidos:
+                registros = _registros_coords(words, None, conhecidos[0]["columns"])
+            else:
+                registros = _registros_tabela(tabelas()) if tabelas else []
+        yield n_pag, total, [{**r, "Pagina": n_pag} for r in registros]
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Perfil de execução por amostragem de pilhas e tracemalloc (só biblioteca padrão)."""
+import os, sys, time, threading, tracemalloc, linecache
+from contextlib import contextmanager
+import pandas as pd
+
+# ========= Perfil de execução =========
+class PerfilExecucao:
+    """
+    Perfil de uma execução: amostragem das pilhas a cada `intervalo` s (speedscope JSON e
+    funções por tempo) e, com memoria=True, tracemalloc por etapa (~10x mais lento).
+    Um por processo: com outro em andamento o perfil é pulado (ignorado=True).
+    """
+    ativo = None
+    _trava = threading.Lock()
+
+    def __init__(self, nome: str = "execucao", intervalo: float = 0.005, memoria: bool = True, linhas_memoria: int = 10):
+        self.nome, self.intervalo, self.memoria, self.linhas_memoria = nome, intervalo, memoria, linhas_memoria
+        self.quadros = {}   # (funcao, arquivo, linha) -> índice no speedscope
+        self.amostras = []  # (instante_s, thread, pilha raiz→folha, peso_s)
+        self.etapas = []    # {"etapa", "duracao_s", "pico_mb", "retida_mb", "linhas"}
+        self._pilhas = {}   # thread -> etapas abertas (picos de etapas aninhadas)
+        self.duracao_s = self.pico_mb = 0.0
+        self.ignorado = False
+
+    def __enter__(self):
+        with PerfilExecucao._trava:
+            self.ignorado = PerfilExecucao.ativo is not None
+            if self.ignorado:
+                return self
+            PerfilExecucao.ativo = self
+        self._alvo = threading.get_ident()
+        self._ignoradas = {t.ident for t in threading.enumerate()} - {self._alvo}
+        self._tracemalloc_externo = tracemalloc.is_tracing()
+        if self.memoria and not self._tracemalloc_externo:
+            tracemalloc.start()
+        # as listas da própria amostragem não entram nas linhas que mais alocaram
+        linhas = {ln for _, _, ln in PerfilExecucao._amostrar.__code__.co_lines() if ln}
+        self._filtros = [tracemalloc.Filter(False, tracemalloc.__file__)] + [
+            tracemalloc.Filter(False, __file__, ln) for ln in sorted(linhas)]
+        self._parar = threading.Event()
+        self.t0 = time.perf_counter()
+        self._amostrador = threading.Thread(target=self._amostrar, name="perfil-amostragem", daemon=True)
+        self._amostrador.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.ignorado:
+            return False
+        self._parar.set()
+        self._amostrador.join()
+        self.duracao_s = time.perf_counter() - self.t0
+        if self._memoria_ativa():
+            self.pico_mb = max(self.pico_mb, tracemalloc.get_traced_memory()[1] / 2**20)
+        if self.memoria and not self._tracemalloc_externo:
+            tracemalloc.stop()
+        with PerfilExecucao._trava:
+            PerfilExecucao.ativo = None
+        return False
+
+    def _memoria_ativa(self) -> bool:
+        return (self.memoria or self._tracemalloc_externo) and tracemalloc.is_tracing()
+
+    def acompanha(self, ident: int) -> bool:
+        return ident == self._alvo or ident not in self._ignoradas
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        ultimo = time.perf_counter()
+        while not self._parar.wait(self.intervalo):
+            agora = time.perf_counter()
+            peso, ultimo = agora - ultimo, agora
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio or not self.acompanha(ident):
+                    continue
+                pilha = []
+                while frame is not None:
+                    co = frame.f_code
+                    pilha.append(self.quadros.setdefault((co.co_name, co.co_filename, co.co_firstlineno), len(self.quadros)))
+                    frame = frame.f_back
+                self.amostras.append((agora - self.t0, ident, tuple(reversed(pilha)), peso))
+
+    def _registrar_pico(self):
+        pico = tracemalloc.get_traced_memory()[1]
+        self.pico_mb = max(self.pico_mb, pico / 2**20)
+        for abertas in self._pilhas.values():
+            for e in abertas:
+                e["pico"] = max(e["pico"], pico)
+
+    @contextmanager
+    def etapa(self, nome: str):
+        if not self._memoria_ativa():
+            t0 = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.etapas.append({"etapa": nome, "duracao_s": round(time.perf_counter() - t0, 4)})
+            return
+        abertas = self._pilhas.setdefault(threading.get_ident(), [])
+        self._registrar_pico()
+        tracemalloc.reset_peak()
+        antes = tracemalloc.take_snapshot().filter_traces(self._filtros)
+        atual0 = tracemalloc.get_traced_memory()[0]
+        registro = {"pico": atual0}
+        abertas.append(registro)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - t0
+            self._registrar_pico()
+            abertas.remove(registro)
+            atual = tracemalloc.get_traced_memory()[0]
+            linhas = []
+            depois = tracemalloc.take_snapshot().filter_traces(self._filtros)
+            for est in depois.compare_to(antes, "lineno")[:self.linhas_memoria]:
+                quadro = est.traceback[0]
+                linhas.append({
+                    "local": f"{os.path.basename(quadro.filename)}:{quadro.lineno}",
+                    "codigo": linecache.getline(quadro.filename, quadro.lineno).strip(),
+                    "alocado_kb": round(est.size_diff / 1024, 1), "blocos": est.count_diff,
+                })
+            self.etapas.append({
+                "etapa": nome, "duracao_s": round(duracao, 4),
+                "pico_mb": round((registro["pico"] - atual0) / 2**20, 2),
+                "retida_mb": round((atual - atual0) / 2**20, 2), "linhas": linhas,
+            })
+
+    def speedscope(self) -> dict:
+        nomes = {i: q for q, i in self.quadros.items()}
+        frames = [{"name": nomes[i][0], "file": nomes[i][1], "line": nomes[i][2]} for i in range(len(nomes))]
+        profiles = []
+        for ident in dict.fromkeys(a[1] for a in self.amostras):
+            amostras = [a for a in self.amostras if a[1] == ident]
+            profiles.append({
+                "type": "sampled", "unit": "seconds", "startValue": 0, "endValue": sum(a[3] for a in amostras),
+                "name": f"{self.nome} · {'thread principal' if ident == self._alvo else f'thread {ident}'}",
+                "samples": [list(a[2]) for a in amostras], "weights": [a[3] for a in amostras],
+            })
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json", "name": self.nome,
+                "exporter": "amhp-perfil", "activeProfileIndex": 0, "shared": {"frames": frames}, "profiles": profiles}
+
+    def top_funcoes(self, dentro_de: tuple = (), n: int = 20) -> pd.DataFrame:
+        """Funções por tempo (próprio = no topo da pilha; total = em qualquer ponto da pilha)."""
+        alvo = {i for q, i in self.quadros.items() if q[0] in dentro_de}
+        proprio, total, amostrado = {}, {}, 0.0
+        for _, _, pilha, peso in self.amostras:
+            if alvo and alvo.isdisjoint(pilha):
+                continue
+            amostrado += peso
+            proprio[pilha[-1]] = proprio.get(pilha[-1], 0.0) + peso
+            for i in set(pilha):
+                total[i] = total.get(i, 0.0) + peso
+        nomes = {i: q for q, i in self.quadros.items()}
+        linhas = [{"funcao": nomes[i][0], "local": f"{os.path.basename(nomes[i][1])}:{nomes[i][2]}",
+                   "proprio_s": round(proprio.get(i, 0.0), 3), "total_s": round(t, 3),
+                   "total_pct": round(100 * t / amostrado, 1) if amostrado else 0.0}
+                  for i, t in total.items()]
+        cols = ["funcao", "local", "proprio_s", "total_s", "total_pct"]
+        return pd.DataFrame(linhas, columns=cols).sort_values(["proprio_s", "total_s"], ascending=False).head(n).reset_index(drop=True)
+
+@contextmanager
+def etapa_perfil(nome: str):
+    """Etapa do perfil ativo (memória por etapa); sem perfil em andamento não faz nada."""
+    perfil = PerfilExecucao.ativo
+    if perfil is None or not perfil.acompanha(threading.get_ident()):
+        yield
+        return
+    with perfil.etapa(nome):
+        yield
+
+ETAPAS_PARSE = ("parse_by_text", "parse_by_coords", "sanitize_df")
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Etapas da automação no portal AMHP (login, TISS, filtros, busca e relatório)."""
+import os, re, time
+import pandas as pd
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
+
+from .navegador import aplicar_navegacao_enxuta, js_safe_click
+
+# ========= Automação (etapas) =========
+# AMHP_PORTAL_URL aponta para o portal simulado (ferramentas/portal_simulado.py) em testes locais
+URL_PORTAL = os.environ.get("AMHP_PORTAL_URL", "https://portal.amhp.com.br/")
+ID_SELECIONAR_TODOS = "ctl00_MainContent_rdgAtendimentosRealizados_ctl00_ctl02_ctl00_SelectColumnSelectCheckBox"
+ID_FILTRO_NEGOCIACAO = "ctl00_MainContent_rcbTipoNegociacao_Input"
+
+def fazer_login(driver, wait, usuario: str, senha: str, espera: float):
+    driver.get(URL_PORTAL)
+    wait.until(EC.presence_of_element_located((By.ID, "input-9"))).send_keys(usuario)
+    driver.find_element(By.ID, "input-12").send_keys(senha + Keys.ENTER)
+    time.sleep(espera)
+
+def abrir_tiss(driver, wait, espera: float, enxuto: bool = False):
+    try:
+        btn_tiss = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'AMHPTISS')]")))
+        driver.execute_script("arguments[0].click();", btn_tiss)
+    except Exception:
+        elems = driver.find_elements(By.XPATH, "//*[contains(translate(., 'abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'TISS')]")
+        if elems:
+            driver.execute_script("arguments[0].click();", elems[0])
+        else:
+            raise RuntimeError("Não foi possível localizar AMHPTISS/TISS.")
+    time.sleep(espera)
+    if len(driver.window_handles) > 1:
+        driver.switch_to.window(driver.window_handles[-1])
+        if enxuto:
+            aplicar_navegacao_enxuta(driver)
+
+def limpar_tela(driver):
+    try:
+        driver.execute_script("""
+            const avisos = document.querySelectorAll('center, #fechar-informativo, .modal');
+            avisos.forEach(el => el.remove());
+        """)
+    except Exception:
+        pass
+
+def abrir_atendimentos(driver) -> str:
+    """Navega até Atendimentos Realizados e devolve a URL (usada para recuperar a sessão)."""
+    driver.execute_script("document.getElementById('IrPara').click();")
+    time.sleep(2)
+    js_safe_click(driver, By.XPATH, "//span[normalize-space()='Consultório']")
+    js_safe_click(driver, By.XPATH, "//a[@href='AtendimentosRealizados.aspx']")
+    time.sleep(3)
+    return driver.current_url
+
+def sair_do_iframe(driver):
+    try:
+        driver.switch_to.default_content()
+    except Exception:
+        pass
+
+def recuperar_sessao(driver, wait, url_atendimentos: str):
+    """Volta para Atendimentos Realizados na sessão já autenticada (sem novo login)."""
+    sair_do_iframe(driver)
+    driver.get(url_atendimentos)
+    wait.until(EC.presence_of_element_located((By.ID, ID_FILTRO_NEGOCIACAO)))
+    limpar_tela(driver)
+
+# Telerik usa o PageRequestManager do ASP.NET AJAX: enquanto houver postback assíncrono, o form está instável
+JS_POSTBACK_ATIVO = """
+try {
+    return !!(window.Sys && Sys.WebForms && Sys.WebForms.PageRequestManager &&
+              Sys.WebForms.PageRequestManager.getInstance().get_isInAsyncPostBack());
+} catch (e) { return false; }
+"""
+
+def aguardar_postback(driver, timeout: float = 40):
+    """Espera o fim do postback AJAX em curso (sem sleeps fixos)."""
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(lambda d: not d.execute_script(JS_POSTBACK_ATIVO))
+
+class FormularioFiltros:
+    """
+    Altera só os filtros diferentes do desejado (cada alteração é um postback), pela API
+    cliente do Telerik ou, sem ela, por valor + ENTER/TAB.
+    """
+    CAMPOS = {
+        "negociacao":  ("combo", "ctl00_MainContent_rcbTipoNegociacao"),
+        "status":      ("combo", "ctl00_MainContent_rcbStatus"),
+        "credenciado": ("combo", "ctl00_MainContent_rcbCredenciado"),
+        "ini":         ("data",  "ctl00_MainContent_rdpDigitacaoDataInicio"),
+        "fim":         ("data",  "ctl00_MainContent_rdpDigitacaoDataFim"),
+    }
+
+    JS_LER = """
+    const campos = arguments[0], out = {};
+    for (const [nome, [tipo, id]] of Object.entries(campos)) {
+        const el = document.getElementById(id + (tipo === 'combo' ? '_Input' : '_dateInput'));
+        out[nome] = el ? el.value : null;
+    }
+    return out;
+    """
+
+    JS_COMBO = """
+    const c = window.$find ? $find(arguments[0]) : null;
+    if (!c) return false;
+    const item = c.findItemByText(arguments[1]);
+    if (item) { item.select(); } else { c.set_text(arguments[1]); c.commitChanges && c.commitChanges(); }
+    return true;
+    """
+
+    JS_DATA = """
+    const p = window.$find ? $find(arguments[0]) : null;
+    if (!p) return false;
+    const [d, m, y] = arguments[1].split('/').map(Number);
+    p.set_selectedDate(new Date(y, m - 1, d));
+    return true;
+    """
+
+    def __init__(self, driver, wait):
+        self.driver = driver
+        self.wait = wait
+
+    @staticmethod
+    def _norm(v) -> str:
+        return re.sub(r"\s+", " ", str(v or "")).strip().casefold()
+
+    def ler(self) -> dict:
+        self.wait.until(EC.presence_of_element_located((By.ID, ID_FILTRO_NEGOCIACAO)))
+        return self.driver.execute_script(self.JS_LER, self.CAMPOS) or {}
+
+    def _definir(self, campo: str, valor: str):
+        tipo, cid = self.CAMPOS[campo]
+        ok = False
+        try:
+            ok = self.driver.execute_script(self.JS_COMBO if tipo == "combo" else self.JS_DATA, cid, valor)
+        except Exception:
+            ok = False
+        if not ok:
+            if tipo == "combo":
+                el = self.wait.until(EC.presence_of_element_located((By.ID, cid + "_Input")))
+                self.driver.execute_script("arguments[0].value = arguments[1];", el, valor); el.send_keys(Keys.ENTER)
+            else:
+                el = self.driver.find_element(By.ID, cid + "_dateInput"); el.clear(); el.send_keys(valor + Keys.TAB)
+        aguardar_postback(self.driver)
+
+    def aplicar(self, desejado: dict) -> list:
+        """Aplica `desejado` ({campo: valor}); valores vazios/None não são tocados. Devolve os campos alterados."""
+        atual = self.ler()
+        alterados = []
+        for campo in self.CAMPOS:
+            valor = desejado.get(campo)
+            if not valor or not str(valor).strip():
+                continue
+            if self._norm(atual.get(campo)) == self._norm(valor):
+                continue
+            self._definir(campo, valor)
+            alterados.append(campo)
+        return alterados
+
+def aplicar_filtros(driver, wait, negociacao: str, status_sel: str, credenciado: str, ini: str, fim: str) -> list:
+    return FormularioFiltros(driver, wait).aplicar({
+        "negociacao": negociacao, "status": status_sel, "credenciado": credenciado, "ini": ini, "fim": fim,
+    })
+
+# Estado da RadGrid após a busca: linha de "sem registros", texto do pager e linhas visíveis
+JS_GRADE_RESUMO = """
+const t = document.querySelector('.rgMasterTable');
+if (!t) return null;
+const info = document.querySelector('.rgInfoPart') || document.querySelector('.rgPager .rgStatus, .rgPager');
+return {
+    vazia: !!t.querySelector('tr.rgNoRecords'),
+    info: info ? info.textContent.replace(/\\s+/g, ' ').trim() : '',
+    linhas: t.querySelectorAll('tbody > tr.rgRow, tbody > tr.rgAltRow').length,
+};
+"""
+
+_NUM_GRADE = r"(\d{1,3}(?:[.,]\d{3})+|\d+)"
+_TOTAL_PAGER_RES = [
+    re.compile(_NUM_GRADE + r"\s+(?:items|itens|registros)\s+(?:in|em)\b", re.I),  # "48 items in 5 pages"
+    re.compile(r"(?:items|itens|registros)\s+\d+\s+(?:to|a|até)\s+\d+\s+(?:of|de)\s+" + _NUM_GRADE, re.I),  # "items 1 to 10 of 48"
+]
+
+def interpretar_resumo_grade(resumo: dict):
+    """Total de registros da busca a partir de JS_GRADE_RESUMO; None se não der para saber."""
+    if not resumo:
+        return None
+    if resumo.get("vazia"):
+        return 0
+    for rx in _TOTAL_PAGER_RES:
+        m = rx.search(resumo.get("info") or "")
+        if m:
+            return int(re.sub(r"[.,]", "", m.group(1)))
+    # sem pager: a grade inteira cabe numa página (se houver linha, o total é o que está visível)
+    if not resumo.get("info") and resumo.get("linhas"):
+        return int(resumo["linhas"])
+    return None
+
+def buscar_atendimentos(driver, wait):
+    """Busca e devolve o total de atendimentos informado pela grade (None se não identificado)."""
+    btn_buscar = driver.find_element(By.ID, "ctl00_MainContent_btnBuscar_input")
+    driver.execute_script("arguments[0].click();", btn_buscar)
+    # a grade da busca anterior continua no DOM: só o fim do postback garante o resultado novo
+    aguardar_postback(driver)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".rgMasterTable")))
+    try:
+        return interpretar_resumo_grade(driver.execute_script(JS_GRADE_RESUMO))
+    except Exception:
+        return None
+
+def abrir_relatorio(driver, wait, espera: float):
+    """Seleciona todos, imprime e entra no iframe do ReportViewer; devolve o select de formatos."""
+    js_safe_click(driver, By.ID, ID_SELECIONAR_TODOS)
+    time.sleep(2)
+    js_safe_click(driver, By.ID, "ctl00_MainContent_rbtImprimirAtendimentos_input")
+    time.sleep(espera)
+
+    # Iframe
+    if len(driver.find_elements(By.TAG_NAME, "iframe")) > 0:
+        driver.switch_to.frame(0)
+
+    return wait.until(EC.presence_of_element_located((By.ID, "ReportView_ReportToolbar_ExportGr_FormatList_DropDownList")))
+
+def dividir_periodo(data_ini: str, data_fim: str, dias: int = 0) -> list:
+    """Quebra o período em blocos de `dias` dias (0 = período inteiro) → [(ini, fim), ...] em dd/mm/aaaa."""
+    if not dias:
+        return [(data_ini, data_fim)]
+    ini = pd.to_datetime(data_ini, format="%d/%m/%Y")
+    fim = pd.to_datetime(data_fim, format="%d/%m/%Y")
+    blocos = []
+    while ini <= fim:
+        b_fim = min(ini + pd.Timedelta(days=int(dias) - 1), fim)
+        blocos.append((ini.strftime("%d/%m/%Y"), b_fim.strftime("%d/%m/%Y")))
+        ini = b_fim + pd.Timedelta(days=1)
+    return blocos
+
+def montar_unidades(cfg: dict) -> list:
+    return [
+        {"negociacao": cfg["negociacao"], "status": status_sel, "credenciado": cfg["credenciado"], "ini": ini, "fim": fim}
+        for status_sel in cfg["status_list"]
+        for ini, fim in dividir_periodo(cfg["data_ini"], cfg["data_fim"], cfg.get("dias_bloco", 0))
+    ]
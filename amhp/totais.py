@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Totais de valor e guias mantidos a cada importação."""
+import itertools
+import numpy as np
+import pandas as pd
+
+from .validacao import _sem_attrs
+
+# ========= Totais incrementais =========
+DIMENSOES_TOTAIS = ["Status", "Dia", "Operadora", "Prestador", "TipoGuia"]
+
+def valor_centavos(serie: pd.Series) -> np.ndarray:
+    """ "1.234,56" → 123456 (int64); vazio/inválido → 0."""
+    texto = serie.astype(str).str.strip()
+    texto = texto.where(texto.str.fullmatch(r"\d{1,3}(?:\.\d{3})*,\d{2}|\d+,\d{2}"), "0,00")
+    return pd.to_numeric(texto.str.replace(".", "", regex=False).str.replace(",", "", regex=False)).to_numpy(np.int64)
+
+class TotaisIncrementais:
+    """
+    Soma de ValorTotal (centavos) e contagem de guias por Status × Dia × Operadora ×
+    Prestador × TipoGuia, atualizadas por lote. Cada linha entra pela chave
+    status + Atendimento + NrGuia: reacrescentá-la troca a contribuição antiga e remover()
+    a desconta. Linhas sem Atendimento sempre contam.
+    """
+    def __init__(self):
+        self.grupos = {}                       # "status\x1fdia\x1f..." → id do grupo
+        self.chaves_grupo = []
+        self.centavos = np.zeros(0, dtype=np.int64)
+        self.guias = np.zeros(0, dtype=np.int64)
+        self.linhas = {}                       # chave da linha → posição em _grupo_linha/_centavos_linha
+        self._grupo_linha = np.zeros(0, dtype=np.int64)
+        self._centavos_linha = np.zeros(0, dtype=np.int64)
+        self._usadas = 0
+        self._livres = []                      # posições de linhas removidas, reaproveitadas
+
+    @staticmethod
+    def _chaves(df: pd.DataFrame):
+        """(hash da chave de cada linha, máscara das linhas com Atendimento)."""
+        vazio = pd.Series("", index=df.index)
+        status = df["Filtro_Status"].astype(str) if "Filtro_Status" in df.columns else vazio
+        atend = df["Atendimento"].astype(str).str.strip() if "Atendimento" in df.columns else vazio
+        guia = df["NrGuia"].astype(str).str.strip() if "NrGuia" in df.columns else vazio
+        chaves = status.str.cat([atend, guia], sep="\x1f")
+        return pd.util.hash_pandas_object(chaves, index=False).to_numpy(), (atend != "").to_numpy()
+
+    def _grupos_linhas(self, df: pd.DataFrame) -> np.ndarray:
+        colunas = []
+        for dim in DIMENSOES_TOTAIS:
+            if dim == "Status":
+                origem = "Filtro_Status"
+            elif dim == "Dia":
+                origem = "Realizacao"
+            else:
+                origem = dim
+            valores = df[origem].astype(str).str.strip() if origem in df.columns else pd.Series("", index=df.index)
+            if dim == "Dia":  # dd/mm/aaaa → aaaa-mm-dd (ordena como texto)
+                valido = valores.str.fullmatch(r"\d{2}/\d{2}/\d{4}")
+                valores = (valores.str[6:10] + "-" + valores.str[3:5] + "-" + valores.str[0:2]).where(valido, "")
+            colunas.append(valores.fillna(""))
+        combinado = colunas[0].str.cat(colunas[1:], sep="\x1f")
+        codigos, unicos = pd.factorize(combinado)
+        mapa = np.empty(len(unicos), dtype=np.int64)
+        for i, chave in enumerate(unicos):
+            gid = self.grupos.get(chave)
+            if gid is None:
+                gid = self.grupos[chave] = len(self.chaves_grupo)
+                self.chaves_grupo.append(chave)
+            mapa[i] = gid
+        novos = len(self.chaves_grupo) - len(self.centavos)
+        if novos:
+            self.centavos = np.concatenate([self.centavos, np.zeros(novos, dtype=np.int64)])
+            self.guias = np.concatenate([self.guias, np.zeros(novos, dtype=np.int64)])
+        return mapa[codigos]
+
+    def _somar(self, grupos: np.ndarray, centavos: np.ndarray, sinal: int):
+        n = len(self.centavos)
+        self.guias += sinal * np.bincount(grupos, minlength=n).astype(np.int64)
+        self.centavos += sinal * np.rint(np.bincount(grupos, weights=centavos, minlength=n)).astype(np.int64)
+
+    def _contribuicoes(self, df: pd.DataFrame):
+        centavos = (valor_centavos(df["ValorTotal"]) if "ValorTotal" in df.columns
+                    else np.zeros(len(df), dtype=np.int64))
+        return self._grupos_linhas(df), centavos
+
+    def _reservar(self, n: int) -> np.ndarray:
+        """n posições nos vetores de contribuição: primeiro as liberadas, depois o fim (crescimento geométrico)."""
+        k = min(n, len(self._livres))
+        reuso = self._livres[len(self._livres) - k:]
+        del self._livres[len(self._livres) - k:]
+        inicio = self._usadas
+        self._usadas += n - k
+        if self._usadas > len(self._grupo_linha):
+            extra = max(self._usadas, 2 * len(self._grupo_linha)) - len(self._grupo_linha)
+            self._grupo_linha = np.concatenate([self._grupo_linha, np.zeros(extra, dtype=np.int64)])
+            self._centavos_linha = np.concatenate([self._centavos_linha, np.zeros(extra, dtype=np.int64)])
+        return np.concatenate([np.asarray(reuso, dtype=np.int64), np.arange(inicio, self._usadas, dtype=np.int64)])
+
+    def acrescentar(self, df: pd.DataFrame):
+        """Soma um lote; linhas já contadas (mesma chave) têm a contribuição substituída."""
+        if df is None or df.empty:
+            return
+        df = _sem_attrs(df)
+        chaves, com_id = self._chaves(df)
+        conta = ~com_id | ~pd.Index(chaves).duplicated(keep="last")  # repetida no lote: vale a última
+        grupos, centavos = self._contribuicoes(df)
+        grupos, centavos, chaves, com_id = grupos[conta], centavos[conta], chaves[conta], com_id[conta]
+        ids = chaves[com_id].tolist()
+        pos = np.fromiter(map(self.linhas.get, ids, itertools.repeat(-1)), dtype=np.int64, count=len(ids))
+        antigas = pos >= 0
+        if antigas.any():
+            self._somar(self._grupo_linha[pos[antigas]], self._centavos_linha[pos[antigas]], -1)
+        novas = ~antigas
+        if novas.any():
+            pos[novas] = self._reservar(int(novas.sum()))
+            self.linhas.update(zip(itertools.compress(ids, novas), pos[novas].tolist()))
+        self._grupo_linha[pos] = grupos[com_id]
+        self._centavos_linha[pos] = centavos[com_id]
+        self._somar(grupos, centavos, +1)
+
+    def remover(self, df: pd.DataFrame, restante: pd.DataFrame = None) -> int:
+        """
+        Desconta as linhas de df; devolve quantas estavam contadas. `restante` é o que fica na
+        base: uma guia removida que ainda aparece nele (outra importação do mesmo período) volta
+        a contar pela linha que ficou.
+        """
+        if df is None or df.empty:
+            return 0
+        df = _sem_attrs(df)
+        chaves, com_id = self._chaves(df)
+        sem_id = ~com_id
+        if sem_id.any():
+            self._somar(*self._contribuicoes(df[sem_id]), -1)
+        ids = pd.unique(chaves[com_id])
+        pos = np.fromiter(map(self.linhas.pop, ids.tolist(), itertools.repeat(-1)), dtype=np.int64, count=len(ids))
+        contadas = pos >= 0
+        pos = pos[contadas]
+        if len(pos):
+            self._somar(self._grupo_linha[pos], self._centavos_linha[pos], -1)
+            self._livres.extend(pos.tolist())
+            if restante is not None and not restante.empty:
+                restante = _sem_attrs(restante)
+                chaves_r, com_id_r = self._chaves(restante)
+                volta = com_id_r & pd.Series(chaves_r).isin(ids[contadas]).to_numpy()
+                if volta.any():
+                    self.acrescentar(restante[volta])
+        return int(sem_id.sum()) + len(pos)
+
+    def resumo(self, por: list, status: list = None) -> pd.DataFrame:
+        """Totais agrupados pelas dimensões `por` (de DIMENSOES_TOTAIS), a partir dos grupos."""
+        ativos = np.flatnonzero(self.guias[:len(self.chaves_grupo)] > 0)
+        grupos = pd.DataFrame([self.chaves_grupo[i].split("\x1f") for i in ativos],
+                              columns=DIMENSOES_TOTAIS, dtype=object)
+        grupos["Valor"] = self.centavos[ativos] / 100
+        grupos["Guias"] = self.guias[ativos]
+        if status:
+            grupos = grupos[grupos["Status"].isin(status)]
+        por = list(por) or ["Status"]
+        return (grupos.groupby(por, sort=True)[["Valor", "Guias"]].sum()
+                .sort_values("Valor", ascending=False).reset_index())
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Regras de qualidade da saída do parse."""
+import numpy as np
+import pandas as pd
+
+from .esquema import TARGET_COLS, CODIGO_ENTIDADE
+
+# ========= Validação =========
+def _sem_attrs(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia rasa sem attrs: cada df[c] de um DataFrame do parse copiaria o relatório da pré-varredura."""
+    if not df.attrs:
+        return df
+    df = df.copy(deep=False)
+    df.attrs = {}
+    return df
+
+# regras por coluna: (regra, coluna, regex que o valor preenchido precisa casar inteiro | que não pode conter)
+REGRAS_FORMATO = [
+    ("atendimento_formato", "Atendimento", r"\d{8}", True),
+    ("guia_formato", "NrGuia", r"\d{1,20}", True),
+    ("data_formato", "Realizacao", r"(?:0[1-9]|[12]\d|3[01])/(?:0[1-9]|1[0-2])/(?:19|20)\d{2}", True),
+    ("hora_formato", "Hora", r"(?:[01]\d|2[0-3]):[0-5]\d", True),
+    ("valor_formato", "ValorTotal", r"\d{1,3}(?:\.\d{3})*,\d{2}", True),
+    ("credenciado_codigo", "Credenciado", CODIGO_ENTIDADE + "-.*", True),
+    ("prestador_codigo", "Prestador", CODIGO_ENTIDADE + "-.*", True),
+    ("hora_na_operadora", "Operadora", r"\d{1,2}:\d{2}", False),
+    ("matricula_no_beneficiario", "Beneficiario", r"\d", False),
+]
+# o parse textual deixa a matrícula ("X03...") dentro de Beneficiario: no modo texto a regra marcaria toda linha
+REGRAS_SO_COORD = {"matricula_no_beneficiario"}
+CAMPOS_CRITICOS = ["Atendimento", "Realizacao", "Beneficiario", "ValorTotal"]
+# poucas dezenas de valores distintos por relatório: as regras rodam nos únicos (factorize)
+COLUNAS_REPETIDAS = {"Realizacao", "Hora", "TipoGuia", "Operadora", "Beneficiario", "Credenciado", "Prestador"}
+DESCRICAO_REGRAS = {
+    "campo_vazio": "Atendimento, Realização, Beneficiário ou Valor vazio",
+    "atendimento_duplicado": "Atendimento + guia repetidos (a partir da 2ª ocorrência)",
+    "valor_zerado": "ValorTotal 0,00",
+    "atendimento_formato": "Atendimento fora de 8 dígitos",
+    "guia_formato": "NrGuia não numérico",
+    "data_formato": "Realização fora de dd/mm/aaaa",
+    "hora_formato": "Hora fora de hh:mm",
+    "valor_formato": "ValorTotal fora de 1.234,56",
+    "credenciado_codigo": "Credenciado sem o código (000000-)",
+    "prestador_codigo": "Prestador sem o código (000000-)",
+    "hora_na_operadora": "Operadora com hora engolida",
+    "matricula_no_beneficiario": "Beneficiário com dígitos (resto da matrícula)",
+}
+
+class _ColunaValidacao:
+    """Textos de uma coluna para as regras: os únicos + códigos por linha, ou a coluna inteira."""
+    def __init__(self, serie: pd.Series, repetida: bool):
+        self.codigos = None
+        if repetida:
+            self.codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+            serie = pd.Series(unicos, dtype=object)
+        self.textos = serie.fillna("").astype(str).str.strip().reset_index(drop=True)
+        self.vazio = self.por_linha(self.textos == "")
+
+    def por_linha(self, teste: pd.Series) -> np.ndarray:
+        valores = teste.to_numpy(dtype=bool)
+        return valores if self.codigos is None else valores[self.codigos]
+
+def validar_atendimentos(df: pd.DataFrame, modo: str = None) -> tuple:
+    """
+    Confere o DataFrame do parse com operações vetorizadas (nas COLUNAS_REPETIDAS, uma vez
+    por valor distinto). REGRAS_SO_COORD só rodam com modo "coord" (padrão df.attrs["modo"]).
+    Devolve (problemas, resumo): DataFrame bool por regra e regra/descricao/linhas/pct.
+    """
+    modo = modo or df.attrs.get("modo", "text")
+    n = len(df)
+    nenhum = np.zeros(n, dtype=bool)
+    base = _sem_attrs(df)
+    colunas = {c: _ColunaValidacao(base[c], c in COLUNAS_REPETIDAS) for c in TARGET_COLS if c in df.columns}
+    problemas = {"campo_vazio": np.logical_or.reduce(
+        [colunas[c].vazio if c in colunas else ~nenhum for c in CAMPOS_CRITICOS])}
+
+    duplicado = nenhum.copy()
+    if "Atendimento" in colunas:
+        atend = colunas["Atendimento"].textos
+        candidatos = np.flatnonzero(atend.duplicated(keep=False).to_numpy() & ~colunas["Atendimento"].vazio)
+        if len(candidatos):
+            # só as linhas de atendimento repetido entram na conferência do par atendimento + guia
+            guia = colunas["NrGuia"].textos.iloc[candidatos] if "NrGuia" in colunas else ""
+            pares = pd.DataFrame({"a": atend.iloc[candidatos], "g": guia})
+            duplicado[candidatos[pares.duplicated().to_numpy()]] = True
+    problemas["atendimento_duplicado"] = duplicado
+    problemas["valor_zerado"] = (colunas["ValorTotal"].por_linha(colunas["ValorTotal"].textos.isin(["0,00", "0"]))
+                                 if "ValorTotal" in colunas else nenhum)
+
+    for regra, coluna, padrao, inteiro in REGRAS_FORMATO:
+        if regra in REGRAS_SO_COORD and modo != "coord":
+            continue
+        if coluna not in colunas:
+            problemas[regra] = nenhum
+            continue
+        col = colunas[coluna]
+        casa = col.textos.str.fullmatch(padrao) if inteiro else col.textos.str.contains(padrao, regex=True)
+        problemas[regra] = (~col.por_linha(casa) if inteiro else col.por_linha(casa)) & ~col.vazio
+
+    problemas = pd.DataFrame(problemas, index=df.index)
+    contagem = problemas.sum()
+    resumo = pd.DataFrame({
+        "regra": contagem.index, "descricao": [DESCRICAO_REGRAS[r] for r in contagem.index],
+        "linhas": contagem.to_numpy(), "pct": (100 * contagem.to_numpy() / max(n, 1)).round(2),
+    })
+    return problemas, resumo
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Pré-varredura: classifica as páginas do PDF antes da extração."""
+import re
+
+from .fonte import abrir_fonte_pdf
+from .backends import BackendPdfium
+from .esquema import _normalize_ws
+from .parser import _RECORD_START_RE
+
+# ========= Pré-varredura de páginas =========
+# Sinal barato por página, antes da extração completa: operadores de texto do stream de
+# conteúdo bruto e, neles, inícios de registro (Atendimento Guia dd/mm/aaaa).
+_OPERADOR_TEXTO_RE = re.compile(rb"(?:\)|>|\])\s*(?:Tj|TJ|'|\")")
+_LITERAL_PDF_RE = re.compile(rb"\((?:\\.|[^\\()])*\)")
+_HEX_PDF_RE = re.compile(rb"(?<!<)<[0-9A-Fa-f\s]+>(?!>)")
+_ESCAPE_PDF_RE = re.compile(rb"\\([0-7]{1,3}|.)", re.S)
+_ESCAPES_PDF = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+def _texto_literais_pdf(dados: bytes) -> str:
+    """Strings literais (...) do stream de conteúdo, unidas por espaço (fontes de 1 byte)."""
+    def _escape(m):
+        e = m.group(1)
+        return bytes([int(e, 8) & 0xFF]) if e[:1].isdigit() else _ESCAPES_PDF.get(e, e)
+    # os escapes ficam dentro de cada literal: uma substituição só sobre os literais já unidos
+    return _ESCAPE_PDF_RE.sub(_escape, b" ".join(l[1:-1] for l in _LITERAL_PDF_RE.findall(dados))).decode("latin-1")
+
+def _dados_conteudo(page) -> bytes:
+    """Stream(s) de conteúdo da página descomprimido(s); FlateDecode simples vai direto ao zlib."""
+    import zlib
+    conteudo = page.get("/Contents")
+    if conteudo is None:
+        return b""
+    conteudo = conteudo.get_object()
+    partes = []
+    for s in (conteudo if isinstance(conteudo, list) else [conteudo]):
+        s = s.get_object()
+        filtro = s.get("/Filter")
+        bruto = getattr(s, "_data", None)
+        if bruto is not None and filtro in ("/FlateDecode", ["/FlateDecode"]) and not s.get("/DecodeParms"):
+            try:
+                partes.append(zlib.decompress(bruto))
+                continue
+            except zlib.error:
+                pass
+        partes.append(s.get_data())
+    return b"\n".join(partes)
+
+def _classe_pagina(cabecas: int, texto: str) -> str:
+    if cabecas:
+        return "dados"
+    return "resumo" if _normalize_ws(texto)[:5].lower() == "total" else "sem registros"
+
+def _classificar_bruto(page, n_pag: int) -> dict:
+    dados = _dados_conteudo(page)
+    if not _OPERADOR_TEXTO_RE.search(dados):
+        classe = "incerto" if re.search(rb"\bDo\b", dados) else "sem texto"
+        return {"pagina": n_pag, "classe": classe, "cabecas": 0, "sinal": "bruto"}
+    if _HEX_PDF_RE.search(dados):
+        return {"pagina": n_pag, "classe": "incerto", "cabecas": None, "sinal": "bruto"}
+    texto = _texto_literais_pdf(dados)
+    cabecas = len(_RECORD_START_RE.findall(_normalize_ws(texto)))
+    return {"pagina": n_pag, "classe": _classe_pagina(cabecas, texto), "cabecas": cabecas, "sinal": "bruto"}
+
+def classificar_paginas(fonte, so_extremos: bool = False) -> list:
+    """
+    [{"pagina", "classe", "cabecas", "sinal"}] por página, sem extração de layout. classe:
+    "dados" | "resumo" (começa em "Total") | "sem registros" | "sem texto" | "incerto" |
+    "não varrida" (so_extremos: miolo entre a primeira e a última página com dados).
+    Sinal pelo stream de conteúdo; texto hexadecimal/XObjects vão para o PDFium.
+    """
+    from PyPDF2 import PdfReader
+    with abrir_fonte_pdf(fonte) as f:
+        reader = PdfReader(f)
+        total = len(reader.pages)
+        paginas = [{"pagina": i + 1, "classe": "não varrida", "cabecas": None, "sinal": ""} for i in range(total)]
+        ordem = (list(range(total)), list(range(total - 1, -1, -1))) if so_extremos else (range(total),)
+        for sentido in ordem:
+            for n, i in enumerate(sentido, start=1):
+                if paginas[i]["sinal"]:
+                    break  # as duas varreduras se encontraram
+                paginas[i] = _classificar_bruto(reader.pages[i], i + 1)
+                if n % 8 == 0:
+                    reader.resolved_objects.clear()
+                if so_extremos and paginas[i]["classe"] in ("dados", "incerto"):
+                    break
+
+    incertas = {p["pagina"] for p in paginas if p["classe"] == "incerto"}
+    if incertas and BackendPdfium.disponivel():
+        for n_pag, _, txt in BackendPdfium().textos(fonte, incertas):
+            if n_pag in incertas:
+                cabecas = len(_RECORD_START_RE.findall(_normalize_ws(txt)))
+                paginas[n_pag - 1].update(classe=_classe_pagina(cabecas, txt), cabecas=cabecas, sinal="texto")
+    return paginas
+
+def paginas_a_extrair(classes: list, mode: str = "text") -> set:
+    """
+    Páginas que passam pela extração completa. coord: as com início de registro. text: um
+    registro pode continuar na página seguinte, então só saem capa e resumo. None = todas.
+    """
+    fazer = {p["pagina"] for p in classes if p["classe"] in ("dados", "incerto", "não varrida")}
+    if not fazer:
+        return None
+    if mode == "coord":
+        return fazer
+    primeira, ultima = min(fazer), max(fazer)
+    return {p["pagina"] for p in classes
+            if primeira <= p["pagina"] <= ultima or (p["pagina"] > ultima and p["classe"] not in ("resumo", "sem texto"))}
@@ -1,17 +1,11 @@
-
 # -*- coding: utf-8 -*-
-import os, io, re, time, shutil
+import os, time, shutil, json, uuid, contextlib
 import streamlit as st
 import pandas as pd
+import numpy as np
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
 
 # ========= Secrets/env =========
 try:
@@ -21,9 +15,33 @@ try:
         os.environ["CHROME_BINARY"] = chrome_bin_secret
     if driver_bin_secret:
         os.environ["CHROMEDRIVER_BINARY"] = driver_bin_secret
+    portal_secret = st.secrets.get("env", {}).get("AMHP_PORTAL_URL", None)
+    if portal_secret:
+        os.environ["AMHP_PORTAL_URL"] = portal_secret
 except Exception:
     pass
 
+# ========= Pacote =========
+# importado depois dos secrets: amhp.portal lê AMHP_PORTAL_URL na importação
+from amhp.caminhos import PASTA_FINAL, DOWNLOAD_TEMPORARIO
+from amhp.perfil import PerfilExecucao, ETAPAS_PARSE
+from amhp.esquema import sanitize_value, sanitize_df
+from amhp.validacao import validar_atendimentos
+from amhp.entidades import ENTIDADES, RegistroEntidades, compactar_entidades
+from amhp.totais import DIMENSOES_TOTAIS, TotaisIncrementais
+from amhp.metricas import ARQUIVO_METRICAS, MedidorEtapas, carregar_metricas, resumo_metricas, metricas_prometheus
+from amhp.navegador import (configurar_driver, RastreadorDownloads, baixar_pdf_em_memoria, FilaNavegadores,
+                            pasta_trabalho, podar_pastas_trabalho, vagas_navegador)
+from amhp.fonte import tamanho_fonte_pdf
+from amhp.cache import CACHE_EXTRACAO
+from amhp.extracao import parse_pdf_to_atendimentos_df
+from amhp.lote import coletar_pdfs_lote, processar_lote
+from amhp.portal import (fazer_login, abrir_tiss, limpar_tela, abrir_atendimentos, sair_do_iframe, recuperar_sessao,
+                         aplicar_filtros, buscar_atendimentos, abrir_relatorio, montar_unidades)
+from amhp.checkpoints import Checkpoints
+from amhp.historico import HISTORICO
+from amhp.arquivo import ARQUIVO_PDF
+
 # ========= Página =========
 st.set_page_config(page_title="AMHP - Exportador PDF + Consolidação", layout="wide")
 st.title("🏥 Exportador AMHP (PDF) + Consolidador")
@@ -31,230 +49,372 @@ st.title("🏥 Exportador AMHP (PDF) + Consolidador")
 if "db_consolidado" not in st.session_state:
     st.session_state.db_consolidado = pd.DataFrame()
 
-def obter_caminho_final():
-    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-    path = os.path.join(desktop if os.path.exists(desktop) else os.getcwd(), "automacao_pdf")
-    os.makedirs(path, exist_ok=True)
-    return path
-
-PASTA_FINAL = obter_caminho_final()
-DOWNLOAD_TEMPORARIO = os.path.join(os.getcwd(), "temp_downloads")
-os.makedirs(DOWNLOAD_TEMPORARIO, exist_ok=True)
-
-# ========= Sanitização =========
-_ILLEGAL_CTRL_RE = re.compile(r"[\x00-\x08\x0B-\x0C\x0E-\x1F]")
-
-def _sanitize_text(s: str) -> str:
-    if s is None:
-        return s
-    s = s.replace("\x00", "")
-    s = _ILLEGAL_CTRL_RE.sub("", s)
-    s = s.replace("\u00A0", " ").strip()
-    return s
-
-def sanitize_value(v):
-    if pd.isna(v):
-        return v
-    if isinstance(v, (bytes, bytearray)):
-        try:
-            v = v.decode("utf-8", "ignore")
-        except Exception:
-            v = v.decode("latin-1", "ignore")
-    if isinstance(v, str):
-        return _sanitize_text(v)
-    return v
-
-def sanitize_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    new_cols, seen = [], {}
-    for c in df.columns:
-        c2 = sanitize_value(str(c))
-        n = seen.get(c2, 0) + 1
-        seen[c2] = n
-        new_cols.append(c2 if n == 1 else f"{c2}_{n}")
-    df.columns = new_cols
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].apply(sanitize_value)
-    return df
-
-# ========= Esquema =========
-TARGET_COLS = [
-    "Atendimento","NrGuia","Realizacao","Hora","TipoGuia",
-    "Operadora","Matricula","Beneficiario","Credenciado",
-    "Prestador","ValorTotal"
-]
-
-def ensure_atendimentos_schema(df: pd.DataFrame) -> pd.DataFrame:
-    for c in TARGET_COLS:
-        if c not in df.columns:
-            df[c] = ""
-    return df[TARGET_COLS]
-
-# ========= Selenium =========
-def configurar_driver():
-    opts = Options()
-    chrome_binary = os.environ.get("CHROME_BINARY", "/usr/bin/chromium")
-    driver_binary = os.environ.get("CHROMEDRIVER_BINARY", "/usr/bin/chromedriver")
-
-    if os.path.exists(chrome_binary):
-        opts.binary_location = chrome_binary
-
-    opts.add_argument("--headless=new")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument("--window-size=1920,1080")
-
-    prefs = {
-        "download.default_directory": DOWNLOAD_TEMPORARIO,
-        "download.prompt_for_download": False,
-        "plugins.always_open_pdf_externally": True,
-    }
-    opts.add_experimental_option("prefs", prefs)
-
-    if os.path.exists(driver_binary):
-        service = Service(executable_path=driver_binary)
-        driver = webdriver.Chrome(service=service, options=opts)
+# ========= Perfil de execução =========
+def mostrar_perfil(perfil: PerfilExecucao):
+    if perfil.ignorado:
+        st.warning("🔬 Já havia um perfil em andamento neste servidor: esta execução rodou sem perfil.")
+        return
+    st.caption(f"🔬 Perfil: {perfil.duracao_s:.1f}s, {len(perfil.amostras)} amostra(s) a cada "
+               f"{perfil.intervalo * 1000:.0f} ms" + (f", pico de memória rastreada {perfil.pico_mb:.1f} MB "
+               f"(tempos inflados pelo tracemalloc)." if perfil.memoria else "."))
+    st.download_button("🔥 Baixar perfil (speedscope JSON — abrir em speedscope.app)",
+        json.dumps(perfil.speedscope()), file_name=f"perfil_{perfil.nome}.speedscope.json", mime="application/json")
+    top_parse = perfil.top_funcoes(ETAPAS_PARSE)
+    if not top_parse.empty:
+        st.write("Funções do parse por tempo (amostras dentro de " + ", ".join(ETAPAS_PARSE) + "):")
+        st.dataframe(top_parse, use_container_width=True)
     else:
-        driver = webdriver.Chrome(options=opts)
-
-    driver.set_page_load_timeout(180)
-    driver.set_script_timeout(180)
-    return driver
+        st.write("Funções por tempo:")
+        st.dataframe(perfil.top_funcoes(), use_container_width=True)
+    if perfil.etapas:
+        st.write("Memória por etapa:" if perfil.memoria else "Tempo por etapa:")
+        st.dataframe(pd.DataFrame(perfil.etapas).drop(columns=["linhas"], errors="ignore"), use_container_width=True)
+        linhas = [{"etapa": e["etapa"], **l} for e in perfil.etapas if e["etapa"] in ETAPAS_PARSE for l in e.get("linhas", [])]
+        if linhas:
+            st.write("Linhas que mais alocaram no parse:")
+            st.dataframe(pd.DataFrame(linhas), use_container_width=True)
+
+# ========= Base consolidada =========
+def anexar_consolidado(df: pd.DataFrame):
+    """Acrescenta df à base da sessão (entidades internadas no registro, totais atualizados)."""
+    if df is None or df.empty:
+        return
+    registro = st.session_state.setdefault("entidades", RegistroEntidades())
+    st.session_state.setdefault("totais", TotaisIncrementais()).acrescentar(df)
+    novo = compactar_entidades(df, registro)
+    base = st.session_state.db_consolidado
+    for tipo in ENTIDADES:
+        # categorias só crescem no fim: a base antiga ganha as novas sem remapear os códigos
+        if tipo in base.columns and isinstance(base[tipo].dtype, pd.CategoricalDtype):
+            base[tipo] = base[tipo].cat.add_categories(registro.textos[tipo][len(base[tipo].cat.categories):])
+    st.session_state.db_consolidado = pd.concat([base, novo], ignore_index=True)
+
+def origem_consolidado(df: pd.DataFrame) -> pd.Series:
+    """Rótulo da importação de cada linha: arquivo do lote ou status + período da unidade."""
+    vazio = pd.Series("", index=df.index)
+    coluna = lambda c: df[c].fillna("").astype(str) if c in df.columns else vazio
+    arquivo = coluna("Arquivo_Origem")
+    unidade = vazio
+    if "Filtro_Status" in df.columns:
+        unidade = coluna("Filtro_Status") + " " + coluna("Periodo_Inicio") + "–" + coluna("Periodo_Fim")
+    return arquivo.where(arquivo.str.strip() != "", unidade).replace("", "(sem origem)").rename("Origem")
+
+def remover_consolidado(mascara) -> int:
+    """Tira da base as linhas marcadas e desconta-as dos totais; devolve quantas saíram."""
+    base = st.session_state.db_consolidado
+    mascara = np.asarray(mascara, dtype=bool)
+    if not mascara.any():
+        return 0
+    fica = base[~mascara].reset_index(drop=True)
+    totais = st.session_state.get("totais")
+    if totais is not None:
+        totais.remover(base[mascara], restante=fica)
+    st.session_state.db_consolidado = fica
+    return int(mascara.sum())
+
+def limpar_consolidado():
+    """Base, dicionários e totais da sessão do zero."""
+    st.session_state.db_consolidado = pd.DataFrame()
+    for chave in ("entidades", "totais"):
+        st.session_state.pop(chave, None)
+    st.session_state.unidades_carregadas = set()
+
+# ========= Visualização parcial do parse =========
+class TabelaParcial:
+    """
+    Callback ao_lote para a interface: barra de páginas lidas e uma tabela que cresce
+    conforme os lotes chegam. Os redesenhos são espaçados (intervalo_s), exceto o da
+    primeira linha; concluir() troca a parcial pelo DataFrame final sanitizado.
+    """
+    def __init__(self, rotulo: str = "📄 Lendo PDF", intervalo_s: float = 0.5):
+        self.rotulo = rotulo
+        self.intervalo_s = intervalo_s
+        self.barra = st.progress(0.0, text=f"{rotulo}...")
+        self.tabela = st.empty()
+        self.acumulado = None
+        self.linhas = 0
+        self.t0 = time.perf_counter()
+        self.primeira_linha_s = None
+        self._ultimo = 0.0
+
+    def __call__(self, n_pag: int, total: int, df_lote):
+        forcar = False
+        if df_lote is not None and not df_lote.empty:
+            self.acumulado = df_lote if self.acumulado is None else pd.concat([self.acumulado, df_lote], ignore_index=True)
+            self.linhas += len(df_lote)
+            if self.primeira_linha_s is None:
+                self.primeira_linha_s = round(time.perf_counter() - self.t0, 4)
+                forcar = True
+        agora = time.perf_counter()
+        if not (forcar or n_pag == total or agora - self._ultimo >= self.intervalo_s):
+            return
+        self._ultimo = agora
+        self.barra.progress(n_pag / total if total else 1.0,
+                            text=f"{self.rotulo}: página {n_pag}/{total} · {self.linhas} linha(s)")
+        if self.acumulado is not None:
+            self.tabela.dataframe(self.acumulado, use_container_width=True)
+
+    def concluir(self, df_final: pd.DataFrame):
+        self.barra.empty()
+        if df_final is None or df_final.empty:
+            self.tabela.empty()
+        else:
+            self.tabela.dataframe(df_final, use_container_width=True)
+        self.acumulado = None
+
+def mostrar_validacao(df: pd.DataFrame, max_linhas: int = 200) -> int:
+    """Aviso com as regras violadas e as linhas afetadas (validar_atendimentos); devolve quantas."""
+    if df is None or df.empty:
+        return 0
+    problemas, resumo = validar_atendimentos(df)
+    com_problema = problemas.any(axis=1).to_numpy()
+    total = int(com_problema.sum())
+    if total:
+        violadas = resumo[resumo["linhas"] > 0]
+        st.warning(f"⚠️ {total} de {len(df)} linha(s) com problema de qualidade: " + "; ".join(
+            f"{d} ({n})" for d, n in zip(violadas["descricao"], violadas["linhas"])))
+        afetadas = problemas[com_problema].head(max_linhas)
+        regras = afetadas.apply(lambda linha: ", ".join(afetadas.columns[linha.to_numpy()]), axis=1)
+        st.dataframe(df.loc[afetadas.index].assign(Problemas=regras), use_container_width=True)
+    return total
+
+# ========= Histórico (Parquet) =========
+def gravar_historico(df: pd.DataFrame, origem: str, status: str = None):
+    """anexar() sem derrubar quem chamou: o histórico é cópia, a base da sessão segue sem ele."""
+    try:
+        return HISTORICO.anexar(df, origem, status)
+    except Exception as e:
+        st.warning(f"⚠️ Histórico não gravado ({type(e).__name__}: {e}).")
+        return None
+
+# ========= Automação =========
+def processar_unidade(driver, wait, downloads, medidor, un: dict, cfg: dict) -> pd.DataFrame:
+    """Filtros → busca → relatório → exportação → parse de uma unidade. Levanta exceção em falha."""
+    status_sel, ini, fim = un["status"], un["ini"], un["fim"]
+    st.write(f"📝 Filtros → Negociação: **{un['negociacao']}**, Status: **{status_sel}**, Credenciado: **{un['credenciado'] or 'Todos'}**, Período: **{ini}–{fim}**")
+
+    with medidor.etapa("filtros", status=status_sel) as span_f:
+        span_f["alterados"] = aplicar_filtros(driver, wait, un["negociacao"], status_sel, un["credenciado"], ini, fim)
+
+    # Buscar
+    with medidor.etapa("busca", status=status_sel) as span_busca:
+        total_grade = buscar_atendimentos(driver, wait)
+        span_busca["linhas_grade"] = total_grade
+
+    # Grade vazia: nada a imprimir/exportar (poupa a renderização SSRS e a espera do download)
+    if total_grade == 0:
+        st.write(f"⏭️ {status_sel} {ini}–{fim}: nenhum atendimento na grade; exportação pulada.")
+        vazio = pd.DataFrame()
+        vazio.attrs["grade_vazia"] = True
+        return vazio
+    limite = cfg.get("limite_linhas_unidade") or 0
+    if limite and total_grade and total_grade > limite:
+        dias = len(pd.date_range(pd.to_datetime(ini, dayfirst=True), pd.to_datetime(fim, dayfirst=True)))
+        sugestao = max(1, dias * limite // total_grade)
+        span_busca["grande"] = True
+        st.warning(f"🧩 {status_sel} {ini}–{fim}: {total_grade} atendimentos (acima de {limite}). "
+                   f"Relatórios assim são lentos e frágeis; use blocos de ~{sugestao} dia(s) para dividir o período.")
+
+    # Seleciona e imprime (renderização SSRS)
+    with medidor.etapa("relatorio", status=status_sel):
+        dropdown = abrir_relatorio(driver, wait, cfg["espera_tela"])
+
+    nome_pdf = (
+        f"Relatorio_{status_sel.replace(' ', '_').replace('/','-')}_"
+        f"{ini.replace('/','-')}_a_{fim.replace('/','-')}.pdf"
+    )
+    destino_pdf = os.path.join(cfg.get("pasta_saida") or PASTA_FINAL, nome_pdf)
+    fonte_pdf = None  # caminho (download) ou bytes (exportação em memória)
 
-# ⚡ CORREÇÃO: clique seguro com retry + scroll
-def js_safe_click(driver, by, value, timeout=30, retries=3):
-    for attempt in range(retries):
+    with medidor.etapa("exportacao", status=status_sel) as span_exp:
+        Select(dropdown).select_by_value("PDF")
+        time.sleep(2)
+        if cfg["em_memoria"]:
+            try:
+                fonte_pdf = baixar_pdf_em_memoria(driver)
+                span_exp["modo"] = "memoria"
+            except Exception as e:
+                if cfg["debug"]: st.error(f"[memória] {e}; usando download")
+        if fonte_pdf is None:
+            export_btn = driver.find_element(By.ID, "ReportView_ReportToolbar_ExportGr_Export")
+            downloads.armar()
+            driver.execute_script("arguments[0].click();", export_btn)
+
+    if fonte_pdf is not None:
+        st.write(f"📥 PDF recebido em memória ({len(fonte_pdf)/1024:.0f} KB)")
+    else:
+        st.write("📥 Concluindo download do PDF...")
+        with medidor.etapa("download", status=status_sel) as span_dl:
+            baixado = downloads.aguardar(timeout=cfg["espera_download"])
+            if baixado:
+                shutil.move(baixado["caminho"], destino_pdf)
+                span_dl["pdf_bytes"] = os.path.getsize(destino_pdf)
+                span_dl["nome_sugerido"] = baixado["nome"]
+                fonte_pdf = destino_pdf
+                st.success(f"✅ PDF salvo: {destino_pdf}")
+    if fonte_pdf is None:
+        raise RuntimeError("PDF não encontrado após o download.")
+
+    registro, df_pdf = None, None
+    modo = cfg.get("modo", "text")
+    if cfg["arquivar"]:
+        with medidor.etapa("arquivo", status=status_sel) as span_arq:
+            try:
+                registro = ARQUIVO_PDF.guardar(fonte_pdf, un)
+                span_arq.update(novo=registro["novo"], alterado=registro["alterado"])
+                df_pdf = ARQUIVO_PDF.linhas(registro["sha256"], modo)
+            except Exception as e:
+                st.warning(f"⚠️ PDF não arquivado ({type(e).__name__}: {e}).")
+        if df_pdf is not None:
+            st.write(f"♻️ PDF idêntico a um já processado{' (sem mudança desde a última exportação)' if registro['alterado'] is False else ''}: "
+                     f"{len(df_pdf)} linha(s) reaproveitada(s), sem parse.")
+            ARQUIVO_PDF.registrar_parse(registro, df_pdf, reaproveitado=True, modo=modo)
+
+    if df_pdf is None:
+        with medidor.etapa("parse", status=status_sel, pdf_bytes=tamanho_fonte_pdf(fonte_pdf)) as span_parse:
+            parcial = TabelaParcial()
+            df_pdf = parse_pdf_to_atendimentos_df(fonte_pdf, mode=modo, debug=cfg["debug"], ao_lote=parcial)
+            parcial.concluir(df_pdf)
+            span_parse["linhas"] = len(df_pdf)
+            span_parse["primeira_linha_s"] = parcial.primeira_linha_s
+            span_parse["linhas_com_problema"] = mostrar_validacao(df_pdf)
+        if registro is not None:
+            try:
+                ARQUIVO_PDF.registrar_parse(registro, df_pdf, "ok" if not df_pdf.empty else "vazio", modo=modo)
+            except Exception as e:
+                st.warning(f"⚠️ Resultado do parse não registrado no arquivo ({type(e).__name__}: {e}).")
+    sair_do_iframe(driver)
+
+    if not df_pdf.empty:
+        df_pdf["Filtro_Negociacao"] = sanitize_value(un["negociacao"])
+        df_pdf["Filtro_Status"]     = sanitize_value(status_sel)
+        df_pdf["Filtro_Credenciado"] = sanitize_value(un["credenciado"])
+        df_pdf["Periodo_Inicio"]    = sanitize_value(ini)
+        df_pdf["Periodo_Fim"]       = sanitize_value(fim)
+    return df_pdf
+
+def _turno_navegador(cfg: dict, unidades: list, checkpoints: Checkpoints, medidor: MedidorEtapas,
+                     resultado: list, ao_concluir=None, ceder=None) -> list:
+    """
+    Uma sessão de navegador: login → TISS → Atendimentos e as unidades em sequência.
+    Devolve as unidades que ficaram para o próximo turno (quando ceder() pediu a vaga).
+    """
+    pasta_saida = cfg.get("pasta_saida") or PASTA_FINAL
+    pasta_job = os.path.join(DOWNLOAD_TEMPORARIO, medidor.run_id)
+    with medidor.etapa("driver"):
+        # exportação em memória: o download pela pasta é só o plano B, vigiado sem o log de performance
+        eventos = not cfg["em_memoria"]
+        driver = configurar_driver(enxuto=cfg["enxuto"], pasta_download=pasta_job, eventos_download=eventos)
+        downloads = RastreadorDownloads(driver, pasta_job, eventos=eventos)
+    try:
+        wait = WebDriverWait(driver, 40)
+
+        # 1) Login
+        st.write("🔑 Fazendo login...")
+        with medidor.etapa("login"):
+            fazer_login(driver, wait, cfg["usuario"], cfg["senha"], cfg["espera_tela"])
+
+        # 2) AMHPTISS
+        st.write("🔄 Acessando TISS...")
+        with medidor.etapa("tiss"):
+            abrir_tiss(driver, wait, cfg["espera_tela"], cfg["enxuto"])
+
+        # 3) Limpeza
+        st.write("🧹 Limpando tela...")
+        limpar_tela(driver)
+
+        # 4) Navegação
+        st.write("📂 Abrindo Atendimentos...")
+        with medidor.etapa("navegacao"):
+            url_atendimentos = abrir_atendimentos(driver)
+
+        # 5) Loop de unidades (status × período)
+        for n, un in enumerate(unidades):
+            if n and ceder and ceder():
+                st.write(f"⏸️ Outra sessão aguarda navegador: cedendo a vaga ({len(unidades) - n} unidade(s) restante(s)).")
+                return unidades[n:]
+            for tentativa in range(1, cfg.get("tentativas", 3) + 1):
+                try:
+                    df_un = processar_unidade(driver, wait, downloads, medidor, un, cfg)
+                    checkpoints.marcar_ok(un, df_un)
+                    if cfg.get("historico"):
+                        gravar_historico(df_un, origem=Checkpoints.chave(un), status=un["status"])
+                    resultado.append((un, "ok"))
+                    if ao_concluir:
+                        ao_concluir(un, df_un, "ok")
+                    break
+                except Exception as e:
+                    st.warning(f"⚠️ {un['status']} {un['ini']}–{un['fim']}: tentativa {tentativa} falhou ({e})")
+                    if tentativa == cfg.get("tentativas", 3):
+                        checkpoints.marcar_falha(un, str(e), tentativa)
+                        resultado.append((un, "falha"))
+                        try:
+                            driver.save_screenshot(os.path.join(pasta_saida, f"erro_{Checkpoints.chave(un)}.png"))
+                        except Exception:
+                            pass
+                        if ao_concluir:
+                            ao_concluir(un, None, "falha")
+                    # volta à tela de filtros na mesma sessão; se nem isso der, a execução inteira cai
+                    with medidor.etapa("recuperacao", status=un["status"]):
+                        recuperar_sessao(driver, wait, url_atendimentos)
+        return []
+    except Exception:
         try:
-            el = WebDriverWait(driver, timeout).until(
-                EC.presence_of_element_located((by, value))
+            driver.save_screenshot(os.path.join(pasta_saida, "erro_interceptado.png"))
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        shutil.rmtree(pasta_job, ignore_errors=True)
+
+def executar_automacao(cfg: dict, checkpoints: Checkpoints, medidor: MedidorEtapas, ao_concluir=None,
+                       fila: FilaNavegadores = None) -> list:
+    """
+    Processa as unidades não concluídas em turnos de navegador, com cfg["tentativas"] por
+    unidade. Com `fila`, cada turno ocupa uma vaga e a cede após cfg["unidades_por_turno"]
+    se outra sessão espera. ao_concluir(un, df_ou_None, estado) a cada unidade.
+    """
+    unidades = montar_unidades(cfg)
+    pendentes = [un for un in unidades if not checkpoints.concluida(un)]
+    for un in unidades:
+        if un not in pendentes and ao_concluir:
+            ao_concluir(un, None, "checkpoint")
+    if not pendentes:
+        st.write("✅ Todas as unidades já estavam concluídas (checkpoint).")
+        return []
+
+    resultado = []
+    if fila is None:
+        _turno_navegador(cfg, pendentes, checkpoints, medidor, resultado, ao_concluir)
+        return resultado
+
+    sessao = cfg.get("sessao", "")
+    por_turno = max(1, int(cfg.get("unidades_por_turno", 5)))
+    def _ao_esperar(posicao):
+        st.write(f"⏳ Aguardando navegador livre: posição {posicao} na fila ({fila.vagas} vaga(s) no servidor).")
+
+    while pendentes:
+        with medidor.etapa("fila", **fila.situacao()):
+            fila.entrar(sessao, ao_esperar=_ao_esperar, timeout=cfg.get("espera_fila"))
+        try:
+            inicio = len(resultado)
+            pendentes = _turno_navegador(
+                cfg, pendentes, checkpoints, medidor, resultado, ao_concluir,
+                ceder=lambda: len(resultado) - inicio >= por_turno and fila.deve_ceder(sessao),
             )
-            driver.execute_script("arguments[0].scrollIntoView(true);", el)
-            driver.execute_script("arguments[0].click();", el)
-            return
-        except (TimeoutException, ElementClickInterceptedException):
-            time.sleep(1)
-            if attempt == retries - 1:
-                raise
-
-# ========= Parser PDF (textual fallback) =========
-def parse_pdf_to_atendimentos_df(pdf_path: str, mode: str = "text", debug: bool = False) -> pd.DataFrame:
-    from PyPDF2 import PdfReader
-    import re
-
-    def _normalize_ws(s: str) -> str:
-        return re.sub(r"\s+", " ", s.replace("\u00A0", " ")).strip()
-
-    # Regex para capturar o início do registro (Atendimento e Guia são iguais e têm 8 dígitos)
-    # Ex: 63974312 63974312 13/01/2026
-    record_start_re = re.compile(r"(\d{8})\s+(\d{8})\s+(\d{2}/\d{2}/\d{4})")
-    val_re = re.compile(r"(\d{1,3}(?:\.\d{3})*,\d{2})")
-
-    def parse_by_text() -> pd.DataFrame:
-        reader = PdfReader(open(pdf_path, "rb"))
-        full_text = ""
-        for page in reader.pages:
-            full_text += page.extract_text() + " "
-        
-        big = _normalize_ws(full_text)
-        
-        # Identifica onde começa cada atendimento
-        matches = list(record_start_re.finditer(big))
-        parsed = []
-
-        for i in range(len(matches)):
-            start_idx = matches[i].start()
-            end_idx = matches[i+1].start() if i+1 < len(matches) else len(big)
-            chunk = big[start_idx:end_idx].strip()
-
-            # Extração básica do cabeçalho
-            atend, guia, data = matches[i].groups()
-            
-            # Tenta pegar a hora logo após a data
-            hora_match = re.search(r"(\d{2}:\d{2})", chunk)
-            hora = hora_match.group(1) if hora_match else ""
-
-            # Extração do Valor (último valor monetário do bloco)
-            valores = val_re.findall(chunk)
-            valor_total = valores[-1] if valores else "0,00"
-
-            # --- Lógica para o Miolo (Tipo Guia, Operadora, Beneficiário, Prestador, Credenciado) ---
-            # Removemos o que já pegamos para limpar a busca
-            miolo = chunk.replace(atend, "").replace(guia, "").replace(data, "").replace(valor_total, "").strip()
-            
-            # Identifica códigos de Prestador/Credenciado (padrão 000000-)
-            codes = list(re.finditer(r"(\d{5,7}-)", miolo))
-            
-            prestador = ""
-            credenciado = ""
-            
-            if len(codes) >= 2:
-                # O AMHP costuma colocar o Prestador antes do Credenciado ou vice-versa no texto extraído
-                # Mas quase sempre o penúltimo código é o Prestador e o último é o Credenciado (ou o contrário)
-                # Vamos capturar os blocos de texto que começam com esses códigos
-                p1_idx = codes[-2].start()
-                p2_idx = codes[-1].start()
-                
-                # Geralmente o Credenciado é a Clínica Diogenes Serquiz (014406)
-                # Vamos identificar pelo conteúdo
-                parte_a = miolo[p1_idx:p2_idx].strip()
-                parte_b = miolo[p2_idx:].strip()
-                
-                if "014406" in parte_a:
-                    credenciado = parte_a
-                    prestador = parte_b
-                else:
-                    prestador = parte_a
-                    credenciado = parte_b
-                
-                miolo_restante = miolo[:p1_idx].strip()
-            else:
-                miolo_restante = miolo
-
-            # Tipo de Guia e Operadora (Consulta, SP/SADT, etc)
-            tipos_conhecidos = ["Consulta", "SP/SADT", "Não TISS", "SADT"]
-            tipo_guia = ""
-            for t in tipos_conhecidos:
-                if t in miolo_restante:
-                    tipo_guia = t
-                    break
-            
-            # O que sobrar no miolo_restante costuma ser "Operadora + Matrícula + Beneficiário"
-            # Ex: "BACEN(104) 8787234X030501 Alynne Marques Silva"
-            info_ben = miolo_restante.replace(tipo_guia, "").replace(hora, "").strip()
-            
-            # Regex para pegar a Operadora com código: ex BACEN(104)
-            ope_match = re.search(r"([A-Z\s\-\.]+\(\w+\))", info_ben)
-            operadora = ope_match.group(1) if ope_match else ""
-            
-            # O restante após a operadora
-            pos_ope = info_ben.find(operadora) + len(operadora) if operadora else 0
-            sobra = info_ben[pos_ope:].strip()
-            
-            # Se houver um número longo, é a matrícula
-            mat_match = re.search(r"(\d{5,})", sobra)
-            matricula = mat_match.group(1) if mat_match else ""
-            beneficiario = sobra.replace(matricula, "").strip()
-
-            parsed.append({
-                "Atendimento": atend,
-                "NrGuia": guia,
-                "Realizacao": data,
-                "Hora": hora,
-                "TipoGuia": tipo_guia,
-                "Operadora": operadora,
-                "Matricula": matricula,
-                "Beneficiario": beneficiario,
-                "Credenciado": credenciado,
-                "Prestador": prestador,
-                "ValorTotal": valor_total,
-            })
-
-        return ensure_atendimentos_schema(pd.DataFrame(parsed))
-
-    return sanitize_df(parse_by_text())
+        finally:
+            fila.sair(sessao)
+    return resultado
 
 # ========= Sidebar =========
+# rótulo da interface → mode de parse_pdf_to_atendimentos_df ("coord" cai no textual se não achar linhas)
+MODOS_EXTRACAO = {"Coordenadas (recomendado)": "coord", "Texto (fallback)": "text"}
+MODO_EXTRACAO_PADRAO = "text"  # o que a automação sempre usou; coord é ~10x mais lento e separa Matricula/Beneficiario
+
 with st.sidebar:
     st.header("Configurações")
     data_ini    = st.text_input("📅 Data Inicial (dd/mm/aaaa)", value="01/01/2026")
@@ -267,168 +427,232 @@ with st.sidebar:
         default=["300 - Pronto para Processamento"]
     )
     wait_time_main     = st.number_input("⏱️ Tempo extra pós login/troca de tela (s)", min_value=0, value=10)
-    wait_time_download = st.number_input("⏱️ Tempo extra para concluir download (s)", min_value=10, value=18)
-    extraction_mode    = st.selectbox("🧠 Modo de extração do PDF (visual)", ["Coordenadas (recomendado)", "Texto (fallback)"])
+    wait_time_download = st.number_input("⏱️ Tempo máximo para concluir download (s)", min_value=10, value=60)
+    dias_bloco         = st.number_input("🧩 Dividir período em blocos de N dias (0 = não dividir)", min_value=0, value=0)
+    tentativas_unidade = st.number_input("🔁 Tentativas por status/bloco (mesma sessão)", min_value=1, max_value=10, value=3)
+    limite_linhas      = st.number_input("🧩 Avisar para dividir acima de N atendimentos por status/bloco (0 = não avisar)", min_value=0, value=3000)
+    extraction_mode    = st.selectbox("🧠 Modo de extração do PDF (visual)", list(MODOS_EXTRACAO),
+                                        index=list(MODOS_EXTRACAO.values()).index(MODO_EXTRACAO_PADRAO))
+    modo_extracao      = MODOS_EXTRACAO[extraction_mode]
     debug_parser       = st.checkbox("🧪 Debug do parser PDF", value=False)
+    navegacao_enxuta   = st.checkbox("🪶 Navegação enxuta (sem imagens/fontes/rastreadores)", value=True)
+    exportacao_memoria = st.checkbox("⚡ Exportar PDF em memória (sem pasta de download)", value=True)
+    arquivar_pdf       = st.checkbox("📦 Arquivar PDF exportado (por conteúdo, sem duplicatas)", value=True)
+    unidades_turno     = st.number_input("🔄 Unidades por turno quando há fila de usuários", min_value=1, value=5)
+    gravar_hist        = st.checkbox("🗄️ Gravar extrações no histórico (Parquet)", value=True)
+    perfilar           = st.checkbox("🔬 Perfilar esta execução (amostragem de pilhas)", value=False)
+    perfilar_memoria   = st.checkbox("🧠 Incluir memória no perfil (tracemalloc; execução bem mais lenta)", value=False,
+                                     disabled=not perfilar)
 
 # ========= PDF Manual =========
 with st.expander("🧪 Testar parser com upload de PDF (sem automação)", expanded=False):
     up = st.file_uploader("Envie um PDF do AMHPTISS para teste", type=["pdf"])
     if up and st.button("Processar PDF (teste)"):
-        tmp_pdf = os.path.join(DOWNLOAD_TEMPORARIO, "teste_upload.pdf")
-        with open(tmp_pdf, "wb") as f:
-            f.write(up.getvalue())
-        df_test = parse_pdf_to_atendimentos_df(tmp_pdf, mode="text", debug=debug_parser)
+        parcial = TabelaParcial()
+        perfil = PerfilExecucao(f"parse_{os.path.splitext(up.name)[0]}", memoria=perfilar_memoria) if perfilar else None
+        with perfil or contextlib.nullcontext():
+            df_test = parse_pdf_to_atendimentos_df(up, mode=modo_extracao, debug=debug_parser, ao_lote=parcial)
+        parcial.concluir(df_test)
+        if perfil is not None:
+            mostrar_perfil(perfil)
         if df_test.empty:
-            st.error("Parser não conseguiu extrair linhas deste PDF usando o modo textual.")
+            st.error(f"Parser não conseguiu extrair linhas deste PDF (modo {extraction_mode}).")
         else:
-            st.success(f"{len(df_test)} linha(s) extraída(s) pelo modo textual.")
-            st.dataframe(df_test, use_container_width=True)
+            st.success(f"{len(df_test)} linha(s) extraída(s) (modo {extraction_mode}) "
+                       f"(primeira linha em {parcial.primeira_linha_s:.2f}s).")
+            mostrar_validacao(df_test)
+
+# ========= Lote de PDFs =========
+with st.expander("📚 Importar lote de PDFs (vários arquivos, ZIP ou pasta do servidor)", expanded=False):
+    ups_lote = st.file_uploader("PDFs ou ZIPs do AMHPTISS", type=["pdf", "zip"], accept_multiple_files=True)
+    pasta_lote = st.text_input("📁 Pasta ou ZIP no servidor (opcional)", value="")
+    workers_lote = st.number_input("⚙️ Arquivos em paralelo", min_value=1, max_value=32, value=max(1, min(4, os.cpu_count() or 1)))
+    cache_lote = st.checkbox("🗃️ Reaproveitar extração já feita (cache por página)", value=True)
+    resumo_cache = CACHE_EXTRACAO.resumo()
+    st.caption(f"Cache de extração: {resumo_cache['pdfs']} PDF(s), {resumo_cache['paginas']} página(s), "
+               f"{resumo_cache['mb']:.1f} MB.")
+    if (ups_lote or pasta_lote.strip()) and st.button("Processar lote"):
+        try:
+            itens_lote = coletar_pdfs_lote(ups_lote, pasta_lote)
+        except Exception as e:
+            itens_lote = []
+            st.error(f"Erro ao ler o lote: {e}")
+        if itens_lote:
+            barra = st.progress(0.0, text=f"0/{len(itens_lote)} arquivo(s)")
+            log_lote = st.empty()
+
+            def _progresso(feitos, total, nome, linhas):
+                barra.progress(feitos / total, text=f"{feitos}/{total} arquivo(s)")
+                log_lote.write(f"{'✅' if linhas else '⚠️'} {nome}: {linhas if linhas is not None else 'erro'} linha(s)")
+
+            t0 = time.perf_counter()
+            df_lote, falhas_lote = processar_lote(itens_lote, workers=int(workers_lote), ao_concluir=_progresso,
+                                                  cache=cache_lote, modo=modo_extracao)
+            st.success(f"{len(df_lote)} linha(s) de {len(itens_lote) - len(falhas_lote)}/{len(itens_lote)} arquivo(s) "
+                       f"em {time.perf_counter() - t0:.1f}s.")
+            if not df_lote.empty:
+                anexar_consolidado(df_lote)
+                st.dataframe(df_lote, use_container_width=True)
+                mostrar_validacao(df_lote)
+                if gravar_hist:
+                    for nome_arq, df_arq in df_lote.groupby("Arquivo_Origem", sort=False):
+                        gravar_historico(df_arq, origem=f"lote:{nome_arq}")
+            if not falhas_lote.empty:
+                st.warning(f"{len(falhas_lote)} arquivo(s) com falha:")
+                st.dataframe(falhas_lote, use_container_width=True)
+
+# ========= Histórico =========
+with st.expander("🗄️ Carregar período do histórico (sem exportar de novo)", expanded=False):
+    resumo_hist = HISTORICO.resumo()
+    if resumo_hist.empty:
+        st.info("Histórico vazio: as extrações entram nele ao fim de cada unidade/lote.")
+    else:
+        st.caption(f"Histórico: {resumo_hist['arquivos'].sum()} arquivo(s) em {len(resumo_hist)} partição(ões), "
+                   f"{resumo_hist['mb'].sum():.1f} MB.")
+        c1, c2 = st.columns(2)
+        hist_ini = c1.text_input("📅 De (dd/mm/aaaa)", value=data_ini, key="hist_ini")
+        hist_fim = c2.text_input("📅 Até (dd/mm/aaaa)", value=data_fim, key="hist_fim")
+        hist_status = st.multiselect("📌 Status", options=sorted(resumo_hist["status"].unique()), key="hist_status")
+        if st.button("📥 Carregar do histórico"):
+            t0 = time.perf_counter()
+            try:
+                df_hist = HISTORICO.ler(hist_ini, hist_fim, status=hist_status or None)
+            except Exception as e:
+                df_hist = None
+                st.error(f"Erro ao ler o histórico: {e}")
+            if df_hist is not None:
+                st.success(f"{len(df_hist)} linha(s) do histórico em {time.perf_counter() - t0:.2f}s.")
+                if not df_hist.empty:
+                    anexar_consolidado(df_hist)
+
+# ========= Arquivo de PDFs =========
+with st.expander("📦 Arquivo de PDFs exportados", expanded=False):
+    resumo_arq = ARQUIVO_PDF.resumo()
+    if not resumo_arq["exportacoes"]:
+        st.info("Nenhum PDF arquivado ainda.")
+    else:
+        st.caption(f"{resumo_arq['exportacoes']} exportação(ões), {resumo_arq['pdfs']} PDF(s) distintos: "
+                   f"{resumo_arq['mb_arquivo']:.1f} MB em disco (sem deduplicação/compressão seriam "
+                   f"{resumo_arq['mb_sem_dedup']:.1f} MB).")
+        st.dataframe(ARQUIVO_PDF.exportacoes(), use_container_width=True)
 
 # ========= Botão principal =========
-if st.button("🚀 Iniciar Processo (PDF)"):
-    driver = configurar_driver()
+@st.cache_resource
+def obter_fila_navegadores() -> FilaNavegadores:
+    # uma fila por processo, compartilhada por todas as sessões
+    return FilaNavegadores(vagas_navegador())
+
+fila_navegadores = obter_fila_navegadores()
+if "sessao_id" not in st.session_state:
+    st.session_state.sessao_id = uuid.uuid4().hex[:12]
+# checkpoints e pastas de execução são do servidor: chave pelos filtros, limpeza por idade
+checkpoints = Checkpoints()
+if "unidades_carregadas" not in st.session_state:
+    st.session_state.unidades_carregadas = set()
+
+def _ao_concluir_unidade(un, df_un, estado):
+    chave = Checkpoints.chave(un)
+    if estado == "checkpoint":
+        # concluída na execução interrompida: só recarrega se a base desta sessão não tiver as linhas
+        if chave not in st.session_state.unidades_carregadas:
+            df_un = checkpoints.carregar_df(un)
+        st.write(f"⏭️ {un['status']} {un['ini']}–{un['fim']}: já concluída (retomando a execução anterior)")
+    if estado == "ok" or (estado == "checkpoint" and chave not in st.session_state.unidades_carregadas):
+        st.session_state.unidades_carregadas.add(chave)
+        if df_un is not None and not df_un.empty:
+            # a tabela da unidade já foi exibida durante o parse (TabelaParcial)
+            anexar_consolidado(df_un)
+        elif estado == "ok" and not (df_un is not None and df_un.attrs.get("grade_vazia")):
+            st.warning("⚠️ O parser não conseguiu extrair linhas do PDF.")
+    elif estado == "falha":
+        st.error(f"❌ {un['status']} {un['ini']}–{un['fim']}: falhou após as tentativas; será refeita na próxima execução.")
+
+situacao_fila = fila_navegadores.situacao()
+st.caption(f"🖥️ Navegadores no servidor: {situacao_fila['em_uso']}/{situacao_fila['vagas']} em uso, "
+           f"{situacao_fila['esperando']} sessão(ões) na fila.")
+
+filtros = {
+    "negociacao": negociacao,
+    "credenciado": credenciado_filter,
+    "status_list": status_list,
+    "data_ini": data_ini,
+    "data_fim": data_fim,
+    "dias_bloco": int(dias_bloco),
+}
+
+col_ini, col_ck = st.columns([3, 1])
+if col_ck.button("🗑️ Limpar checkpoints"):
     try:
-        with st.status("Executando automação...", expanded=True) as status:
-            wait = WebDriverWait(driver, 40)
-
-            # 1) Login
-            st.write("🔑 Fazendo login...")
-            driver.get("https://portal.amhp.com.br/")
-            wait.until(EC.presence_of_element_located((By.ID, "input-9"))).send_keys(st.secrets["credentials"]["usuario"])
-            driver.find_element(By.ID, "input-12").send_keys(st.secrets["credentials"]["senha"] + Keys.ENTER)
-            time.sleep(wait_time_main)
-
-            # 2) AMHPTISS
-            st.write("🔄 Acessando TISS...")
-            try:
-                btn_tiss = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'AMHPTISS')]")))
-                driver.execute_script("arguments[0].click();", btn_tiss)
-            except Exception:
-                elems = driver.find_elements(By.XPATH, "//*[contains(translate(., 'abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'TISS')]")
-                if elems:
-                    driver.execute_script("arguments[0].click();", elems[0])
-                else:
-                    raise RuntimeError("Não foi possível localizar AMHPTISS/TISS.")
-            time.sleep(wait_time_main)
-            if len(driver.window_handles) > 1:
-                driver.switch_to.window(driver.window_handles[-1])
-
-            # 3) Limpeza
-            st.write("🧹 Limpando tela...")
-            try:
-                driver.execute_script("""
-                    const avisos = document.querySelectorAll('center, #fechar-informativo, .modal');
-                    avisos.forEach(el => el.remove());
-                """)
-            except Exception:
-                pass
-
-            # 4) Navegação
-            st.write("📂 Abrindo Atendimentos...")
-            driver.execute_script("document.getElementById('IrPara').click();")
-            time.sleep(2)
-            js_safe_click(driver, By.XPATH, "//span[normalize-space()='Consultório']")
-            js_safe_click(driver, By.XPATH, "//a[@href='AtendimentosRealizados.aspx']")
-            time.sleep(3)
-
-            # 5) Loop de Status
-            for status_sel in status_list:
-                st.write(f"📝 Filtros → Negociação: **{negociacao}**, Status: **{status_sel}**, Credenciado: **{credenciado_filter or 'Todos'}**, Período: **{data_ini}–{data_fim}**")
-
-                neg_input  = wait.until(EC.presence_of_element_located((By.ID, "ctl00_MainContent_rcbTipoNegociacao_Input")))
-                stat_input = wait.until(EC.presence_of_element_located((By.ID, "ctl00_MainContent_rcbStatus_Input")))
-                driver.execute_script("arguments[0].value = arguments[1];", neg_input, negociacao); neg_input.send_keys(Keys.ENTER)
-                driver.execute_script("arguments[0].value = arguments[1];", stat_input, status_sel); stat_input.send_keys(Keys.ENTER)
-
-                # ⚡ Novo filtro Credenciado
-                if credenciado_filter.strip():
-                    cred_input = wait.until(
-                        EC.presence_of_element_located((By.ID, "ctl00_MainContent_rcbCredenciado_Input"))
-                    )
-                    driver.execute_script("arguments[0].value = arguments[1];", cred_input, credenciado_filter)
-                    cred_input.send_keys(Keys.ENTER)
-
-                d_ini_el = driver.find_element(By.ID, "ctl00_MainContent_rdpDigitacaoDataInicio_dateInput"); d_ini_el.clear(); d_ini_el.send_keys(data_ini + Keys.TAB)
-                d_fim_el = driver.find_element(By.ID, "ctl00_MainContent_rdpDigitacaoDataFim_dateInput"); d_fim_el.clear(); d_fim_el.send_keys(data_fim + Keys.TAB)
-
-                # Buscar
-                btn_buscar = driver.find_element(By.ID, "ctl00_MainContent_btnBuscar_input")
-                driver.execute_script("arguments[0].click();", btn_buscar)
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".rgMasterTable")))
-
-                # Seleciona e imprime
-                js_safe_click(driver, By.ID, "ctl00_MainContent_rdgAtendimentosRealizados_ctl00_ctl02_ctl00_SelectColumnSelectCheckBox")
-                time.sleep(2)
-                js_safe_click(driver, By.ID, "ctl00_MainContent_rbtImprimirAtendimentos_input")
-                time.sleep(wait_time_main)
-
-                # Iframe
-                if len(driver.find_elements(By.TAG_NAME, "iframe")) > 0:
-                    driver.switch_to.frame(0)
-
-                dropdown = wait.until(EC.presence_of_element_located((By.ID, "ReportView_ReportToolbar_ExportGr_FormatList_DropDownList")))
-                Select(dropdown).select_by_value("PDF")
-                time.sleep(2)
-                export_btn = driver.find_element(By.ID, "ReportView_ReportToolbar_ExportGr_Export")
-                driver.execute_script("arguments[0].click();", export_btn)
-
-                st.write("📥 Concluindo download do PDF...")
-                time.sleep(wait_time_download)
-
-                arquivos = [
-                    os.path.join(DOWNLOAD_TEMPORARIO, f)
-                    for f in os.listdir(DOWNLOAD_TEMPORARIO)
-                    if f.lower().endswith(".pdf")
-                ]
-                if arquivos:
-                    recente = max(arquivos, key=os.path.getctime)
-                    nome_pdf = (
-                        f"Relatorio_{status_sel.replace(' ', '_').replace('/','-')}_"
-                        f"{data_ini.replace('/','-')}_a_{data_fim.replace('/','-')}.pdf"
-                    )
-                    destino_pdf = os.path.join(PASTA_FINAL, nome_pdf)
-                    shutil.move(recente, destino_pdf)
-                    st.success(f"✅ PDF salvo: {destino_pdf}")
-
-                    df_pdf = parse_pdf_to_atendimentos_df(destino_pdf, mode="text", debug=debug_parser)
-                    if not df_pdf.empty:
-                        df_pdf["Filtro_Negociacao"] = sanitize_value(negociacao)
-                        df_pdf["Filtro_Status"]     = sanitize_value(status_sel)
-                        df_pdf["Filtro_Credenciado"] = sanitize_value(credenciado_filter)
-                        df_pdf["Periodo_Inicio"]    = sanitize_value(data_ini)
-                        df_pdf["Periodo_Fim"]       = sanitize_value(data_fim)
-                        st.session_state.db_consolidado = pd.concat([st.session_state.db_consolidado, df_pdf], ignore_index=True)
-                        st.dataframe(df_pdf, use_container_width=True)
-                    else:
-                        st.warning("⚠️ Modo textual não conseguiu extrair linhas.")
-
-                    try:
-                        driver.switch_to.default_content()
-                    except Exception:
-                        pass
-                else:
-                    st.error("❌ PDF não encontrado após o download.")
-                    try:
-                        driver.switch_to.default_content()
-                    except Exception:
-                        pass
-
-            status.update(label="✅ Fim do processo!", state="complete")
+        checkpoints.limpar(montar_unidades(filtros))
+        st.info("Checkpoints destes filtros apagados: a próxima execução exporta tudo de novo.")
+    except ValueError as e:
+        st.error(f"Período inválido: {e}")
+
+if col_ini.button("🚀 Iniciar Processo (PDF)"):
+    medidor = MedidorEtapas()
+    t_inicio = time.time()
+    checkpoints.podar()
+    podar_pastas_trabalho()
+    cfg = {
+        **filtros,
+        "sessao": st.session_state.sessao_id,
+        "pasta_saida": pasta_trabalho(st.session_state.sessao_id, medidor.run_id),
+        "unidades_por_turno": int(unidades_turno),
+        "limite_linhas_unidade": int(limite_linhas),
+        "tentativas": int(tentativas_unidade),
+        "espera_tela": wait_time_main,
+        "espera_download": wait_time_download,
+        "enxuto": navegacao_enxuta,
+        "em_memoria": exportacao_memoria,
+        "arquivar": arquivar_pdf,
+        "historico": gravar_hist,
+        "modo": modo_extracao,
+        "debug": debug_parser,
+    }
+    perfil = PerfilExecucao(f"automacao_{medidor.run_id}", memoria=perfilar_memoria) if perfilar else None
+    try:
+        cfg["usuario"] = st.secrets["credentials"]["usuario"]
+        cfg["senha"] = st.secrets["credentials"]["senha"]
+        with perfil or contextlib.nullcontext(), st.status("Executando automação...", expanded=True) as status:
+            resultado = executar_automacao(cfg, checkpoints, medidor, ao_concluir=_ao_concluir_unidade, fila=fila_navegadores)
+            falhas = [un for un, estado in resultado if estado == "falha"]
+            if falhas:
+                status.update(label=f"⚠️ Fim do processo com {len(falhas)} unidade(s) pendente(s) — rode de novo para retomar.", state="error")
+            else:
+                # nada a retomar: a próxima execução com os mesmos filtros exporta de novo
+                checkpoints.limpar(montar_unidades(cfg))
+                status.update(label="✅ Fim do processo!", state="complete")
 
     except Exception as e:
-        st.error(f"Erro detectado: {e}")
-        try:
-            shot = os.path.join(PASTA_FINAL, "erro_interceptado.png")
-            driver.save_screenshot(shot)
+        st.error(f"Erro detectado: {e} — as unidades concluídas ficaram salvas; rode de novo para retomar.")
+        shot = os.path.join(cfg["pasta_saida"], "erro_interceptado.png")
+        if os.path.exists(shot) and os.path.getmtime(shot) >= t_inicio:
             st.image(shot, caption="Screenshot do erro")
-        except Exception:
-            pass
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        if medidor.spans:
+            st.caption("⏱️ Tempo por etapa nesta execução: " + ", ".join(
+                f"{s['etapa']}{' [' + s['status'] + ']' if s.get('status') else ''} {s['duracao_s']:.1f}s" for s in medidor.spans
+            ))
+        if perfil is not None and (perfil.duracao_s or perfil.ignorado):
+            mostrar_perfil(perfil)
+        if cfg["arquivar"]:
+            # a compressão dos PDFs correu em paralelo aos parses; o resumo do arquivo a espera
+            for e in ARQUIVO_PDF.aguardar():
+                st.warning(f"⚠️ PDF não arquivado ({type(e).__name__}: {e}).")
+
+# ========= Tempos por etapa =========
+with st.expander("⏱️ Tempos por etapa (últimas execuções)", expanded=False):
+    df_metricas = carregar_metricas()
+    if df_metricas.empty:
+        st.info("Nenhuma execução registrada ainda.")
+    else:
+        st.dataframe(resumo_metricas(df_metricas), use_container_width=True)
+        c1, c2 = st.columns(2)
+        c1.download_button("📈 Métricas (Prometheus)", metricas_prometheus(df_metricas),
+            file_name="amhp_metricas.prom", mime="text/plain")
+        with open(ARQUIVO_METRICAS, "rb") as f:
+            c2.download_button("🧾 Spans (JSON lines)", f.read(),
+                file_name="metricas_etapas.jsonl", mime="application/json")
 
 # ========= Resultados & Export =========
 if not st.session_state.db_consolidado.empty:
@@ -441,3 +665,38 @@ if not st.session_state.db_consolidado.empty:
     st.download_button("💾 Baixar Consolidação (CSV)", csv_bytes,    file_name="consolidado_amhp.csv",
         mime="text/csv"
     )
+
+    totais = st.session_state.get("totais")
+    if totais is not None:
+        with st.expander("📈 Totais (Valor e guias)", expanded=False):
+            c1, c2 = st.columns(2)
+            dims_totais = c1.multiselect("Agrupar por", DIMENSOES_TOTAIS, default=["Status", "Operadora"])
+            status_totais = c2.multiselect("Status", sorted({c.split("\x1f")[0] for c in totais.chaves_grupo}))
+            df_totais = totais.resumo(dims_totais, status_totais or None)
+            st.caption(f"{len(totais.linhas)} guia(s) distintas contadas (linhas repetidas na base entram uma vez só).")
+            st.dataframe(df_totais, use_container_width=True, hide_index=True)
+
+    with st.expander("🧹 Remover importações da base", expanded=False):
+        origens = origem_consolidado(st.session_state.db_consolidado)
+        contagem_origens = origens.value_counts(sort=False)
+        remover_origens = st.multiselect("Importações", list(contagem_origens.index),
+                                         format_func=lambda o: f"{o} ({contagem_origens[o]} linha(s))")
+        c1, c2 = st.columns(2)
+        if c1.button("➖ Remover selecionadas", disabled=not remover_origens):
+            n = remover_consolidado(origens.isin(remover_origens).to_numpy())
+            st.success(f"{n} linha(s) removida(s) da base e dos totais.")
+            st.rerun()
+        if c2.button("🗑️ Limpar base"):
+            limpar_consolidado()
+            st.rerun()
+
+    registro_entidades = st.session_state.get("entidades")
+    if registro_entidades is not None:
+        with st.expander("🏷️ Dicionários de entidades (Operadora, Prestador, Credenciado)", expanded=False):
+            base = st.session_state.db_consolidado
+            for tipo, coluna in zip(ENTIDADES, st.columns(len(ENTIDADES))):
+                tabela = registro_entidades.tabela(tipo)
+                if tipo in base.columns and isinstance(base[tipo].dtype, pd.CategoricalDtype):
+                    tabela["linhas"] = np.bincount(base[tipo].cat.codes, minlength=len(tabela))[:len(tabela)]
+                coluna.write(f"**{tipo}** ({len(tabela) - 1})")
+                coluna.dataframe(tabela.iloc[1:], use_container_width=True, hide_index=True)
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Carrega o app.py (script Streamlit) como módulo e deixa o pacote amhp importável pelas ferramentas."""
+import os, sys, logging, importlib.util
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)  # pacote amhp, usado pelo app.py e direto pelas ferramentas
+
+def carregar_app():
+    if "app" in sys.modules:
+        return sys.modules["app"]
+    # fora do `streamlit run` os comandos st.* viram no-op; silencia os avisos de "bare mode"
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    logging.disable(logging.WARNING)
+    spec = importlib.util.spec_from_file_location("app", os.path.join(RAIZ, "app.py"))
+    app = importlib.util.module_from_spec(spec)
+    sys.modules["app"] = app
+    try:
+        spec.loader.exec_module(app)
+    finally:
+        logging.disable(logging.NOTSET)
+        streamlit.logger.set_log_level("error")
+    return app
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Compara os backends de extração (amhp.backends.BACKENDS_PDF) num corpus de PDFs do AMHPTISS e
+escolhe, por modo de parse, o mais rápido cuja saída mantém a precisão.
+
+Referência de precisão, por PDF:
+    --referencia PASTA  -> PASTA/<nome do pdf>.csv (sep=";"; ex.: consolidação conferida à mão)
+    sem --referencia    -> saída do motor histórico do modo (pypdf2 no textual, pdfplumber nas coordenadas)
+Precisão = linhas idênticas (todas as colunas de TARGET_COLS, como multiconjunto) / máx(referência, saída).
+
+Uso:
+    python ferramentas/bench_extracao.py relatorios/ outro.pdf --rodadas 3
+    python ferramentas/bench_extracao.py relatorios/ --gravar   # grava a escolha em backends_pdf.json
+"""
+import os, sys, argparse, json, time
+from collections import Counter
+
+import _app  # noqa: F401  (raiz do repositório no sys.path)
+from amhp import backends, esquema, extracao
+
+def _pdfs(caminhos: list) -> list:
+    saida = []
+    for c in caminhos:
+        if os.path.isdir(c):
+            saida.extend(os.path.join(r, f) for r, _, fs in os.walk(c) for f in sorted(fs) if f.lower().endswith(".pdf"))
+        elif c.lower().endswith(".pdf"):
+            saida.append(c)
+    return saida
+
+def _linhas(df) -> Counter:
+    return Counter(map(tuple, df[esquema.TARGET_COLS].astype(str).itertuples(index=False)))
+
+def precisao(ref, out) -> float:
+    a, b = _linhas(ref), _linhas(out)
+    base = max(sum(a.values()), sum(b.values()))
+    return 1.0 if base == 0 else sum((a & b).values()) / base
+
+def _referencia(pasta_ref: str, pdf: str, modo: str):
+    if pasta_ref:
+        arq = os.path.join(pasta_ref, os.path.splitext(os.path.basename(pdf))[0] + ".csv")
+        if os.path.exists(arq):
+            import pandas as pd
+            return esquema.ensure_atendimentos_schema(pd.read_csv(arq, sep=";", dtype=str, keep_default_na=False))
+    return extracao.parse_pdf_to_atendimentos_df(pdf, mode=modo, backend=backends.BACKEND_PADRAO[modo])
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("caminhos", nargs="+", help="PDFs ou pastas")
+    ap.add_argument("--modos", default="text,coord")
+    ap.add_argument("--rodadas", type=int, default=1, help="melhor tempo de N rodadas")
+    ap.add_argument("--referencia", default="", help="pasta com <pdf>.csv de referência")
+    ap.add_argument("--precisao-minima", type=float, default=1.0)
+    ap.add_argument("--gravar", action="store_true", help="grava a escolha (lida por escolher_backend)")
+    args = ap.parse_args()
+
+    pdfs = _pdfs(args.caminhos)
+    if not pdfs:
+        sys.exit("Nenhum PDF encontrado.")
+    print(f"{len(pdfs)} PDF(s); backends disponíveis: {', '.join(backends.backends_disponiveis('text'))}\n")
+
+    escolha = {}
+    for modo in args.modos.split(","):
+        refs = {pdf: _referencia(args.referencia, pdf, modo) for pdf in pdfs}
+        resultados = []
+        for nome in backends.backends_disponiveis(modo):
+            tempo, linhas, acertos = 0.0, 0, []
+            try:
+                for pdf in pdfs:
+                    melhor = None
+                    for _ in range(args.rodadas):
+                        t0 = time.perf_counter()
+                        df = extracao.parse_pdf_to_atendimentos_df(pdf, mode=modo, backend=nome)
+                        dt = time.perf_counter() - t0
+                        melhor = dt if melhor is None else min(melhor, dt)
+                    tempo += melhor
+                    linhas += len(df)
+                    acertos.append(precisao(refs[pdf], df))
+                erro = ""
+            except Exception as e:
+                erro = f"{type(e).__name__}: {e}"
+            prec = min(acertos) if acertos and not erro else 0.0
+            resultados.append({"backend": nome, "tempo_s": tempo, "linhas": linhas, "precisao_min": prec, "erro": erro})
+
+        print(f"modo {modo}")
+        print(f"  {'backend':<11} {'tempo (s)':>10} {'linhas':>8} {'precisão mín.':>14}")
+        for r in sorted(resultados, key=lambda r: r["tempo_s"]):
+            print(f"  {r['backend']:<11} {r['tempo_s']:>10.2f} {r['linhas']:>8} {r['precisao_min']:>14.4f}  {r['erro']}")
+        aptos = [r for r in resultados if not r["erro"] and r["precisao_min"] >= args.precisao_minima]
+        if aptos:
+            vencedor = min(aptos, key=lambda r: r["tempo_s"])
+            escolha[modo] = {**vencedor, "pdfs": len(pdfs), "medido_em": time.strftime("%Y-%m-%d %H:%M:%S")}
+            print(f"  → {vencedor['backend']}\n")
+        else:
+            print(f"  → nenhum backend atingiu precisão {args.precisao_minima}; mantém {backends.BACKEND_PADRAO[modo]}\n")
+
+    if args.gravar and escolha:
+        atual = {}
+        try:
+            with open(backends.ARQUIVO_BACKENDS, encoding="utf-8") as f:
+                atual = json.load(f)
+        except (OSError, ValueError):
+            pass
+        atual.update(escolha)
+        with open(backends.ARQUIVO_BACKENDS, "w", encoding="utf-8") as f:
+            json.dump(atual, f, ensure_ascii=False, indent=2)
+        print(f"Escolha gravada em {backends.ARQUIVO_BACKENDS}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Mede a memória do parser textual em um PDF grande (ex.: exportação de 500 páginas):
+RSS antes/depois e pico (VmHWM) de cada modo, cada um em um processo separado.
+
+    legado  -> arquivo bufferizado + texto do documento inteiro concatenado
+    fluxo   -> parse_pdf_to_atendimentos_df (mmap + página a página)
+
+Uso:
+    python ferramentas/bench_memoria.py relatorio_500_paginas.pdf
+"""
+import sys, json, subprocess, time
+
+import _app  # noqa: F401  (raiz do repositório no sys.path)
+
+def _status_mb(campo: str) -> float:
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1]) / 1024.0
+    return 0.0
+
+def _parse_legado(caminho: str) -> int:
+    from PyPDF2 import PdfReader
+    from amhp.esquema import _normalize_ws
+    from amhp.parser import _RECORD_START_RE, _registro_texto
+    reader = PdfReader(open(caminho, "rb"))
+    big = _normalize_ws(" ".join(p.extract_text() or "" for p in reader.pages))
+    matches = list(_RECORD_START_RE.finditer(big))
+    linhas = 0
+    for i, m in enumerate(matches):
+        fim = matches[i + 1].start() if i + 1 < len(matches) else len(big)
+        _registro_texto(big[m.start():fim].strip(), *m.groups())
+        linhas += 1
+    return linhas
+
+def _executar(modo: str, caminho: str):
+    from amhp.extracao import parse_pdf_to_atendimentos_df
+    antes = _status_mb("VmRSS")
+    t0 = time.perf_counter()
+    if modo == "legado":
+        linhas = _parse_legado(caminho)
+    else:
+        linhas = len(parse_pdf_to_atendimentos_df(caminho))
+    print(json.dumps({
+        "modo": modo, "linhas": linhas, "tempo_s": time.perf_counter() - t0,
+        "rss_antes_mb": antes, "rss_depois_mb": _status_mb("VmRSS"), "pico_mb": _status_mb("VmHWM"),
+    }))
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--modo":
+        _executar(sys.argv[2], sys.argv[3])
+        return
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    caminho = sys.argv[1]
+    print(f"{'modo':<7} {'linhas':>7} {'tempo (s)':>10} {'RSS antes':>10} {'RSS depois':>11} {'pico':>8}  (MB)")
+    for modo in ("legado", "fluxo"):
+        out = subprocess.run([sys.executable, __file__, "--modo", modo, caminho],
+                             capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{r['modo']:<7} {r['linhas']:>7} {r['tempo_s']:>10.2f} {r['rss_antes_mb']:>10.1f} "
+              f"{r['rss_depois_mb']:>11.1f} {r['pico_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da navegação enxuta (configurar_driver(enxuto=True)) contra um site local
+que imita o peso das páginas do portal: imagens, fontes, CSS, scripts e rastreadores.
+
+Uso:
+    python ferramentas/bench_navegador.py --rodadas 5 --imagens 40 --latencia-ms 40
+"""
+import os, argparse, statistics, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import _app  # noqa: F401  (raiz do repositório no sys.path)
+from amhp.navegador import configurar_driver
+
+PNG_1PX = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d4944415478da6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+def _pagina(n_imagens: int) -> bytes:
+    imgs = "".join(f'<img src="/img/banner_{i}.png?pad={"x" * 16}">' for i in range(n_imagens))
+    html = f"""<!DOCTYPE html><html><head>
+<link rel="stylesheet" href="/css/site.css">
+<script src="/WebResource.axd?d=telerik"></script>
+<script async src="/gtag/js?id=G-LOCAL"></script>
+<script src="/analytics.js"></script>
+</head><body>
+<input id="input-9"><input id="input-12" type="password">
+<button>AMHPTISS</button>
+<div class="banners">{imgs}</div>
+</body></html>"""
+    return html.encode("utf-8")
+
+def _servidor(n_imagens: int, latencia_s: float, peso_kb: int):
+    pagina = _pagina(n_imagens)
+    pesado = b"\0" * (peso_kb * 1024)
+    contagem = {"requisicoes": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            contagem["requisicoes"] += 1
+            caminho = self.path.split("?")[0]
+            if caminho == "/":
+                corpo, tipo = pagina, "text/html; charset=utf-8"
+            elif caminho.endswith(".css"):
+                corpo = b"@font-face{font-family:Portal;src:url(/fonts/portal.woff2)} body{font-family:Portal}"
+                tipo = "text/css"
+            elif caminho.endswith(".png"):
+                time.sleep(latencia_s)
+                corpo, tipo = PNG_1PX + pesado, "image/png"
+            elif caminho.endswith(".woff2"):
+                time.sleep(latencia_s)
+                corpo, tipo = pesado, "font/woff2"
+            else:
+                time.sleep(latencia_s)
+                corpo, tipo = b"/* js */", "application/javascript"
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, contagem
+
+def rss_arvore_mb(pid_raiz: int) -> float:
+    """Soma o VmRSS do processo e de todos os descendentes (Linux /proc)."""
+    filhos = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            filhos.setdefault(ppid, []).append(int(d))
+        except (OSError, ValueError, IndexError):
+            continue
+    total_kb, pilha = 0, [pid_raiz]
+    while pilha:
+        pid = pilha.pop()
+        pilha.extend(filhos.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmRSS:"):
+                        total_kb += int(linha.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024.0
+
+def medir(url: str, enxuto: bool, rodadas: int) -> dict:
+    driver = configurar_driver(enxuto=enxuto)
+    try:
+        tempos, recursos = [], []
+        for _ in range(rodadas):
+            t0 = time.perf_counter()
+            driver.get(url)
+            driver.find_element("id", "input-9")
+            tempos.append(time.perf_counter() - t0)
+            recursos.append(driver.execute_script("return performance.getEntriesByType('resource').length"))
+        rss = rss_arvore_mb(driver.service.process.pid)
+    finally:
+        driver.quit()
+    return {
+        "p50_s": statistics.median(tempos),
+        "max_s": max(tempos),
+        "recursos": statistics.median(recursos),
+        "rss_mb": rss,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rodadas", type=int, default=5)
+    ap.add_argument("--imagens", type=int, default=40)
+    ap.add_argument("--latencia-ms", type=int, default=40, help="latência artificial por recurso pesado")
+    ap.add_argument("--peso-kb", type=int, default=64, help="tamanho de cada imagem/fonte")
+    args = ap.parse_args()
+
+    srv, contagem = _servidor(args.imagens, args.latencia_ms / 1000.0, args.peso_kb)
+    url = f"http://127.0.0.1:{srv.server_address[1]}/"
+    try:
+        resultados = {}
+        for nome, enxuto in (("padrão", False), ("enxuto", True)):
+            contagem["requisicoes"] = 0
+            r = medir(url, enxuto, args.rodadas)
+            r["requisicoes_servidor"] = contagem["requisicoes"] / args.rodadas
+            resultados[nome] = r
+    finally:
+        srv.shutdown()
+
+    print(f"{'perfil':<8} {'p50 (s)':>8} {'máx (s)':>8} {'recursos':>9} {'req/pág':>8} {'RSS (MB)':>9}")
+    for nome, r in resultados.items():
+        print(f"{nome:<8} {r['p50_s']:>8.3f} {r['max_s']:>8.3f} {r['recursos']:>9.0f} "
+              f"{r['requisicoes_servidor']:>8.1f} {r['rss_mb']:>9.1f}")
+    p, e = resultados["padrão"], resultados["enxuto"]
+    print(f"\nEconomia por página: {p['p50_s'] - e['p50_s']:.3f}s "
+          f"({(1 - e['p50_s'] / p['p50_s']) * 100 if p['p50_s'] else 0:.0f}%), "
+          f"memória por driver: {p['rss_mb'] - e['rss_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
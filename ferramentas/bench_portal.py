@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark/regressão de ponta a ponta contra o portal simulado (portal_simulado.py):
+sobe o servidor local, roda executar_automacao com Chrome de verdade e confere, por
+unidade (status × período), as linhas extraídas contra as linhas geradas pelo portal.
+
+Uso:
+    python ferramentas/bench_portal.py --status "300 - Pronto para Processamento" --status "600 - Glosado" \\
+        --data-ini 01/01/2026 --data-fim 31/01/2026 --dias-bloco 10 --linhas-dia 40 --rodadas 3 --enxuto --em-memoria
+
+Sai com código 1 se alguma unidade falhar ou vier com número de linhas diferente.
+"""
+import os, sys, argparse, shutil, statistics, tempfile, time
+
+from _app import carregar_app
+from amhp import portal
+import portal_simulado
+
+def rodar(app, cfg: dict, config_portal: dict, pasta: str) -> dict:
+    checkpoints = app.Checkpoints(os.path.join(pasta, "checkpoints"))
+    medidor = app.MedidorEtapas(os.path.join(pasta, "metricas.jsonl"))
+    t0 = time.perf_counter()
+    resultado = app.executar_automacao(cfg, checkpoints, medidor)
+    total_s = time.perf_counter() - t0
+
+    divergencias = []
+    for un, estado in resultado:
+        esperado = portal_simulado.linhas_esperadas(un["status"], un["ini"], un["fim"], config_portal)
+        obtido = len(checkpoints.carregar_df(un)) if estado == "ok" else None
+        if obtido != esperado:
+            divergencias.append({**un, "estado": estado, "esperado": esperado, "obtido": obtido})
+    return {"total_s": total_s, "unidades": len(resultado), "divergencias": divergencias, "spans": medidor.spans}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--status", action="append", help="pode repetir; padrão: 300 e 600")
+    ap.add_argument("--data-ini", default="01/01/2026")
+    ap.add_argument("--data-fim", default="10/01/2026")
+    ap.add_argument("--dias-bloco", type=int, default=0)
+    ap.add_argument("--rodadas", type=int, default=1)
+    ap.add_argument("--tentativas", type=int, default=3)
+    ap.add_argument("--espera-tela", type=float, default=1.0, help="sleeps fixos que ainda restam no fluxo (s)")
+    ap.add_argument("--enxuto", action="store_true")
+    ap.add_argument("--em-memoria", action="store_true")
+    portal_simulado.adicionar_argumentos(ap)
+    args = ap.parse_args()
+
+    config_portal = portal_simulado._args_config(args)
+    srv, url, estatisticas = portal_simulado.iniciar_servidor(config_portal)
+    app = carregar_app()
+    portal.URL_PORTAL = url
+
+    cfg = {
+        "usuario": "bench", "senha": "bench",
+        "negociacao": "Direto", "credenciado": "",
+        "status_list": args.status or ["300 - Pronto para Processamento", "600 - Glosado"],
+        "data_ini": args.data_ini, "data_fim": args.data_fim, "dias_bloco": args.dias_bloco,
+        "tentativas": args.tentativas, "espera_tela": args.espera_tela, "espera_download": 60,
+        "enxuto": args.enxuto, "em_memoria": args.em_memoria, "arquivar": False, "debug": False,
+    }
+
+    rodadas, falhou = [], False
+    try:
+        for n in range(args.rodadas):
+            pasta = tempfile.mkdtemp(prefix="bench_portal_")
+            pasta_final = app.PASTA_FINAL
+            app.PASTA_FINAL = pasta  # PDFs baixados e screenshots ficam fora da pasta real
+            try:
+                r = rodar(app, cfg, config_portal, pasta)
+            finally:
+                app.PASTA_FINAL = pasta_final
+                shutil.rmtree(pasta, ignore_errors=True)
+            rodadas.append(r)
+            print(f"rodada {n + 1}: {r['total_s']:.2f}s, {r['unidades']} unidades, {len(r['divergencias'])} divergências")
+            for d in r["divergencias"]:
+                falhou = True
+                print(f"   ✗ {d['status']} {d['ini']}–{d['fim']}: {d['estado']}, esperado {d['esperado']}, obtido {d['obtido']}")
+    finally:
+        srv.shutdown()
+
+    por_etapa = {}
+    for r in rodadas:
+        for s in r["spans"]:
+            por_etapa.setdefault(s["etapa"], []).append(s["duracao_s"])
+    print(f"\n{'etapa':<12} {'n':>4} {'p50 (s)':>8} {'máx (s)':>8} {'total (s)':>10}")
+    for etapa, tempos in por_etapa.items():
+        print(f"{etapa:<12} {len(tempos):>4} {statistics.median(tempos):>8.3f} {max(tempos):>8.3f} {sum(tempos):>10.2f}")
+    print(f"\nexecução: p50 {statistics.median(r['total_s'] for r in rodadas):.2f}s  |  servidor: {estatisticas}")
+    sys.exit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Teste de carga: N sessões simultâneas (como N usuários do faturamento no mesmo servidor
+Streamlit) rodando executar_automacao contra o portal simulado, disputando a mesma
+FilaNavegadores. Cada sessão tem pasta de trabalho e checkpoints próprios.
+
+Relata vazão (unidades/min), espera na fila, duração por sessão, pico de RSS do
+processo + navegadores e a memória livre mínima — base para dimensionar o servidor.
+
+Uso:
+    python ferramentas/carga_sessoes.py --sessoes 8 --vagas 3 --status "300 - Pronto para Processamento" \\
+        --data-ini 01/01/2026 --data-fim 10/01/2026 --dias-bloco 5 --lat-exportacao 800
+    (sem --vagas, usa vagas_navegador(): RAM livre / AMHP_MB_POR_NAVEGADOR)
+"""
+import os, sys, argparse, shutil, statistics, tempfile, threading, time
+
+from _app import carregar_app
+from amhp import navegador, portal
+from bench_navegador import rss_arvore_mb
+import portal_simulado
+
+def _p95(valores: list) -> float:
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(0.95 * (len(valores) - 1))))] if valores else 0.0
+
+def sessao(app, fila, nome: str, cfg_base: dict, config_portal: dict, raiz: str, saida: dict):
+    pasta = os.path.join(raiz, nome)
+    medidor = app.MedidorEtapas(os.path.join(raiz, "metricas.jsonl"))
+    checkpoints = app.Checkpoints(os.path.join(pasta, "checkpoints"))
+    cfg = {**cfg_base, "sessao": nome, "pasta_saida": navegador.pasta_trabalho(nome, medidor.run_id)}
+    t0 = time.perf_counter()
+    erro = None
+    try:
+        resultado = app.executar_automacao(cfg, checkpoints, medidor, fila=fila)
+    except Exception as e:
+        resultado, erro = [], f"{type(e).__name__}: {str(e).strip()}"
+    divergentes = 0
+    for un, estado in resultado:
+        esperado = portal_simulado.linhas_esperadas(un["status"], un["ini"], un["fim"], config_portal)
+        if estado != "ok" or len(checkpoints.carregar_df(un)) != esperado:
+            divergentes += 1
+    saida[nome] = {
+        "duracao_s": time.perf_counter() - t0,
+        "unidades": len(resultado),
+        "divergentes": divergentes,
+        "erro": erro,
+        "fila_s": sum(s["duracao_s"] for s in medidor.spans if s["etapa"] == "fila"),
+        "turnos": sum(1 for s in medidor.spans if s["etapa"] == "login"),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessoes", type=int, default=4)
+    ap.add_argument("--vagas", type=int, default=0, help="vagas de navegador (0 = pela RAM disponível)")
+    ap.add_argument("--intervalo", type=float, default=0.5, help="segundos entre o início de cada sessão")
+    ap.add_argument("--status", action="append")
+    ap.add_argument("--data-ini", default="01/01/2026")
+    ap.add_argument("--data-fim", default="10/01/2026")
+    ap.add_argument("--dias-bloco", type=int, default=5)
+    ap.add_argument("--unidades-por-turno", type=int, default=5)
+    ap.add_argument("--espera-tela", type=float, default=1.0)
+    ap.add_argument("--enxuto", action="store_true")
+    ap.add_argument("--em-memoria", action="store_true")
+    portal_simulado.adicionar_argumentos(ap)
+    args = ap.parse_args()
+
+    config_portal = portal_simulado._args_config(args)
+    srv, url, estatisticas = portal_simulado.iniciar_servidor(config_portal)
+    app = carregar_app()
+    portal.URL_PORTAL = url
+    raiz = tempfile.mkdtemp(prefix="carga_sessoes_")
+    navegador.PASTA_SESSOES = os.path.join(raiz, "sessoes")
+    fila = navegador.FilaNavegadores(args.vagas or navegador.vagas_navegador())
+
+    cfg_base = {
+        "usuario": "carga", "senha": "carga", "negociacao": "Direto", "credenciado": "",
+        "status_list": args.status or ["300 - Pronto para Processamento"],
+        "data_ini": args.data_ini, "data_fim": args.data_fim, "dias_bloco": args.dias_bloco,
+        "tentativas": 3, "espera_tela": args.espera_tela, "espera_download": 60,
+        "enxuto": args.enxuto, "em_memoria": args.em_memoria, "arquivar": False, "debug": False,
+        "unidades_por_turno": args.unidades_por_turno,
+    }
+
+    # amostra a memória do processo (Streamlit simulado) + chromedriver/Chrome filhos
+    pico = {"rss_mb": rss_arvore_mb(os.getpid()), "livre_min_mb": navegador.memoria_disponivel_mb()}
+    parar = threading.Event()
+    def _amostrar():
+        while not parar.wait(0.5):
+            pico["rss_mb"] = max(pico["rss_mb"], rss_arvore_mb(os.getpid()))
+            pico["livre_min_mb"] = min(pico["livre_min_mb"], navegador.memoria_disponivel_mb())
+    threading.Thread(target=_amostrar, daemon=True).start()
+
+    saida, threads = {}, []
+    t0 = time.perf_counter()
+    try:
+        for i in range(args.sessoes):
+            t = threading.Thread(target=sessao, args=(app, fila, f"s{i + 1:02d}", cfg_base, config_portal, raiz, saida))
+            t.start()
+            threads.append(t)
+            time.sleep(args.intervalo)
+        for t in threads:
+            t.join()
+    finally:
+        total_s = time.perf_counter() - t0
+        parar.set()
+        srv.shutdown()
+        shutil.rmtree(raiz, ignore_errors=True)
+
+    print(f"{'sessão':<7} {'unid.':>6} {'turnos':>7} {'fila (s)':>9} {'total (s)':>10}  erro")
+    for nome, r in sorted(saida.items()):
+        print(f"{nome:<7} {r['unidades']:>6} {r['turnos']:>7} {r['fila_s']:>9.1f} {r['duracao_s']:>10.1f}  {r['erro'] or ''}")
+    unidades = sum(r["unidades"] for r in saida.values())
+    duracoes = [r["duracao_s"] for r in saida.values()]
+    esperas = [r["fila_s"] for r in saida.values()]
+    print(f"\nvagas: {fila.vagas} | sessões: {args.sessoes} | unidades: {unidades} em {total_s:.1f}s "
+          f"→ {60 * unidades / max(total_s, 1e-9):.1f} unidades/min")
+    print(f"sessão: p50 {statistics.median(duracoes):.1f}s, p95 {_p95(duracoes):.1f}s | "
+          f"fila: p50 {statistics.median(esperas):.1f}s, p95 {_p95(esperas):.1f}s")
+    print(f"memória: pico RSS {pico['rss_mb']:.0f} MB (~{pico['rss_mb'] / fila.vagas:.0f} MB por vaga), "
+          f"RAM livre mínima {pico['livre_min_mb']:.0f} MB | portal: {estatisticas}")
+    falhou = any(r["erro"] or r["divergentes"] for r in saida.values())
+    sys.exit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+Portal AMHP simulado para rodar e cronometrar o fluxo Selenium sem rede e sem credenciais.
+
+Reproduz só o que o app.py usa:
+    /                              login (input-9 / input-12 + ENTER)
+    /home                          botão AMHPTISS (abre o TISS em nova aba)
+    /tiss/Default.aspx             aviso <center>, #fechar-informativo, #IrPara, menu Consultório
+    /tiss/AtendimentosRealizados.aspx
+                                   RadComboBox/RadDatePicker (API cliente $find), PageRequestManager,
+                                   Buscar → RadGrid (.rgMasterTable / rgNoRecords / .rgInfoPart),
+                                   Imprimir → iframe do ReportViewer
+    /tiss/Relatorio.aspx           FormatList (PDF), botão Export e ExportUrlBase no HTML
+    /Reserved.ReportViewerWebControl.axd
+                                   exportação do PDF (exige o cookie de sessão)
+
+As latências (ms) e o volume de linhas são configuráveis; o número de linhas de cada
+unidade é determinístico (linhas_esperadas), então o benchmark confere o parse de ponta a ponta.
+
+Uso:
+    python ferramentas/portal_simulado.py --porta 8765 --linhas-dia 40 --lat-exportacao 1500
+    AMHP_PORTAL_URL=http://127.0.0.1:8765/ streamlit run app.py
+"""
+import argparse, html, json, random, threading, time, uuid, zlib
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+LATENCIAS_PADRAO = {
+    "pagina": 150,      # cada página HTML
+    "login": 400,       # POST do login
+    "postback": 250,    # cada alteração de filtro (RadComboBox/RadDatePicker)
+    "busca": 800,       # Buscar → RadGrid
+    "relatorio": 1200,  # renderização SSRS do iframe
+    "exportacao": 1500, # geração do PDF
+}
+
+CONFIG_PADRAO = {
+    "linhas_dia": 20,        # linhas por dia do período, por status
+    "linhas_status": {},     # sobrescreve linhas_dia por status (ex.: {"300 - Pronto para Processamento": 0})
+    "linhas_pagina_pdf": 40,
+    "falhas_exportacao": 0,  # as N primeiras exportações devolvem HTTP 500 (exercita as tentativas)
+    "latencias_ms": LATENCIAS_PADRAO,
+}
+
+SESSAO_COOKIE = "ASP.NET_SessionId"
+ID_SELECIONAR_TODOS = "ctl00_MainContent_rdgAtendimentosRealizados_ctl00_ctl02_ctl00_SelectColumnSelectCheckBox"
+
+STATUS_OPCOES = [
+    "300 - Pronto para Processamento",
+    "350 - Correção Concluída",
+    "400 - Em Processamento",
+    "600 - Glosado",
+    "700 - Pago",
+]
+NEGOCIACOES = ["Direto", "Intercâmbio", "Todos"]
+OPERADORAS = ["BACEN(104)", "CASSI(201)", "GEAP(33)", "SAUDE CAIXA(7)"]
+TIPOS_GUIA = ["Consulta", "SP/SADT", "Consulta"]
+NOMES = ["Fulano De Tal Silva", "Maria Aparecida Souza", "Joao Pedro Lima", "Ana Beatriz Rocha"]
+
+# ========= Dados determinísticos =========
+def _dias(ini: str, fim: str) -> list:
+    d0, d1 = datetime.strptime(ini, "%d/%m/%Y"), datetime.strptime(fim, "%d/%m/%Y")
+    return [(d0 + timedelta(days=i)).strftime("%d/%m/%Y") for i in range((d1 - d0).days + 1)]
+
+def linhas_esperadas(status: str, ini: str, fim: str, config: dict = None) -> int:
+    cfg = {**CONFIG_PADRAO, **(config or {})}
+    por_dia = cfg["linhas_status"].get(status, cfg["linhas_dia"])
+    return por_dia * len(_dias(ini, fim))
+
+def _valor_br(centavos: int) -> str:
+    return f"{centavos // 100:,}".replace(",", ".") + f",{centavos % 100:02d}"
+
+def gerar_linhas(status: str, ini: str, fim: str, config: dict = None) -> list:
+    """Linhas da grade/relatório: a mesma unidade gera sempre as mesmas linhas; dias distintos não se repetem."""
+    cfg = {**CONFIG_PADRAO, **(config or {})}
+    por_dia = cfg["linhas_status"].get(status, cfg["linhas_dia"])
+    faixa_status = zlib.crc32(status.encode("utf-8")) % 20
+    linhas = []
+    for data in _dias(ini, fim):
+        dia = datetime.strptime(data, "%d/%m/%Y")
+        rnd = random.Random(f"{status}|{data}")
+        # 8 dígitos (como no portal): faixa por status + faixa de 2000 números por dia
+        base = 10_000_000 + faixa_status * 4_000_000 + (dia.toordinal() % 2_000) * 2_000
+        for i in range(por_dia):
+            atend = str(base + i).zfill(8)[-8:]
+            linhas.append([
+                atend, atend, data, f"{8 + i % 10:02d}:{(i * 7) % 60:02d}",
+                TIPOS_GUIA[i % 3], OPERADORAS[i % 4], f"87872{i % 10000:04d}X03", NOMES[i % 4],
+                "014406- CLINICA DIOG", f"0{12345 + i % 5}- DR MEDICO {i % 5}",
+                _valor_br(rnd.randint(5_000, 250_000)),
+            ])
+    return linhas
+
+# ========= PDF (escritor mínimo, só biblioteca padrão) =========
+COLUNAS_PDF = [("Atendimento", 20), ("Nr Guia", 75), ("Realização", 130), ("Hora", 185), ("Tipo Guia", 215),
+               ("Operadora", 265), ("Matrícula", 340), ("Beneficiário", 420), ("Credenciado", 530),
+               ("Prestador", 640), ("Valor Total", 760)]
+LARGURA, ALTURA = 842, 595  # A4 paisagem
+
+def _txt_pdf(s: str) -> bytes:
+    return s.encode("cp1252", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def _conteudo(itens: list) -> bytes:
+    """itens: [(tamanho_fonte, x, y, texto)] → stream de conteúdo com um BT/ET por célula (como o SSRS)."""
+    partes = []
+    for tam, x, y, texto in itens:
+        partes.append(b"BT /F1 %d Tf 1 0 0 1 %d %d Tm (%s) Tj ET" % (tam, x, y, _txt_pdf(texto)))
+    return b"\n".join(partes)
+
+def gerar_pdf(linhas: list, filtros: dict, linhas_pagina: int = 40) -> bytes:
+    paginas = [[
+        (12, 40, ALTURA - 60, "AMHP - Atendimentos Realizados"),
+        (9, 40, ALTURA - 80, f"Status: {filtros.get('status', '')}"),
+        (9, 40, ALTURA - 95, f"Período: {filtros.get('ini', '')} a {filtros.get('fim', '')}"),
+        (9, 40, ALTURA - 110, f"Credenciado: {filtros.get('credenciado') or 'Todos'}"),
+    ]]
+    for i in range(0, len(linhas), linhas_pagina):
+        itens = [(7, x, ALTURA - 50, nome) for nome, x in COLUNAS_PDF]
+        y = ALTURA - 70
+        for linha in linhas[i:i + linhas_pagina]:
+            itens.extend((7, x, y, valor) for (_, x), valor in zip(COLUNAS_PDF, linha))
+            y -= 12
+        paginas.append(itens)
+    total = sum(int(l[-1].replace(".", "").replace(",", "")) for l in linhas)
+    paginas.append([(9, 40, ALTURA - 60, f"Total R$ {_valor_br(total)}")])
+
+    # objetos: 1 catálogo, 2 árvore de páginas, 3 fonte, depois (página, conteúdo) por página
+    objs = {3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    kids = []
+    for n, itens in enumerate(paginas):
+        id_pag, id_cont = 4 + 2 * n, 5 + 2 * n
+        kids.append(b"%d 0 R" % id_pag)
+        objs[id_pag] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                        b"/Contents %d 0 R >>" % (LARGURA, ALTURA, id_cont))
+        dados = zlib.compress(_conteudo(itens))
+        objs[id_cont] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(dados), dados)
+    objs[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objs[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    saida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for oid in sorted(objs):
+        offsets[oid] = len(saida)
+        saida += b"%d 0 obj\n%s\nendobj\n" % (oid, objs[oid])
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for oid in sorted(objs):
+        saida += b"%010d 00000 n \n" % offsets[oid]
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, inicio_xref)
+    return bytes(saida)
+
+# ========= Páginas =========
+PAGINA_LOGIN = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>Portal AMHP (simulado)</title></head><body>
+<form method="post" action="/login">
+  <input id="input-9" name="usuario" autocomplete="off">
+  <input id="input-12" name="senha" type="password">
+  <button type="submit">Entrar</button>
+</form></body></html>"""
+
+PAGINA_HOME = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>Portal AMHP</title></head><body>
+<h1>Bem-vindo</h1>
+<button onclick="window.open('/tiss/Default.aspx', '_blank')">AMHPTISS</button>
+</body></html>"""
+
+PAGINA_TISS = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>AMHPTISS</title></head><body>
+<center style="position:fixed;inset:0;background:#fffa">Informativo importante <a id="fechar-informativo" href="#">fechar</a></center>
+<button id="IrPara" onclick="document.getElementById('menu').style.display='block'">Ir para</button>
+<ul id="menu" style="display:none">
+  <li><span onclick="document.getElementById('sub').style.display='block'">Consultório</span>
+    <ul id="sub" style="display:none"><li><a href="AtendimentosRealizados.aspx">Atendimentos Realizados</a></li></ul>
+  </li>
+</ul></body></html>"""
+
+def _combo(base: str, valor: str, opcoes: list) -> str:
+    itens = "".join(f"<li>{html.escape(o)}</li>" for o in opcoes)
+    return (f'<div id="{base}" class="RadComboBox"><input id="{base}_Input" class="rcbInput" '
+            f'value="{html.escape(valor)}" data-postback="1"><ul class="rcbList" style="display:none">{itens}</ul></div>')
+
+def _data(base: str, valor: str) -> str:
+    return (f'<div id="{base}" class="RadPicker"><input id="{base}_dateInput" class="riTextBox" '
+            f'value="{html.escape(valor)}" data-postback="1"></div>')
+
+PAGINA_ATENDIMENTOS = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>Atendimentos Realizados</title>
+<script>
+(function () {
+  let emPostback = false;
+  window.Sys = {WebForms: {PageRequestManager: {getInstance: () => ({get_isInAsyncPostBack: () => emPostback})}}};
+  window.__postback = function (rota, params, aoConcluir) {
+    emPostback = true;
+    fetch(rota + '?' + new URLSearchParams(params), {credentials: 'include'})
+      .then(r => r.text()).then(t => { aoConcluir && aoConcluir(t); })
+      .finally(() => { emPostback = false; });
+  };
+  const filtros = () => {
+    const v = id => document.getElementById(id).value;
+    return {negociacao: v('ctl00_MainContent_rcbTipoNegociacao_Input'), status: v('ctl00_MainContent_rcbStatus_Input'),
+            credenciado: v('ctl00_MainContent_rcbCredenciado_Input'),
+            ini: v('ctl00_MainContent_rdpDigitacaoDataInicio_dateInput'), fim: v('ctl00_MainContent_rdpDigitacaoDataFim_dateInput')};
+  };
+  window.__filtros = filtros;
+  const pad = n => String(n).padStart(2, '0');
+  window.$find = function (id) {
+    const root = document.getElementById(id);
+    if (!root) return null;
+    if (root.classList.contains('RadComboBox')) {
+      const input = document.getElementById(id + '_Input');
+      const definir = t => { input.value = t; window.__postback('/tiss/postback', {campo: id}); };
+      return {
+        findItemByText: t => [...root.querySelectorAll('li')].some(li => li.textContent === t) ? {select: () => definir(t)} : null,
+        set_text: t => { input.value = t; }, commitChanges: () => definir(input.value),
+      };
+    }
+    const input = document.getElementById(id + '_dateInput');
+    return {set_selectedDate: d => {
+      input.value = pad(d.getDate()) + '/' + pad(d.getMonth() + 1) + '/' + d.getFullYear();
+      window.__postback('/tiss/postback', {campo: id});
+    }};
+  };
+  document.addEventListener('keydown', e => {
+    if (e.target.dataset && e.target.dataset.postback && (e.key === 'Enter' || e.key === 'Tab'))
+      window.__postback('/tiss/postback', {campo: e.target.id});
+  });
+  window.__buscar = () => window.__postback('/tiss/grade', filtros(), t => { document.getElementById('grade').innerHTML = t; });
+  window.__imprimir = () => {
+    const f = document.createElement('iframe');
+    f.src = 'Relatorio.aspx?' + new URLSearchParams(filtros());
+    f.width = 900; f.height = 600;
+    document.body.appendChild(f);
+  };
+})();
+</script></head><body>
+<center>Aviso: manutenção programada <a id="fechar-informativo" href="#">fechar</a></center>
+<form onsubmit="return false">
+%(campos)s
+<span class="RadButton"><input id="ctl00_MainContent_btnBuscar_input" type="button" value="Buscar" onclick="__buscar()"></span>
+<span class="RadButton"><input id="ctl00_MainContent_rbtImprimirAtendimentos_input" type="button" value="Imprimir" onclick="__imprimir()"></span>
+</form>
+<div id="grade"></div>
+</body></html>"""
+
+PAGINA_RELATORIO = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>ReportViewer</title></head><body>
+<div id="ReportView">
+<select id="ReportView_ReportToolbar_ExportGr_FormatList_DropDownList">
+  <option value="">Selecione um formato</option><option value="XML">XML</option>
+  <option value="CSV">CSV</option><option value="PDF">PDF</option><option value="EXCELOPENXML">Excel</option>
+</select>
+<a id="ReportView_ReportToolbar_ExportGr_Export" href="#" onclick="window.location.href = __exportar(); return false;">Exportar</a>
+</div>
+<script>
+window.__rvInit = function () { return %(config_js)s; };
+window.__exportar = function () {
+  const f = document.getElementById('ReportView_ReportToolbar_ExportGr_FormatList_DropDownList').value;
+  return __rvInit().ExportUrlBase + f;
+};
+</script></body></html>"""
+
+def _grade(linhas: list, tamanho_pagina: int = 10) -> str:
+    if not linhas:
+        corpo = '<tr class="rgNoRecords"><td colspan="12">Nenhum registro encontrado.</td></tr>'
+        pager = ""
+    else:
+        corpo = "".join(
+            f'<tr class="rgRow"><td><input type="checkbox"></td>{"".join(f"<td>{html.escape(v)}</td>" for v in l)}</tr>'
+            for l in linhas[:tamanho_pagina]
+        )
+        paginas = -(-len(linhas) // tamanho_pagina)
+        pager = (f'<tfoot><tr class="rgPager"><td colspan="12"><div class="rgInfoPart">'
+                 f'<strong>{len(linhas)}</strong> items in <strong>{paginas}</strong> pages</div></td></tr></tfoot>')
+    cab = "".join(f"<th>{html.escape(n)}</th>" for n, _ in COLUNAS_PDF)
+    return (f'<table id="ctl00_MainContent_rdgAtendimentosRealizados_ctl00" class="rgMasterTable">'
+            f'<thead><tr><th><input type="checkbox" id="{ID_SELECIONAR_TODOS}"></th>{cab}</tr></thead>'
+            f'{pager}<tbody>{corpo}</tbody></table>')
+
+# ========= Servidor =========
+def criar_handler(config: dict, estatisticas: dict):
+    lat = {**LATENCIAS_PADRAO, **config.get("latencias_ms", {})}
+    trava = threading.Lock()
+    sessoes = set()
+
+    def dormir(chave: str):
+        if lat.get(chave):
+            time.sleep(lat[chave] / 1000.0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def _sessao(self) -> str:
+            for parte in (self.headers.get("Cookie") or "").split(";"):
+                nome, _, valor = parte.strip().partition("=")
+                if nome == SESSAO_COOKIE and valor in sessoes:
+                    return valor
+            return ""
+
+        def _responder(self, corpo, tipo="text/html; charset=utf-8", status=200, extra=None):
+            if isinstance(corpo, str):
+                corpo = corpo.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def _redirecionar(self, destino: str, extra=None):
+            self.send_response(303)
+            self.send_header("Location", destino)
+            self.send_header("Content-Length", "0")
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+
+        def do_POST(self):
+            with trava:
+                estatisticas["requisicoes"] += 1
+            if urlparse(self.path).path != "/login":
+                return self._responder("não encontrado", status=404)
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(tamanho).decode("utf-8"))
+            dormir("login")
+            if not form.get("usuario") or not form.get("senha"):
+                return self._redirecionar("/")
+            sid = uuid.uuid4().hex
+            with trava:
+                sessoes.add(sid)
+                estatisticas["logins"] += 1
+            self._redirecionar("/home", {"Set-Cookie": f"{SESSAO_COOKIE}={sid}; Path=/; HttpOnly"})
+
+        def do_GET(self):
+            with trava:
+                estatisticas["requisicoes"] += 1
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+            caminho = url.path
+
+            if caminho == "/":
+                dormir("pagina")
+                return self._responder(PAGINA_LOGIN)
+            if caminho == "/favicon.ico":
+                return self._responder(b"", "image/x-icon", 404)
+            if not self._sessao():
+                return self._redirecionar("/") if not caminho.endswith(".axd") else self._responder("sessão expirada", status=401)
+
+            if caminho == "/home":
+                dormir("pagina")
+                return self._responder(PAGINA_HOME)
+            if caminho == "/tiss/Default.aspx":
+                dormir("pagina")
+                return self._responder(PAGINA_TISS)
+            if caminho == "/tiss/AtendimentosRealizados.aspx":
+                dormir("pagina")
+                hoje = datetime.now().strftime("%d/%m/%Y")
+                campos = "\n".join([
+                    _combo("ctl00_MainContent_rcbTipoNegociacao", "Todos", NEGOCIACOES),
+                    _combo("ctl00_MainContent_rcbStatus", "Todos", ["Todos"] + STATUS_OPCOES),
+                    _combo("ctl00_MainContent_rcbCredenciado", "", []),
+                    _data("ctl00_MainContent_rdpDigitacaoDataInicio", hoje),
+                    _data("ctl00_MainContent_rdpDigitacaoDataFim", hoje),
+                ])
+                return self._responder(PAGINA_ATENDIMENTOS % {"campos": campos})
+            if caminho == "/tiss/postback":
+                dormir("postback")
+                with trava:
+                    estatisticas["postbacks"] += 1
+                return self._responder("ok", "text/plain")
+            if caminho == "/tiss/grade":
+                dormir("busca")
+                with trava:
+                    estatisticas["buscas"] += 1
+                return self._responder(_grade(self._linhas(q)))
+            if caminho == "/tiss/Relatorio.aspx":
+                dormir("relatorio")
+                params = urlencode({"OpType": "Export", "ControlID": uuid.uuid4().hex, "Culture": "1046",
+                                    "status": q.get("status", ""), "ini": q.get("ini", ""), "fim": q.get("fim", ""),
+                                    "credenciado": q.get("credenciado", ""), "ContentDisposition": "OnlyHtmlInline"})
+                base = "/Reserved.ReportViewerWebControl.axd?" + params + "&Format="
+                # como o SSRS serializa: barras escapadas e & como &
+                config_js = json.dumps({"ExportUrlBase": base}).replace("/", "\\/").replace("&", "\\u0026")
+                return self._responder(PAGINA_RELATORIO % {"config_js": config_js})
+            if caminho == "/Reserved.ReportViewerWebControl.axd":
+                dormir("exportacao")
+                with trava:
+                    estatisticas["exportacoes"] += 1
+                    falhar = estatisticas["exportacoes"] <= config.get("falhas_exportacao", 0)
+                if falhar:
+                    return self._responder("falha simulada na renderização", status=500)
+                if q.get("Format") != "PDF":
+                    return self._responder("formato não suportado no simulador", status=400)
+                pdf = gerar_pdf(self._linhas(q), q, config.get("linhas_pagina_pdf", 40))
+                with trava:
+                    estatisticas["pdf_bytes"] += len(pdf)
+                return self._responder(pdf, "application/pdf",
+                                       extra={"Content-Disposition": 'attachment; filename="AtendimentosRealizados.pdf"'})
+            return self._responder("não encontrado", status=404)
+
+        def _linhas(self, q: dict) -> list:
+            status = q.get("status", "")
+            if not status or status == "Todos" or not q.get("ini") or not q.get("fim"):
+                return []
+            return gerar_linhas(status, q["ini"], q["fim"], config)
+
+    return Handler
+
+def iniciar_servidor(config: dict = None, host: str = "127.0.0.1", porta: int = 0):
+    """Sobe o portal numa thread; devolve (servidor, url_base, estatisticas). Pare com servidor.shutdown()."""
+    cfg = {**CONFIG_PADRAO, **(config or {})}
+    estatisticas = {"requisicoes": 0, "logins": 0, "postbacks": 0, "buscas": 0, "exportacoes": 0, "pdf_bytes": 0}
+    servidor = ThreadingHTTPServer((host, porta), criar_handler(cfg, estatisticas))
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}/", estatisticas
+
+def _args_config(args) -> dict:
+    linhas_status = {}
+    for item in args.linhas_status or []:
+        status, _, n = item.rpartition("=")
+        linhas_status[status] = int(n)
+    return {
+        "linhas_dia": args.linhas_dia,
+        "linhas_status": linhas_status,
+        "linhas_pagina_pdf": args.linhas_pagina_pdf,
+        "falhas_exportacao": args.falhas_exportacao,
+        "latencias_ms": {k: getattr(args, f"lat_{k}") for k in LATENCIAS_PADRAO},
+    }
+
+def adicionar_argumentos(ap: argparse.ArgumentParser):
+    ap.add_argument("--linhas-dia", type=int, default=CONFIG_PADRAO["linhas_dia"])
+    ap.add_argument("--linhas-status", action="append", metavar="STATUS=N",
+                    help='linhas por dia de um status específico, ex.: "600 - Glosado=0"')
+    ap.add_argument("--linhas-pagina-pdf", type=int, default=CONFIG_PADRAO["linhas_pagina_pdf"])
+    ap.add_argument("--falhas-exportacao", type=int, default=0)
+    for k, v in LATENCIAS_PADRAO.items():
+        ap.add_argument(f"--lat-{k}", type=int, default=v, metavar="MS")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--porta", type=int, default=8765)
+    adicionar_argumentos(ap)
+    args = ap.parse_args()
+    servidor, url, estatisticas = iniciar_servidor(_args_config(args), porta=args.porta)
+    print(f"Portal simulado em {url}  (AMHP_PORTAL_URL={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+        print(json.dumps(estatisticas, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
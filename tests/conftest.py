@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Pacote amhp e simulador do portal importáveis; pastas de trabalho do app num diretório temporário."""
+import os, sys, tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "ferramentas")]
+
+# amhp.caminhos cria automacao_pdf/temp_downloads no import (em ~/Desktop ou no cwd)
+os.environ["HOME"] = tempfile.mkdtemp(prefix="amhp_testes_")
+os.chdir(os.environ["HOME"])
+
+import portal_simulado  # noqa: E402
+
+FILTROS = {"status": "700 - Pago", "ini": "01/03/2024", "fim": "03/03/2024"}
+
+@pytest.fixture(scope="session")
+def linhas_portal():
+    return portal_simulado.gerar_linhas(FILTROS["status"], FILTROS["ini"], FILTROS["fim"], {"linhas_dia": 30})
+
+@pytest.fixture(scope="session")
+def pdf_portal(linhas_portal) -> bytes:
+    """90 linhas em 3 páginas de dados, entre a capa e a página "Total R$"."""
+    return portal_simulado.gerar_pdf(linhas_portal, FILTROS, linhas_pagina=40)
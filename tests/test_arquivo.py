@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from amhp import extracao
+from amhp.arquivo import ArquivoPDF
+from amhp.extracao import parse_pdf_to_atendimentos_df
+
+UN = {"negociacao": "Direto", "status": "700 - Pago", "credenciado": "", "ini": "01/03/2024", "fim": "03/03/2024"}
+
+def test_guardar_em_segundo_plano_e_reaproveitar(pdf_portal, tmp_path):
+    arq = ArquivoPDF(str(tmp_path))
+    registro = arq.guardar(pdf_portal, UN)
+    assert registro["novo"] and registro["alterado"] is None
+    assert arq.linhas(registro["sha256"]) is None
+    df = parse_pdf_to_atendimentos_df(pdf_portal, cache=False)
+    arq.registrar_parse(registro, df)
+    assert arq.aguardar() == []
+    assert arq.abrir(registro["sha256"]) == pdf_portal
+    assert arq.resumo()["pdfs"] == 1
+
+    de_novo = arq.guardar(pdf_portal, UN)
+    assert not de_novo["novo"] and de_novo["alterado"] is False
+    assert arq.linhas(de_novo["sha256"]).equals(df)
+    assert arq.linhas(de_novo["sha256"], "coord") is None
+
+def test_linhas_de_outra_revisao_nao_valem(pdf_portal, tmp_path, monkeypatch):
+    arq = ArquivoPDF(str(tmp_path))
+    registro = arq.guardar(pdf_portal, UN)
+    arq.registrar_parse(registro, parse_pdf_to_atendimentos_df(pdf_portal, cache=False))
+    monkeypatch.setattr(extracao, "_hash_codigo_parse", lambda: "codigo_novo")
+    assert arq.linhas(registro["sha256"]) is None
+    arq.aguardar()
+
+@pytest.mark.parametrize("modo, motores", [("text", 1), ("coord", 2)])
+def test_revisao_parse(modo, motores):
+    revisao = extracao.revisao_parse(modo)
+    assert revisao.startswith(extracao._hash_codigo_parse() + "/")
+    assert revisao.count("@") == motores  # coord inclui o motor do fallback textual
+    assert extracao.revisao_parse(modo, "pdfminer" if modo == "coord" else "pdfplumber") != revisao
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from amhp.backends import BackendPDF, BackendPyPDF2, BackendPdfplumber
+from amhp.cache import CacheExtracao, BackendComCache, _codificar_palavras, _decodificar_palavras
+
+class _Contador(BackendPDF):
+    """Repassa ao motor e conta as páginas que ele realmente extraiu."""
+    def __init__(self, motor: BackendPDF):
+        self.motor, self.nome, self.modulo, self.extraidas = motor, motor.nome, motor.modulo, []
+
+    def versao(self) -> str:
+        return self.motor.versao()
+
+    def textos(self, fonte, paginas=None):
+        for item in self.motor.textos(fonte, paginas):
+            self.extraidas.append(item[0])
+            yield item
+
+    def palavras(self, fonte, paginas=None):
+        for item in self.motor.palavras(fonte, paginas):
+            if item[4] is not None:  # páginas fora de `paginas` saem sem tamanho
+                self.extraidas.append(item[0])
+            yield item
+
+def test_codificar_palavras_ida_e_volta():
+    words = [{"text": "Atendimento", "x0": 20.0, "x1": 61.5, "top": 45.25, "bottom": 52.0},
+             {"text": "Valor Total", "x0": 760.0, "x1": 801.0, "top": 45.25, "bottom": 52.0}]
+    assert _decodificar_palavras(*_codificar_palavras(words)) == words
+    assert _decodificar_palavras(*_codificar_palavras([])) == []
+
+def test_textos_do_cache(pdf_portal, tmp_path):
+    cache = CacheExtracao(str(tmp_path / "cache.sqlite"))
+    direto = list(BackendPyPDF2().textos(pdf_portal))
+    motor = _Contador(BackendPyPDF2())
+    assert list(BackendComCache(motor, cache).textos(pdf_portal)) == direto
+    assert motor.extraidas == [1, 2, 3, 4, 5]
+    # segunda leitura (outra instância, mesma chave): nenhuma página passa pelo motor
+    motor.extraidas.clear()
+    assert list(BackendComCache(motor, CacheExtracao(cache.arquivo)).textos(pdf_portal)) == direto
+    assert motor.extraidas == []
+    assert cache.resumo()["paginas"] == 5
+
+def test_palavras_do_cache_so_as_que_faltam(pdf_portal, tmp_path):
+    cache = CacheExtracao(str(tmp_path / "cache.sqlite"))
+    motor = _Contador(BackendPdfplumber())
+    list(BackendComCache(motor, cache).palavras(pdf_portal, {2, 3}))
+    motor.extraidas.clear()
+    saida = {n: (words, tamanho) for n, _, words, _, tamanho in BackendComCache(motor, cache).palavras(pdf_portal, {2, 3, 4})}
+    assert motor.extraidas == [4]
+    direto = {n: (words, tamanho) for n, _, words, _, tamanho in BackendPdfplumber().palavras(pdf_portal, {2, 3, 4})}
+    for n in (2, 3, 4):
+        assert [w["text"] for w in saida[n][0]] == [w["text"] for w in direto[n][0]]
+        assert saida[n][1] == direto[n][1]
+
+def test_limpar(pdf_portal, tmp_path):
+    cache = CacheExtracao(str(tmp_path / "cache.sqlite"))
+    list(BackendComCache(BackendPyPDF2(), cache).textos(pdf_portal))
+    cache.limpar()
+    assert cache.resumo()["paginas"] == 0
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pandas as pd
+
+from amhp.checkpoints import Checkpoints
+
+U1 = {"negociacao": "Direto", "status": "700 - Pago", "credenciado": "", "ini": "01/03/2024", "fim": "15/03/2024"}
+U2 = {**U1, "ini": "16/03/2024", "fim": "31/03/2024"}
+
+def test_retoma_em_outra_instancia(tmp_path):
+    df = pd.DataFrame({"Atendimento": ["10000001", "10000002"], "ValorTotal": ["1,00", "0012,00"]})
+    ck = Checkpoints(str(tmp_path))
+    ck.marcar_ok(U1, df)
+    ck.marcar_falha(U2, "timeout", 1)
+    # recarregar a página/reiniciar o servidor: mesma pasta, mesmos filtros
+    ck = Checkpoints(str(tmp_path))
+    assert ck.concluida(U1) and not ck.concluida(U2)
+    assert ck.estado(U2)["estado"] == "falha"
+    pd.testing.assert_frame_equal(ck.carregar_df(U1), df)  # texto preservado ("0012,00")
+    assert Checkpoints.chave(U1) == Checkpoints.chave(dict(reversed(list(U1.items()))))
+    assert Checkpoints.chave(U1) != Checkpoints.chave(U2)
+
+def test_unidade_vazia_conta_como_concluida(tmp_path):
+    ck = Checkpoints(str(tmp_path))
+    ck.marcar_ok(U1, pd.DataFrame())
+    assert ck.concluida(U1)
+    assert ck.carregar_df(U1).empty
+
+def test_expira_pela_validade(tmp_path):
+    ck = Checkpoints(str(tmp_path), validade_s=0)
+    ck.marcar_ok(U1, pd.DataFrame({"Atendimento": ["1"]}))
+    assert not ck.concluida(U1)
+
+def test_limpar_so_as_unidades_pedidas(tmp_path):
+    ck = Checkpoints(str(tmp_path))
+    for un in (U1, U2):
+        ck.marcar_ok(un, pd.DataFrame({"Atendimento": ["1"]}))
+    ck.limpar([U1])
+    assert not ck.concluida(U1) and ck.concluida(U2)
+
+def test_podar_arquivos_antigos(tmp_path):
+    ck = Checkpoints(str(tmp_path), validade_s=3600)
+    for un in (U1, U2):
+        ck.marcar_ok(un, pd.DataFrame({"Atendimento": ["1"]}))
+    for nome in os.listdir(tmp_path):
+        if Checkpoints.chave(U1) in nome:
+            os.utime(tmp_path / nome, (0, 0))
+    assert ck.podar() == 2
+    assert not ck.concluida(U1) and ck.concluida(U2)
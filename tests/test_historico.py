@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from amhp.historico import HistoricoParquet
+
+def _linhas(status, datas, valor="10,00"):
+    return pd.DataFrame({"Atendimento": [f"{10000000 + i}" for i in range(len(datas))], "Realizacao": datas,
+                         "ValorTotal": valor, "Filtro_Status": status})
+
+def test_anexar_e_ler_por_periodo_e_status(tmp_path):
+    hist = HistoricoParquet(str(tmp_path))
+    assert hist.anexar(_linhas("700 - Pago", ["30/01/2024", "01/02/2024", "15/02/2024"]), origem="a") == 3
+    assert hist.anexar(_linhas("600 - Glosado", ["10/02/2024"]), origem="b") == 1
+    assert sorted(hist.ler()["Realizacao"]) == ["01/02/2024", "10/02/2024", "15/02/2024", "30/01/2024"]
+    assert hist.ler("01/02/2024", "10/02/2024")["Realizacao"].tolist() in (
+        ["01/02/2024", "10/02/2024"], ["10/02/2024", "01/02/2024"])
+    assert hist.ler(status=["700 - Pago"])["Filtro_Status"].unique().tolist() == ["700 - Pago"]
+    assert hist.ler(status=["600"])["Realizacao"].tolist() == ["10/02/2024"]
+    resumo = hist.resumo()
+    assert list(zip(resumo["status"], resumo["ano"], resumo["mes"])) == [("700", 2024, 1), ("600", 2024, 2), ("700", 2024, 2)]
+
+def test_reanexar_a_mesma_origem_substitui(tmp_path):
+    hist = HistoricoParquet(str(tmp_path))
+    hist.anexar(_linhas("700 - Pago", ["01/02/2024", "02/02/2024"]), origem="a")
+    hist.anexar(_linhas("700 - Pago", ["01/02/2024"], valor="99,00"), origem="a")
+    df = hist.ler()
+    assert df["ValorTotal"].tolist() == ["99,00"]
+    hist.anexar(pd.DataFrame(), origem="a")
+    assert hist.ler().empty
+
+def test_ignora_gravacao_em_curso(tmp_path):
+    hist = HistoricoParquet(str(tmp_path))
+    hist.anexar(_linhas("700 - Pago", ["01/02/2024"]), origem="a")
+    pasta = tmp_path / "status=700" / "ano=2024" / "mes=02"
+    (pasta / ".x.parquet.1234abcd.tmp").write_bytes(b"incompleto")
+    assert len(hist.ler()) == 1
+    assert hist.resumo()["arquivos"].tolist() == [1]
+
+def test_status_vem_do_parametro_sem_filtro(tmp_path):
+    hist = HistoricoParquet(str(tmp_path))
+    df = _linhas("", ["01/02/2024"]).drop(columns="Filtro_Status")
+    hist.anexar(df, origem="lote:x.pdf", status="350 - Correção Concluída")
+    assert hist.resumo()["status"].tolist() == ["350"]
+    assert hist.ler()["Filtro_Status"].tolist() == ["350 - Correção Concluída"]
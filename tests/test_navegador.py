@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import os
+
+from amhp import navegador
+
+def test_podar_pastas_trabalho(tmp_path, monkeypatch):
+    monkeypatch.setattr(navegador, "PASTA_SESSOES", str(tmp_path))
+    antiga = navegador.pasta_trabalho("s1", "run1")
+    recente = navegador.pasta_trabalho("s2", "run2")
+    em_uso = navegador.pasta_trabalho("s2", "run3")  # pasta antiga com um PDF gravado agora
+    open(os.path.join(antiga, "a.pdf"), "w").close()
+    open(os.path.join(em_uso, "b.pdf"), "w").close()
+    for caminho in (antiga, os.path.join(antiga, "a.pdf"), em_uso):
+        os.utime(caminho, (0, 0))
+    assert navegador.podar_pastas_trabalho(validade_s=3600) == 1
+    assert sorted(os.listdir(tmp_path)) == ["s2"]  # s1 ficou vazia e saiu
+    assert os.path.isdir(recente) and os.path.isdir(em_uso)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from amhp.backends import BackendPdfplumber
+from amhp.parser import (ModelosLayout, TOP_TOL, _VAL_LINE_RE, _IndiceVertical, _banda_cabecalho,
+                         _colunas_cabecalho, _registros_coords, iter_registros_coords)
+
+@pytest.fixture(scope="module")
+def paginas_portal(pdf_portal):
+    """(words, tamanho) das páginas de dados do PDF simulado."""
+    return [(words, tamanho) for _, _, words, _, tamanho in BackendPdfplumber().palavras(pdf_portal, {2, 3, 4})
+            if words]
+
+def _registros_laco(words, header_y, columns):
+    """A atribuição palavra a palavra que _registros_coords vetorizou (bandas e coluna de centro mais próximo)."""
+    dados = [w for w in words if w["top"] > header_y + TOP_TOL]
+    totais = [w for w in dados if w["text"].lower() == "total"]
+    if totais:
+        dados = [w for w in dados if w["top"] < totais[0]["top"] - TOP_TOL]
+    rows, band, last_top = [], [], None
+    for w in sorted(dados, key=lambda z: (round(z["top"], 1), z["x0"])):
+        if last_top is None or abs(w["top"] - last_top) <= TOP_TOL:
+            band.append(w)
+        else:
+            rows.append(band)
+            band = [w]
+        last_top = w["top"]
+    if band:
+        rows.append(band)
+    centros = [(c["name"], (c["x0"] + c["x1"]) / 2.0) for c in columns]
+    registros = []
+    for row in rows:
+        bucket = {c["name"]: [] for c in columns}
+        for w in row:
+            wc = (w["x0"] + w["x1"]) / 2.0
+            bucket[min(centros, key=lambda c: abs(wc - c[1]))[0]].append(w)
+        cels = {k: " ".join(ww["text"] for ww in sorted(v, key=lambda z: z["x0"])).strip() for k, v in bucket.items()}
+        if cels.get("ValorTotal") and _VAL_LINE_RE.search(cels["ValorTotal"]):
+            registros.append(cels)
+    return registros
+
+def _cabecalho(words):
+    header_y, header_words = _banda_cabecalho(_IndiceVertical(words))
+    return header_y, header_words, _colunas_cabecalho(header_words)
+
+def test_registros_coords_igual_ao_laco(paginas_portal):
+    # Credenciado e Prestador vêm preenchidos no simulado: o ajuste pelo código não entra na comparação
+    for words, _ in paginas_portal:
+        header_y, _, columns = _cabecalho(words)
+        assert _registros_coords(words, header_y, columns) == _registros_laco(words, header_y, columns)
+
+def test_registros_coords_igual_ao_laco_com_ruido(paginas_portal):
+    rnd = random.Random(7)
+    words, _ = paginas_portal[0]
+    header_y, _, columns = _cabecalho(words)
+    for _ in range(5):
+        dy = {round(w["top"], 1): rnd.uniform(-1.5, 1.5) for w in words}
+        ruido = [{**w, "top": w["top"] + dy[round(w["top"], 1)] + rnd.uniform(-0.5, 0.5),
+                  "x0": w["x0"] + rnd.uniform(-2, 2), "x1": w["x1"] + rnd.uniform(-2, 2)} for w in words]
+        rnd.shuffle(ruido)
+        registros = _registros_coords(ruido, header_y, columns)
+        assert len(registros) == 40
+        assert registros == _registros_laco(ruido, header_y, columns)
+
+def test_modelos_layout_conferir(paginas_portal, tmp_path):
+    words, tamanho = paginas_portal[0]
+    header_y, header_words, columns = _cabecalho(words)
+    modelos = ModelosLayout(str(tmp_path / "layouts.json"))
+    modelo = modelos.registrar(tamanho, header_words, columns)
+    assert modelos.conferir(modelo, _IndiceVertical(words)) == header_y
+    # outra instância lê o JSON gravado
+    assert ModelosLayout(str(tmp_path / "layouts.json")).do_tamanho(tamanho) == [modelo]
+    # cabeçalho deslocado além de TOL_X: o modelo não vale para a página
+    deslocadas = [{**w, "x0": w["x0"] + 3, "x1": w["x1"] + 3} for w in words]
+    assert modelos.conferir(modelo, _IndiceVertical(deslocadas)) is None
+
+def test_iter_registros_coords_com_e_sem_modelos(pdf_portal, linhas_portal, tmp_path):
+    modelos = ModelosLayout(str(tmp_path / "layouts.json"))
+    sem = [r for _, _, regs in iter_registros_coords(pdf_portal, "pdfplumber", modelos=None) for r in regs]
+    com = [r for _, _, regs in iter_registros_coords(pdf_portal, "pdfplumber", modelos=modelos) for r in regs]
+    assert sem == com
+    assert [r["Atendimento"] for r in com] == [l[0] for l in linhas_portal]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from amhp.portal import interpretar_resumo_grade, dividir_periodo, montar_unidades
+
+@pytest.mark.parametrize("resumo, total", [
+    (None, None),
+    ({"vazia": True, "info": "", "linhas": 0}, 0),
+    ({"vazia": False, "info": "48 items in 5 pages", "linhas": 10}, 48),
+    ({"vazia": False, "info": "1.234 itens em 124 páginas", "linhas": 10}, 1234),
+    ({"vazia": False, "info": "Items 11 to 20 of 2,500", "linhas": 10}, 2500),
+    ({"vazia": False, "info": "", "linhas": 7}, 7),             # sem pager: tudo numa página
+    ({"vazia": False, "info": "Página 1", "linhas": 10}, None),  # pager sem total
+])
+def test_interpretar_resumo_grade(resumo, total):
+    assert interpretar_resumo_grade(resumo) == total
+
+def test_dividir_periodo():
+    assert dividir_periodo("01/03/2024", "10/03/2024") == [("01/03/2024", "10/03/2024")]
+    assert dividir_periodo("28/02/2024", "05/03/2024", 3) == [
+        ("28/02/2024", "01/03/2024"), ("02/03/2024", "04/03/2024"), ("05/03/2024", "05/03/2024")]
+
+def test_montar_unidades():
+    cfg = {"negociacao": "Direto", "credenciado": "", "status_list": ["600 - Glosado", "700 - Pago"],
+           "data_ini": "01/03/2024", "data_fim": "04/03/2024", "dias_bloco": 2}
+    unidades = montar_unidades(cfg)
+    assert [(u["status"], u["ini"], u["fim"]) for u in unidades] == [
+        ("600 - Glosado", "01/03/2024", "02/03/2024"), ("600 - Glosado", "03/03/2024", "04/03/2024"),
+        ("700 - Pago", "01/03/2024", "02/03/2024"), ("700 - Pago", "03/03/2024", "04/03/2024")]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from amhp.totais import TotaisIncrementais, valor_centavos
+
+def _lote(linhas):
+    colunas = ["Filtro_Status", "Atendimento", "NrGuia", "Realizacao", "Operadora", "Prestador", "TipoGuia", "ValorTotal"]
+    return pd.DataFrame(linhas, columns=colunas)
+
+A = ["700 - Pago", "10000001", "1", "01/03/2024", "CASSI", "0123- DR A", "Consulta", "100,00"]
+B = ["700 - Pago", "10000002", "2", "01/03/2024", "CASSI", "0123- DR A", "Consulta", "1.250,50"]
+C = ["600 - Glosado", "10000003", "3", "02/03/2024", "GEAP", "0124- DR B", "SP/SADT", "50,00"]
+
+def _por_status(totais):
+    r = totais.resumo(["Status"])
+    return dict(zip(r["Status"], zip(r["Valor"], r["Guias"])))
+
+def test_valor_centavos():
+    assert valor_centavos(pd.Series(["1.234,56", "0,01", "", "abc", "12,5"])).tolist() == [123456, 1, 0, 0, 0]
+
+def test_acrescentar_e_reacrescentar():
+    t = TotaisIncrementais()
+    t.acrescentar(_lote([A, B]))
+    t.acrescentar(_lote([C]))
+    assert _por_status(t) == {"700 - Pago": (1350.5, 2), "600 - Glosado": (50.0, 1)}
+    # a mesma guia de novo (reexportação) troca a contribuição em vez de somar
+    t.acrescentar(_lote([A[:-1] + ["200,00"]]))
+    assert _por_status(t)["700 - Pago"] == (1450.5, 2)
+
+def test_remover_e_reacrescentar():
+    t = TotaisIncrementais()
+    t.acrescentar(_lote([A, B, C]))
+    assert t.remover(_lote([B, C])) == 2
+    assert _por_status(t) == {"700 - Pago": (100.0, 1)}
+    assert t.remover(_lote([C])) == 0  # já descontada
+    t.acrescentar(_lote([B, C]))
+    assert _por_status(t) == {"700 - Pago": (1350.5, 2), "600 - Glosado": (50.0, 1)}
+
+def test_remover_devolve_a_linha_que_ficou_na_base():
+    t = TotaisIncrementais()
+    t.acrescentar(_lote([A]))
+    t.acrescentar(_lote([A]))  # segunda importação do mesmo período
+    t.remover(_lote([A]), restante=_lote([A]))
+    assert _por_status(t) == {"700 - Pago": (100.0, 1)}
+
+def test_linhas_sem_atendimento_sempre_contam():
+    t = TotaisIncrementais()
+    sem_id = A[:1] + ["", ""] + A[3:]
+    t.acrescentar(_lote([sem_id, sem_id]))
+    assert _por_status(t) == {"700 - Pago": (200.0, 2)}
+    assert t.remover(_lote([sem_id])) == 1
+    assert _por_status(t) == {"700 - Pago": (100.0, 1)}
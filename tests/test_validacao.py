@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from amhp.esquema import TARGET_COLS
+from amhp.validacao import validar_atendimentos
+
+BOA = {"Atendimento": "10000001", "NrGuia": "123", "Realizacao": "01/03/2024", "Hora": "08:30",
+       "TipoGuia": "Consulta", "Operadora": "CASSI(201)", "Matricula": "878720001X03",
+       "Beneficiario": "Maria Souza", "Credenciado": "014406- CLINICA", "Prestador": "012345- DR MEDICO",
+       "ValorTotal": "1.234,56"}
+
+def _df(*linhas, modo=None):
+    df = pd.DataFrame([{**BOA, **l} for l in linhas], columns=TARGET_COLS)
+    if modo:
+        df.attrs["modo"] = modo
+    return df
+
+def test_linha_boa_sem_problemas():
+    problemas, resumo = validar_atendimentos(_df({}), "coord")
+    assert not problemas.to_numpy().any()
+    assert resumo["linhas"].sum() == 0
+
+def test_regras():
+    problemas, resumo = validar_atendimentos(_df(
+        {},
+        {"Beneficiario": ""},                          # campo_vazio
+        {},                                            # atendimento_duplicado (mesmo par da 1ª)
+        {"Atendimento": "123", "ValorTotal": "0,00"},  # atendimento_formato, valor_zerado
+        {"Atendimento": "10000009", "Hora": "25:00", "Realizacao": "2024-03-01", "Operadora": "08:30 CASSI"},
+        {"Atendimento": "10000010", "Credenciado": "CLINICA", "Prestador": "12- DR"},
+    ), "text")
+    assert problemas.index[problemas["campo_vazio"]].tolist() == [1]
+    assert problemas.index[problemas["atendimento_duplicado"]].tolist() == [1, 2]
+    assert problemas.index[problemas["valor_zerado"]].tolist() == [3]
+    assert problemas.index[problemas["atendimento_formato"]].tolist() == [3]
+    assert problemas.index[problemas["hora_formato"]].tolist() == [4]
+    assert problemas.index[problemas["data_formato"]].tolist() == [4]
+    assert problemas.index[problemas["hora_na_operadora"]].tolist() == [4]
+    assert problemas.index[problemas["credenciado_codigo"]].tolist() == [5]
+    assert problemas.index[problemas["prestador_codigo"]].tolist() == [5]
+    assert dict(zip(resumo["regra"], resumo["linhas"]))["atendimento_duplicado"] == 2
+
+def test_matricula_no_beneficiario_so_no_coord():
+    df = _df({"Beneficiario": "X03 Maria Souza 123"})
+    problemas, resumo = validar_atendimentos(df, "text")
+    assert "matricula_no_beneficiario" not in problemas.columns
+    df.attrs["modo"] = "coord"
+    problemas, _ = validar_atendimentos(df)
+    assert problemas["matricula_no_beneficiario"].tolist() == [True]
+
+def test_saida_do_parser_passa(pdf_portal):
+    from amhp.extracao import parse_pdf_to_atendimentos_df
+    for modo in ("text", "coord"):
+        df = parse_pdf_to_atendimentos_df(pdf_portal, mode=modo, cache=False, validar=False)
+        problemas, _ = validar_atendimentos(df)
+        assert not problemas.to_numpy().any(), (modo, problemas.sum()[problemas.sum() > 0].to_dict())
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from amhp.extracao import parse_pdf_to_atendimentos_df
+from amhp.varredura import classificar_paginas, paginas_a_extrair
+
+def test_classes_das_paginas(pdf_portal):
+    classes = [p["classe"] for p in classificar_paginas(pdf_portal)]
+    assert classes == ["sem registros", "dados", "dados", "dados", "resumo"]
+
+def test_resumo_fica_fora_da_extracao(pdf_portal):
+    classes = classificar_paginas(pdf_portal)
+    assert paginas_a_extrair(classes, "text") == {2, 3, 4}
+    assert paginas_a_extrair(classes, "coord") == {2, 3, 4}
+
+@pytest.mark.parametrize("modo", ["text", "coord"])
+def test_ultima_linha_sem_o_total_geral(pdf_portal, linhas_portal, modo):
+    # sem a pré-varredura, no texto a última linha absorvia o "Total R$" da página de resumo
+    df = parse_pdf_to_atendimentos_df(pdf_portal, mode=modo, cache=False)
+    assert len(df) == len(linhas_portal)
+    assert df["ValorTotal"].iloc[-1] == linhas_portal[-1][-1]
+    assert df.attrs["pre_varredura"]["puladas"] == 2